@@ -2,21 +2,40 @@ import argparse
 import sys
 import asyncio
 import logging
-from langchain_ollama import ChatOllama
-from langgraph.graph import StateGraph, START, END
-from langgraph.prebuilt import ToolNode
-
-from src.core.types import AgentState
-from src.agents.supervisor import create_supervisor_node
-from src.agents.researcher import create_researcher_node
-from src.agents.chart_gen import create_quant_node
+from contextlib import AsyncExitStack, ExitStack
+from pathlib import Path
+from typing import Any, Optional
+
+# Keep module-level imports light: LangGraph, the Ollama client, LlamaIndex and
+# the plotting stack are imported on first use (see bench_startup.py for the budget).
 from src.core.config import settings
+from src.utils.answer_cache import AnswerCache
 from src.utils.observability import Observability
+from src.utils.robustness import audit_stats, set_run_context, shutdown_logging
 from src.utils.validation import sanitize_input
 
 # Disable standard logging in favor of Rich
 logging.basicConfig(level=logging.CRITICAL)
 
+async def open_checkpointer(stack: AsyncExitStack) -> Optional[Any]:
+    """
+    Opens the SQLite-backed LangGraph checkpointer for the lifetime of ``stack``.
+    Returns None when checkpointing is disabled or the optional package is missing.
+    """
+    if not settings.CHECKPOINT_ENABLED:
+        return None
+    try:
+        from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+    except ImportError:
+        Observability.error("langgraph-checkpoint-sqlite not installed; this run will not be resumable.")
+        return None
+    settings.CHECKPOINT_DB.parent.mkdir(parents=True, exist_ok=True)
+    return await stack.enter_async_context(AsyncSqliteSaver.from_conn_string(str(settings.CHECKPOINT_DB)))
+
+def message_text(msg: Any) -> str:
+    """Content of a LangChain message or of a ("role", content) tuple."""
+    return msg[1] if isinstance(msg, tuple) else getattr(msg, "content", "")
+
 async def main():
     """
     Main asynchronous entry point for the Financial Swarm.
@@ -25,106 +44,185 @@ async def main():
     # Parse CLI Arguments
     parser = argparse.ArgumentParser(description="LangGraph Financial Swarm")
     parser.add_argument("--query", type=str, default="Compare NVIDIA's revenue growth from 2023 to 2024.", help="The financial question to answer.")
+    parser.add_argument("--thread-id", type=str, default=None, help="Checkpoint thread to write to (defaults to the run ID).")
+    parser.add_argument("--resume", action="store_true", help="Resume --thread-id from its last completed node.")
+    parser.add_argument("--no-cache", action="store_true", help="Bypass the whole-run answer cache.")
+    parser.add_argument("--headless", action="store_true", help="Disable Rich rendering (batch runs).")
+    parser.add_argument("--profile", action="store_true", help="Sample-profile every node/tool; write a flamegraph file and summary.")
+    parser.add_argument("--fake-llm", type=Path, default=None, metavar="SCRIPT", help="Use the offline scripted LLM (src/testing) instead of Ollama.")
     args = parser.parse_args()
-    
+
+    if args.headless:
+        Observability.headless = True
+
+    # Explicit runtime init (formerly import-time side effects)
+    settings.ensure_dirs()
+
+    from src.utils.metrics import MetricsExporter, metrics, spans
+
+    exporter = MetricsExporter()
+    exporter.start()
+    run_id = Observability.start_trace()
+    spans.start_trace(run_id)
+    outcome = "error"
+    try:
+        outcome = await run_query(args, run_id)
+    finally:
+        metrics.queries.inc(outcome=outcome)
+        if settings.OTLP_SPANS_FILE is not None:
+            spans.export(settings.OTLP_SPANS_FILE)
+        exporter.stop()
+        shutdown_logging()
+
+async def run_query(args: argparse.Namespace, run_id: str) -> str:
+    """
+    Answers ``args.query`` (or resumes a checkpointed thread) as run ``run_id``.
+
+    Returns:
+        str: Outcome label for swarm_queries_total ("answered", "cached", "no_answer", "invalid").
+    """
     # Sanitize Input (Security Best Practice)
     clean_query = sanitize_input(args.query)
-    
-    Observability.start_trace()
-    
+
+    set_run_context(run_id)
+    thread_id = args.thread_id or run_id
+
+    if args.resume and not args.thread_id:
+        Observability.error("--resume requires --thread-id.")
+        return "invalid"
+
+    from src.rag_adapter import adapter, prefetch_scope
+
+    # Whole-run answer cache: a repeat question against the same index and model
+    # configuration short-circuits the entire graph. Scripted --fake-llm answers are never cached.
+    use_cache = settings.ANSWER_CACHE_ENABLED and not args.no_cache and args.fake_llm is None
+    answer_cache = AnswerCache() if use_cache else None
+    index_version = adapter.source_version()
+    if answer_cache is not None and not args.resume:
+        hit = await asyncio.get_running_loop().run_in_executor(None, answer_cache.get, clean_query, index_version)
+        if hit:
+            Observability.trace_agent(
+                "Cache", hit["answer"],
+                metadata={"original_run": hit["run_id"], "cached_at": hit["created_at"]}
+            )
+            Observability.final_report(0)
+            return "cached"
+
+    from src.core.constants import ANSWER_SENDERS, ROLE_QUANT
+    from src.graph import ToolMetricsCallback, build_graph
+    from src.tools.code_sandbox import get_sandbox
+    from src.tools.plot_renderer import get_renderer
+    from src.utils.accounting import merge_metadata, message_usage
+    from src.utils.artifacts import artifact_scope
+    from src.utils.guard import recursion_limit
+
+    # Chart and code-sandbox workers are started on the first route to the Quant, not for
+    # research-only answers (run_python also starts the sandbox on first use)
+    renderer = get_renderer()
+    sandbox = get_sandbox()
+
     # Initialize LLM (Configured in src/core/config.py)
-    llm = ChatOllama(
-        model=settings.LLM_MODEL, 
-        temperature=settings.LLM_TEMPERATURE, 
-        base_url=settings.LLM_BASE_URL,
-        timeout=settings.LLM_TIMEOUT
-    )
-
-    # 1. Create Nodes
-    from langgraph.prebuilt import ToolNode, tools_condition
-    from src.tools.rag_tool import query_financial_rag
-    from src.tools.plot_tool import create_plot
-    
-    tools = [query_financial_rag, create_plot]
-    tool_node = ToolNode(tools)
-    
-    members: list[str] = ["Researcher", "Quant"]
-    supervisor_node = create_supervisor_node(llm, members)
-    researcher_node = create_researcher_node(llm)
-    quant_node = create_quant_node(llm)
-    
-    workflow = StateGraph(AgentState)
-    
-    workflow.add_node("Supervisor", supervisor_node)
-    workflow.add_node("Researcher", researcher_node)
-    workflow.add_node("Quant", quant_node)
-    workflow.add_node("tools", tool_node)
-
-    # 2. Define Edges
-    # Workflow: 
-    # Supervisor -> Researcher/Quant -> tools -> Researcher/Quant -> Supervisor
-    
-    # Conditional edge from Supervisor to members
-    workflow.add_conditional_edges(
-        "Supervisor",
-        lambda x: x["next"],
-        {
-            "Researcher": "Researcher",
-            "Quant": "Quant",
-            "FINISH": END
-        }
-    )
-    
-    # Clean tool routing logic
-    def route_tool_output(state: AgentState):
-        """Standard routing: Callers handle their own tool outputs."""
-        return state.get("sender", "Supervisor")
-
-    workflow.add_conditional_edges("tools", route_tool_output)
-
-    # Conditional edge for member agents
-    def should_continue(state: AgentState):
-        messages = state["messages"]
-        last_message = messages[-1]
-        if last_message.tool_calls:
-            return "tools"
-        return "Supervisor"
-
-    for member in members:
-        workflow.add_conditional_edges(
-            member,
-            should_continue,
-            {
-                "tools": "tools",
-                "Supervisor": "Supervisor"
-            }
-        )
+    warmup = None
+    if args.fake_llm is not None:
+        from src.testing.fake_llm import FakeChatOllama
+        llm = FakeChatOllama.from_file(args.fake_llm, model=settings.LLM_MODEL)
+    else:
+        from src.llm_client import agent_prefixes, chat_model, warm_up
+        llm = chat_model()
+        if settings.LLM_WARMUP:
+            # Model load and the shared prompt prefix overlap with graph/checkpointer/RAG setup
+            warmup = asyncio.create_task(warm_up(agent_prefixes()))
+
+    from src.llm_client import close_pools
+
+    async with AsyncExitStack() as stack:
+        # Teardown runs on every exit path, last registered first: the warm-up settles, then this
+        # loop's Ollama connections close, queued charts (PLOT_WAIT=false) land on disk and the
+        # worker pools stop. Pools that never started have nothing to stop.
+        stack.callback(sandbox.shutdown)
+        stack.callback(renderer.shutdown)
+        stack.push_async_callback(renderer.drain)
+        stack.push_async_callback(close_pools)
+        if warmup is not None:
+            stack.push_async_callback(asyncio.wait, [warmup])
+        checkpointer = await open_checkpointer(stack)
+        graph = build_graph(llm, checkpointer=checkpointer)
+        config = {"recursion_limit": recursion_limit(), "configurable": {"thread_id": thread_id}, "callbacks": [ToolMetricsCallback()]}
 
-    workflow.add_edge(START, "Supervisor")
-
-    graph = workflow.compile()
-    
-    print(f"Goal: {args.query}")
-    steps = 0
-
-    from src.utils.observability import console
-    
-    # 3. Run Graph Asynchronously
-    with console.status("[bold blue]Agents are collaborating...[/]", spinner="dots"):
-        async for s in graph.astream(
-            {"messages": [("user", clean_query)]},
-            {"recursion_limit": 20}
-        ):
-            steps += 1
-            if "__end__" not in s:
-                for key, val in s.items():
-                    if "messages" in val:
-                        msg = val['messages'][-1]
-                        sender = val.get("sender", "System")
-                        # Render via Observability
-                        Observability.trace_agent(sender, msg.content, metadata={"step": steps})
-    
+        graph_input: Optional[dict] = {"messages": [("user", clean_query)]}
+        if args.resume:
+            snapshot = await graph.aget_state(config) if checkpointer is not None else None
+            if snapshot is None or not snapshot.values:
+                Observability.error(f"No checkpoint found for thread '{thread_id}'.")
+                return "invalid"
+            # Passing None continues from the last completed node
+            graph_input = None
+            clean_query = message_text(snapshot.values["messages"][0])
+            print(f"Resuming thread {thread_id} at: {', '.join(snapshot.next) or 'END'}")
+
+        print(f"Goal: {clean_query}")
+        if checkpointer is not None:
+            print(f"Thread: {thread_id} (resume with --resume --thread-id {thread_id})")
+        steps = 0
+        answer = ""
+        run_metadata: dict = {}
+        guard = None
+
+        # Speculative retrieval: the first hop is almost always Supervisor -> Researcher -> RAG,
+        # so overlap retrieval for the user question with the Supervisor's LLM call.
+        if graph_input is not None:
+            stack.enter_context(prefetch_scope())
+            adapter.prefetch(clean_query)
+        first_route = None
+
+        # Profiling is only set up when requested: no sampler thread, no overhead otherwise
+        profiling = ExitStack()
+        profiler = None
+        if args.profile:
+            from src.utils.profiling import profile_run
+            profiler = profiling.enter_context(
+                profile_run(settings.PROFILE_DIR, run_id, settings.PROFILE_INTERVAL_MS / 1000)
+            )
+
+        # 3. Run Graph Asynchronously
+        with profiling, artifact_scope(), Observability.status("[bold blue]Agents are collaborating...[/]"):
+            async for s in graph.astream(graph_input, config):
+                steps += 1
+                if first_route is None and "Supervisor" in s:
+                    first_route = s["Supervisor"].get("next")
+                    if first_route != "Researcher":
+                        adapter.cancel_prefetch(clean_query)
+                if "Supervisor" in s and s["Supervisor"].get("next") == ROLE_QUANT:
+                    # Worker start-up (matplotlib, pandas/NumPy imports) overlaps with the Quant's LLM call
+                    renderer.warm()
+                    sandbox.warm()
+                if "__end__" not in s:
+                    for key, val in s.items():
+                        run_metadata = merge_metadata(run_metadata, val.get("metadata"))
+                        guard = val.get("guard") or guard
+                        if "messages" in val:
+                            msg = val['messages'][-1]
+                            sender = val.get("sender", "System")
+                            if not getattr(msg, "tool_calls", None) and sender in ANSWER_SENDERS:
+                                answer = msg.content
+                            # Render via Observability
+                            Observability.trace_agent(sender, msg.content, metadata={"step": steps}, usage=message_usage(msg))
+
+        adapter.cancel_prefetch(clean_query)
+
+    # A guard-forced finish is the best partial result so far, not an answer worth replaying
+    if answer_cache is not None and answer and guard is None:
+        await asyncio.get_running_loop().run_in_executor(
+            None, answer_cache.set, clean_query, index_version, answer, run_id, steps
+        )
+    Observability.guard_report(guard)
+    Observability.usage_report(run_metadata)
+    if profiler is not None:
+        Observability.profile_report(profiler, run_metadata)
     Observability.final_report(steps)
+    if audit_stats()["dropped"]:
+        Observability.error(f"Audit log dropped {audit_stats()['dropped']} records (queue full).")
+    return "answered" if answer else "no_answer"
 
 if __name__ == "__main__":
     if sys.platform == "win32":
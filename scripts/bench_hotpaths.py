@@ -0,0 +1,229 @@
+"""
+Regression micro-benchmarks for the pure-Python hot paths.
+
+Each case is timed best-of-N with ``timeit`` and divided by a fixed
+pure-Python calibration loop timed the same way ("calibration units"), which
+absorbs load drift on one machine. It does not make numbers portable: the
+ratio of C to interpreter speed differs between CPUs and Python builds, so
+baselines are recorded per host (platform, CPU, Python version) in an
+uncommitted file, and a case is only compared with a baseline from the same
+host. The first run on a host records its baselines.
+
+A case fails when it is more than ``--tolerance`` (fraction) slower than its
+baseline; C-dominated cases get a wider band (``TOLERANCE_SCALE``).
+
+Usage:
+    python scripts/bench_hotpaths.py [--tolerance 0.25] [--only parse_route_think] [--update]
+"""
+import argparse
+import atexit
+import json
+import os
+import platform
+import re
+import shutil
+import sys
+import tempfile
+import timeit
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+BASELINES = Path(os.getenv("BENCH_BASELINES", Path(__file__).resolve().parent.parent / "data" / "bench_baselines.json"))
+DEFAULT_TOLERANCE = float(os.getenv("BENCH_TOLERANCE", "0.25"))
+# Cases whose time is mostly C (pandas, regex/unicode tables) drift against the pure-Python
+# calibration loop between runs, so they get a proportionally wider band
+TOLERANCE_SCALE: Dict[str, float] = {"plot_input_50kb": 2.0, "sanitize_input": 2.0}
+
+_WORDS = "revenue margin fiscal quarter segment datacenter gaming guidance operating cash".split()
+
+
+def _calibration() -> int:
+    """Mixed dict/str/regex work standing in for 'one unit' of interpreter speed."""
+    counts: Dict[str, int] = {}
+    for i in range(2000):
+        word = _WORDS[i % len(_WORDS)]
+        counts[word] = counts.get(word, 0) + len(word.upper())
+    return len(re.findall(r"\d+", " ".join(str(v) for v in counts.values()) * 20))
+
+
+def _think(size: int) -> str:
+    """A DeepSeek-R1 style reasoning block of roughly ``size`` characters."""
+    sentence = "Let me reconsider the revenue table; FY2024 was $60,922M versus $26,974M in FY2023. "
+    return "<think>\n" + sentence * (size // len(sentence)) + "\n</think>\n"
+
+
+def _case_tool_parser() -> Callable[[], Any]:
+    from src.utils.tool_parsing import ToolParser
+    content = _think(16_000) + 'TOOL_CALL: query_financial_rag\nARGS: {"question": "NVIDIA total revenue fiscal 2023 and 2024"}'
+    return lambda: ToolParser.parse_tool_call(content, ["query_financial_rag", "create_plot"], "Researcher")
+
+
+def _case_json_parse() -> Callable[[], Any]:
+    from scripts.bench_json_parse import SAMPLE
+    from src.utils.parsing import robust_json_parse
+    return lambda: [robust_json_parse(s) for s in SAMPLE]
+
+
+def _case_plot_input() -> Callable[[], Any]:
+    from scripts.bench_plot_input import make_payload
+    from src.core.config import settings
+    from src.tools.plot_tool import create_plot
+    from src.utils.validation import MAX_DATA_SIZE
+
+    # Render once into a scratch dir; the timed calls are validation + content-addressed cache hits
+    settings.OUTPUT_DIR = tempfile.mkdtemp(prefix="bench_hotpaths_")
+    atexit.register(shutil.rmtree, settings.OUTPUT_DIR, ignore_errors=True)
+    kwargs = {"data_str": make_payload(MAX_DATA_SIZE - 1024), "plot_type": "line", "title": "Bench", "xlabel": "Year", "ylabel": "USD"}
+    create_plot.func(**kwargs)
+    return lambda: create_plot.func(**kwargs)
+
+
+def _case_parse_route() -> Callable[[], Any]:
+    from langchain_core.messages import AIMessage
+    from src.agents.supervisor import parse_route
+    message = AIMessage(content=_think(32_000) + "Next: Quant")
+    return lambda: parse_route(message)
+
+
+def _case_sanitize() -> Callable[[], Any]:
+    from src.utils.validation import sanitize_input
+    inputs = [f"  What was NVIDIA’s revenue in FY{2000 + i % 25}?\t​ " + "détail " * (i % 120) for i in range(1000)]
+    return lambda: [sanitize_input(s) for s in inputs]
+
+
+def _case_exact_match() -> Callable[[], Any]:
+    from src.experiments.evaluate_metrics import check_exact_match
+    rows = [
+        (f"Revenue for FY{2000 + i % 25} was ${60_000 + i:,}.5 million, up {i % 90}% year over year.", f"{60_000 + (i // 2) * 2}.5" if i % 3 else "year over year")
+        for i in range(10_000)
+    ]
+    return lambda: sum(check_exact_match(answer, truth) for answer, truth in rows)
+
+
+# name -> setup returning the zero-argument callable that is timed
+CASES: Dict[str, Callable[[], Callable[[], Any]]] = {
+    "tool_parser_r1": _case_tool_parser,
+    "robust_json_parse": _case_json_parse,
+    "plot_input_50kb": _case_plot_input,
+    "parse_route_think": _case_parse_route,
+    "sanitize_input": _case_sanitize,
+    "exact_match_10k": _case_exact_match,
+}
+
+
+def best_of(fn: Callable[[], Any], repeat: int = 5) -> float:
+    """Seconds per call: the fastest of ``repeat`` autoranged rounds."""
+    timer = timeit.Timer(fn)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=repeat, number=number)) / number
+
+
+def host_key() -> str:
+    """Identifies the machine a baseline was recorded on: OS, architecture, CPU model, Python."""
+    cpu = platform.processor()
+    try:
+        with open("/proc/cpuinfo", encoding="utf-8") as f:
+            cpu = next((line.split(":", 1)[1].strip() for line in f if line.startswith("model name")), cpu)
+    except OSError:
+        pass
+    return f"{platform.system()}-{platform.machine()}-{cpu or 'unknown'}-{platform.python_implementation()}{platform.python_version()}"
+
+
+def _load_hosts(path: Path) -> Dict[str, Any]:
+    if not path.exists():
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f).get("hosts", {})
+
+
+def load_baselines(path: Path = BASELINES, host: Optional[str] = None) -> Dict[str, float]:
+    """Baselines recorded on ``host`` (this machine by default); empty when there are none."""
+    return _load_hosts(path).get(host or host_key(), {})
+
+
+def save_baselines(results: Dict[str, float], path: Path = BASELINES, host: Optional[str] = None) -> None:
+    hosts = _load_hosts(path)
+    host = host or host_key()
+    hosts[host] = dict(sorted({**hosts.get(host, {}), **results}.items()))
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"unit": "calibration loops per call", "hosts": hosts}, f, indent=2)
+        f.write("\n")
+
+
+def run(names: Optional[List[str]] = None, repeat: int = 5) -> Dict[str, float]:
+    """Calibrated cost of each selected case (all of ``CASES`` by default)."""
+    from src.core.config import settings
+    from src.utils.robustness import logger
+    # Audit logging is part of some hot paths; keep it off the console while timing
+    logger.disabled, output_dir = True, settings.OUTPUT_DIR
+    try:
+        results = {}
+        for name in names or CASES:
+            fn = CASES[name]()
+            # Calibrate next to each case so drift in machine load over the run cancels out
+            results[name] = best_of(fn, repeat) / best_of(_calibration, repeat)
+        return results
+    finally:
+        logger.disabled, settings.OUTPUT_DIR = False, output_dir
+
+
+def compare(results: Dict[str, float], baselines: Dict[str, float], tolerance: float) -> List[str]:
+    """Cases more than ``tolerance`` (times the case's TOLERANCE_SCALE) slower than their baseline."""
+    return [
+        f"{name}: {baselines[name]:.2f} -> {cost:.2f} ({cost / baselines[name] - 1:+.0%})"
+        for name, cost in results.items()
+        if name in baselines and cost > baselines[name] * (1 + tolerance * TOLERANCE_SCALE.get(name, 1.0))
+    ]
+
+
+def check(baselines: Dict[str, float], tolerance: float, names: Optional[List[str]] = None, repeat: int = 5) -> Tuple[Dict[str, float], List[str]]:
+    """
+    Runs the cases and compares them with ``baselines``. Flagged cases are
+    re-timed once and keep their faster result, so a single noisy round on a
+    shared machine does not fail the check.
+    """
+    results = run(names, repeat)
+    flagged = [name for name in results if compare({name: results[name]}, baselines, tolerance)]
+    if flagged:
+        for name, cost in run(flagged, repeat).items():
+            results[name] = min(results[name], cost)
+    return results, compare(results, baselines, tolerance)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Hot-path micro-benchmarks with stored baselines")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE, help="Allowed slowdown as a fraction (default 0.25, env BENCH_TOLERANCE)")
+    parser.add_argument("--only", nargs="+", choices=sorted(CASES), help="Run only these cases")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--update", action="store_true", help=f"Record the results as this host's baselines in {BASELINES}")
+    args = parser.parse_args()
+
+    baselines = load_baselines()
+    # First run on this host: nothing to compare with, so record instead
+    record = args.update or not baselines
+    if record:
+        results = run(args.only, args.repeat)
+    else:
+        results, regressions = check(baselines, args.tolerance, args.only, args.repeat)
+    print(f"=== Hot paths on {host_key()} (calibration units, best of {args.repeat}) ===")
+    for name, cost in results.items():
+        base = baselines.get(name)
+        delta = f"{cost / base - 1:+7.1%}" if base else "    new"
+        print(f"  {name:<20} {cost:>10.2f}  baseline {base or 0:>10.2f}  {delta}")
+
+    if record:
+        save_baselines(results)
+        print(f"Baselines for this host written to {BASELINES}")
+        return
+    if regressions:
+        print(f"FAIL: regressions beyond {args.tolerance:.0%}:")
+        print("\n".join(f"  {line}" for line in regressions))
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Benchmark for robust_json_parse on tool-argument strings.
+
+Replays a corpus captured by ToolParser (set TOOL_ARGS_CORPUS=data/tool_args_corpus.jsonl
+and run a few queries) through the previous json5-first decoder and the tiered
+decoder, and reports throughput plus which tier handled each string. Without a
+captured corpus a small built-in sample of observed malformations is used.
+
+Usage:
+    python scripts/bench_json_parse.py [--corpus data/tool_args_corpus.jsonl] [--repeat 200]
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.utils.parsing import parse_stats, reset_parse_stats, robust_json_parse
+
+_ROWS = json.dumps([{"year": 2022 + i, "value": 26.97 * (i + 1)} for i in range(3)])
+
+# Shapes seen in Researcher/Quant tool calls
+SAMPLE: List[str] = [
+    '{"query": "NVIDIA total revenue fiscal 2024"}',
+    '{"query": "What was the data center revenue in 2023?"}',
+    json.dumps({"data_str": _ROWS, "plot_type": "bar", "title": "Revenue", "xlabel": "Year", "ylabel": "USD bn"}),
+    "{'query': 'gross margin 2024'}",
+    '{"query": "operating income", "include_segments": True}',
+    '{"data_str": "[{\\"year\\": 2023, \\"value\\": 60.9}]", "plot_type": "line", "title": "Rev", "xlabel": "Year", "ylabel": "USD",}',
+    '{query: "free cash flow 2024"}',
+]
+
+
+def legacy_parse(json_str: str) -> Any:
+    """The previous decoder: json5 first, then json, then blanket string replacement."""
+    try:
+        import json5
+        return json5.loads(json_str)
+    except Exception:
+        pass
+    try:
+        return json.loads(json_str)
+    except json.JSONDecodeError:
+        pass
+    cleaned = json_str.replace("True", "true").replace("False", "false").replace("None", "null")
+    if "'" in cleaned and '"' not in cleaned:
+        cleaned = cleaned.replace("'", '"')
+    return json.loads(cleaned)
+
+
+def load_corpus(path: Path) -> List[str]:
+    if not path.exists():
+        print(f"No captured corpus at {path}; using {len(SAMPLE)} built-in samples.")
+        return SAMPLE
+    with open(path, encoding="utf-8") as f:
+        corpus = [json.loads(line)["args"] for line in f if line.strip()]
+    print(f"Loaded {len(corpus)} captured tool-argument strings from {path}.")
+    return corpus
+
+
+def run(fn: Callable[[str], Any], corpus: List[str], repeat: int) -> float:
+    """Seconds per string (failures count toward the time)."""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for s in corpus:
+            try:
+                fn(s)
+            except ValueError:
+                pass
+    return (time.perf_counter() - start) / (repeat * len(corpus))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Tool-argument JSON decoding benchmark")
+    parser.add_argument("--corpus", type=Path, default=Path("data") / "tool_args_corpus.jsonl")
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus)
+    if not corpus:
+        sys.exit("Corpus is empty.")
+
+    legacy_s = run(legacy_parse, corpus, args.repeat)
+    reset_parse_stats()
+    tiered_s = run(robust_json_parse, corpus, args.repeat)
+    stats = parse_stats()
+
+    print(f"{'Decoder':<10} {'us/string':>10}")
+    print(f"{'legacy':<10} {legacy_s * 1e6:>10.1f}")
+    print(f"{'tiered':<10} {tiered_s * 1e6:>10.1f}   ({legacy_s / tiered_s:.1f}x)")
+    total = sum(stats.values())
+    print("Tier hits: " + ", ".join(f"{k}={v / total:.0%}" for k, v in sorted(stats.items())))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Micro-benchmark for the create_plot input layer at the 50KB payload cap.
+
+Compares the previous triple parse (validator json.loads + throwaway DataFrame,
+then pd.read_csv on the JSON, then json.loads + DataFrame again) with the
+single ``parse_dataframe`` pass the tool now receives its frame from.
+
+Usage:
+    python scripts/bench_plot_input.py [--size-kb 50] [--runs 200]
+"""
+import argparse
+import io
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Callable, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import pandas as pd
+
+from src.utils.validation import MAX_DATA_SIZE, parse_dataframe
+
+
+def make_payload(size_bytes: int) -> str:
+    """JSON records payload just under ``size_bytes``, shaped like Quant tool calls."""
+    rows: List[dict] = []
+    while True:
+        i = len(rows)
+        rows.append({"label": f"Segment {i}", "year": 2000 + i % 25, "value": round(1000 + i * 3.7, 2)})
+        if len(json.dumps(rows)) > size_bytes:
+            rows.pop()
+            return json.dumps(rows)
+
+
+def legacy_parse(data_str: str) -> pd.DataFrame:
+    """The pre-refactor path: validator dry run, then the tool's own parse."""
+    data = json.loads(data_str)
+    pd.DataFrame(data)
+    try:
+        df = pd.read_csv(io.StringIO(data_str))
+    except Exception:
+        df = pd.DataFrame(json.loads(data_str))
+    return df
+
+
+def time_it(fn: Callable[[str], pd.DataFrame], payload: str, runs: int) -> List[float]:
+    fn(payload)  # warm-up
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn(payload)
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="create_plot input parsing benchmark")
+    parser.add_argument("--size-kb", type=float, default=MAX_DATA_SIZE / 1024)
+    parser.add_argument("--runs", type=int, default=200)
+    args = parser.parse_args()
+
+    payload = make_payload(int(args.size_kb * 1024))
+    print(f"=== Plot input parsing: {len(payload) / 1024:.1f}KB payload, {args.runs} runs ===")
+    print(f"{'Pipeline':<16} {'median ms':>10} {'p95 ms':>10}")
+    for name, fn in [("legacy (3x)", legacy_parse), ("single-parse", parse_dataframe)]:
+        samples = sorted(time_it(fn, payload, args.runs))
+        p95 = samples[int(len(samples) * 0.95) - 1]
+        print(f"{name:<16} {statistics.median(samples):>10.2f} {p95:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""
+Benchmark for prompt layout and Ollama KV-cache reuse.
+
+Replays a typical run (Supervisor -> Researcher -> RAG -> Researcher ->
+Supervisor -> Quant -> plot -> Quant -> Supervisor) and, per LLM hop, counts
+the prompt tokens Ollama has to prefill: everything after the longest common
+token prefix with the previous request (one cache slot, as with
+OLLAMA_NUM_PARALLEL=1). The previous layout (a different system prompt per
+agent, the Supervisor's routing instruction as a trailing system message) is
+compared with the shared-prefix layout from src/core/prompts.py.
+
+Offline, prompts are rendered the way chat templates do (system messages
+hoisted to the front), the cache starts with what warm-up primed, and prefill
+time is estimated from --prefill-tps. With
+--live, each hop is sent to Ollama and its reported prompt_eval_count /
+prompt_eval_duration are used instead.
+
+Usage:
+    python scripts/bench_prompt_prefix.py [--prefill-tps 400] [--live]
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Sequence, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage, ToolMessage
+
+from src.core.constants import ROLE_FINISH, ROLE_QUANT, ROLE_RESEARCHER, ROLE_SUPERVISOR
+from src.core.prompts import DEFAULT_MEMBERS, Prompts, build_messages
+from src.testing.fake_llm import tokenize
+
+_ROLES = {"human": "user", "ai": "assistant", "system": "system", "tool": "tool"}
+
+_RAG_RESULT = (
+    "NVIDIA revenue was $26.97B in fiscal 2023 and $60.92B in fiscal 2024 (+126%).\n\n"
+    "Sources (full text: fetch_artifact):\n"
+    "[src-3f2a9c1b7e] Revenue by reportable segment: Compute & Networking $47,405M; Graphics $13,517M...\n"
+    "[src-81d0c4e2aa] Fiscal Year 2024 Summary: revenue $60,922M, up 126%; gross margin 72.7%...\n"
+    "[src-c07b5512f9] Data Center revenue for fiscal 2024 was a record $47.5 billion, up 217%..."
+)
+
+
+def legacy_messages(role: str, history: Sequence[BaseMessage]) -> List[BaseMessage]:
+    """The previous assembly: per-agent system prompt; Supervisor instruction as a trailing system message."""
+    if role == ROLE_SUPERVISOR:
+        options = str([ROLE_FINISH, *DEFAULT_MEMBERS])
+        return [
+            SystemMessage(content=Prompts.SUPERVISOR_SYSTEM.replace("{options}", options)),
+            *history,
+            SystemMessage(content=f"Based on the conversation, who should act next? Respond with 'Next: <Role>' where <Role> is one of {options}."),
+        ]
+    system = Prompts.RESEARCHER_SYSTEM if role == ROLE_RESEARCHER else Prompts.QUANT_SYSTEM
+    return [HumanMessage(content=system), *history]
+
+
+def run_script() -> List[Tuple[str, List[BaseMessage], BaseMessage]]:
+    """(acting role, history before the hop, message the hop appends) for each LLM hop."""
+    plot_args = {"data_str": json.dumps([{"year": 2023, "revenue": 26.97}, {"year": 2024, "revenue": 60.92}]), "plot_type": "bar", "title": "NVIDIA Revenue", "xlabel": "Fiscal Year", "ylabel": "USD bn"}
+    rag_call = AIMessage(content='TOOL_CALL: query_financial_rag\nARGS: {"question": "NVIDIA total revenue fiscal 2023 and 2024"}',
+                         tool_calls=[{"name": "query_financial_rag", "args": {"question": "NVIDIA total revenue fiscal 2023 and 2024"}, "id": "call_1"}])
+    plot_call = AIMessage(content=f"TOOL_CALL: create_plot\nARGS: {json.dumps(plot_args)}", tool_calls=[{"name": "create_plot", "args": plot_args, "id": "call_2"}])
+    steps: List[Tuple[str, BaseMessage, List[BaseMessage]]] = [
+        (ROLE_SUPERVISOR, AIMessage(content="Next: Researcher"), []),
+        (ROLE_RESEARCHER, rag_call, [ToolMessage(content=_RAG_RESULT, tool_call_id="call_1")]),
+        (ROLE_RESEARCHER, AIMessage(content="Revenue grew from $26.97B (FY2023) to $60.92B (FY2024), +126%."), []),
+        (ROLE_SUPERVISOR, AIMessage(content="Next: Quant"), []),
+        (ROLE_QUANT, plot_call, [ToolMessage(content="Chart generated: output/nvidia_revenue_1a2b.png (Raw Data: output/nvidia_revenue_1a2b.csv)", tool_call_id="call_2")]),
+        (ROLE_QUANT, AIMessage(content="Chart created"), []),
+        (ROLE_SUPERVISOR, AIMessage(content="Next: FINISH"), []),
+    ]
+    history: List[BaseMessage] = [HumanMessage(content="Compare NVIDIA revenue for fiscal 2023 and 2024 and plot it.")]
+    hops = []
+    for role, reply, tool_results in steps:
+        hops.append((role, list(history), reply))
+        # The Supervisor's routing reply is not kept in the conversation
+        if role != ROLE_SUPERVISOR:
+            history.append(reply)
+        history.extend(tool_results)
+    return hops
+
+
+def render(messages: Sequence[BaseMessage]) -> List[str]:
+    """Tokens of the request as a chat template renders it: system text first, then the turns."""
+    system = "\n\n".join(str(m.content) for m in messages if m.type == "system")
+    turns = "".join(f"<|{_ROLES[m.type]}|>{m.content}" for m in messages if m.type != "system")
+    return tokenize(system + turns + "<|assistant|>")
+
+
+def _common_prefix(a: Sequence[str], b: Sequence[str]) -> int:
+    n = 0
+    for x, y in zip(a, b):
+        if x != y:
+            break
+        n += 1
+    return n
+
+
+def warm_prefix(layout: Callable[[str, Sequence[BaseMessage]], List[BaseMessage]]) -> List[str]:
+    """What warm-up leaves in the cache: the system part of the first hop's prompt."""
+    role, history, _ = run_script()[0]
+    return render([m for m in layout(role, history) if m.type == "system"])[:-1]
+
+
+def estimate(layout: Callable[[str, Sequence[BaseMessage]], List[BaseMessage]]) -> List[Dict[str, Any]]:
+    """Prompt and prefilled tokens per hop under a single-slot prefix cache, starting warm."""
+    rows, cached = [], warm_prefix(layout)
+    for role, history, reply in run_script():
+        tokens = render(layout(role, history))
+        reused = _common_prefix(cached, tokens)
+        rows.append({"role": role, "prompt": len(tokens), "prefill": len(tokens) - reused})
+        # The slot now holds this prompt plus the generated reply
+        cached = tokens + tokenize(str(reply.content))
+    return rows
+
+
+def measure_live(layout: Callable[[str, Sequence[BaseMessage]], List[BaseMessage]]) -> List[Dict[str, Any]]:
+    """Same hops against Ollama: prompt_eval_count is the part it had to prefill."""
+    from src.core.config import settings
+    from src.llm_client import keep_alive, shared_clients
+
+    client, _ = shared_clients()
+    rows = []
+    for role, history, _ in run_script():
+        messages = [{"role": _ROLES[m.type], "content": str(m.content)} for m in layout(role, history)]
+        resp = client.chat(model=settings.LLM_MODEL, messages=messages, options={"num_predict": 1, "temperature": 0}, keep_alive=keep_alive())
+        rows.append({"role": role, "prefill": resp.prompt_eval_count or 0, "prefill_ms": (resp.prompt_eval_duration or 0) / 1e6})
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Prefill saved per hop by the shared prompt prefix")
+    parser.add_argument("--prefill-tps", type=float, default=400.0, help="Prefill tokens/s for the offline estimate")
+    parser.add_argument("--live", action="store_true", help="Measure against LLM_BASE_URL instead of estimating")
+    args = parser.parse_args()
+
+    layouts = {"legacy": legacy_messages, "shared": build_messages}
+    if args.live:
+        results = {name: measure_live(layout) for name, layout in layouts.items()}
+    else:
+        results = {name: estimate(layout) for name, layout in layouts.items()}
+        for rows in results.values():
+            for row in rows:
+                row["prefill_ms"] = row["prefill"] / args.prefill_tps * 1000
+
+    mode = "measured" if args.live else f"estimated at {args.prefill_tps:g} tok/s"
+    print(f"=== Prefill per hop ({mode}) ===")
+    print(f"{'Hop':<4} {'Agent':<11} {'Legacy tok':>10} {'Shared tok':>10} {'Legacy ms':>10} {'Shared ms':>10} {'Saved ms':>9}")
+    for i, (old, new) in enumerate(zip(results["legacy"], results["shared"]), 1):
+        saved = old["prefill_ms"] - new["prefill_ms"]
+        print(f"{i:<4} {old['role']:<11} {old['prefill']:>10} {new['prefill']:>10} {old['prefill_ms']:>10.0f} {new['prefill_ms']:>10.0f} {saved:>9.0f}")
+    totals = {name: (sum(r["prefill"] for r in rows), sum(r["prefill_ms"] for r in rows)) for name, rows in results.items()}
+    hops = len(results["shared"])
+    print(
+        f"Total prefill: {totals['legacy'][0]} -> {totals['shared'][0]} tokens "
+        f"({totals['legacy'][1]:.0f} -> {totals['shared'][1]:.0f} ms, "
+        f"{(totals['legacy'][1] - totals['shared'][1]) / hops:.0f} ms saved per hop)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Startup-time regression benchmark for the CLI.
+
+Runs ``python -X importtime -c "import <module>"`` in fresh interpreters, reports
+the median cumulative import time and the heaviest imports, and fails if the
+budget is exceeded or a module that must stay lazy was loaded.
+
+Usage:
+    python scripts/bench_startup.py [--module main] [--budget-ms 1000] [--runs 5]
+"""
+import argparse
+import re
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Heavy dependencies that a plain `import main` must not pull in
+LAZY_MODULES = [
+    "matplotlib", "seaborn", "pandas", "numpy", "torch", "sentence_transformers",
+    "transformers", "llama_index", "langgraph", "langchain_ollama",
+]
+
+_LINE_RE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def measure(module: str) -> Tuple[float, Dict[str, int], List[str]]:
+    """
+    One fresh-interpreter import of ``module``.
+
+    Returns:
+        Tuple[float, Dict[str, int], List[str]]: Total ms, cumulative us per top-level package, lazy modules loaded.
+    """
+    probe = f"import {module}, sys; print(','.join(m for m in {LAZY_MODULES!r} if m in sys.modules))"
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", probe],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    cumulative: Dict[str, int] = {}
+    total_us = 0
+    for line in proc.stderr.splitlines():
+        match = _LINE_RE.match(line)
+        if not match:
+            continue
+        cum_us, indent, name = int(match.group(2)), len(match.group(3)), match.group(4)
+        if indent == 1:  # direct imports of the probe
+            total_us += cum_us
+        root = name.split(".")[0]
+        cumulative[root] = max(cumulative.get(root, 0), cum_us)
+    loaded = [m for m in proc.stdout.strip().split(",") if m]
+    return total_us / 1000, cumulative, loaded
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="CLI import-time budget check")
+    parser.add_argument("--module", default="main")
+    parser.add_argument("--budget-ms", type=float, default=1000.0)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    samples, loaded = [], set()
+    cumulative: Dict[str, int] = {}
+    for _ in range(args.runs):
+        total_ms, cumulative, lazy_loaded = measure(args.module)
+        samples.append(total_ms)
+        loaded.update(lazy_loaded)
+
+    median_ms = statistics.median(samples)
+    print(f"=== Startup: import {args.module} ({args.runs} runs) ===")
+    print(f"Median: {median_ms:.1f}ms  (min {min(samples):.1f}ms, max {max(samples):.1f}ms, budget {args.budget_ms:.0f}ms)")
+    print("Heaviest packages (cumulative, last run):")
+    for name, us in sorted(cumulative.items(), key=lambda kv: kv[1], reverse=True)[: args.top]:
+        print(f"  {name:<28} {us / 1000:>8.1f}ms")
+
+    failed = False
+    if loaded:
+        print(f"FAIL: modules that must be lazy were imported: {sorted(loaded)}")
+        failed = True
+    if median_ms > args.budget_ms:
+        print(f"FAIL: median startup {median_ms:.1f}ms exceeds budget {args.budget_ms:.0f}ms")
+        failed = True
+    if failed:
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
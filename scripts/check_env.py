@@ -25,6 +25,12 @@ def check_environment():
             models = [m['name'] for m in resp.json()['models']]
             if settings.LLM_MODEL in models:
                 console.print(f"[green]✅ Ollama is running and '{settings.LLM_MODEL}' is available.[/]")
+                from src.llm_client import residency
+                state = residency()
+                if state["state"] == "warm":
+                    console.print(f"[green]✅ Model is resident (unloads at {state.get('expires_at')}; LLM_KEEP_ALIVE={settings.LLM_KEEP_ALIVE}).[/]")
+                else:
+                    console.print(f"[yellow]⚠️  Model is {state['state']}: the first query pays the model load.[/]")
             else:
                 console.print(f"[yellow]⚠️  Ollama is running but model '{settings.LLM_MODEL}' not found. Run `ollama pull {settings.LLM_MODEL}`.[/]")
         else:
@@ -1,13 +1,14 @@
-from langchain_ollama import ChatOllama
-from langchain_core.messages import HumanMessage, AIMessage
+from typing import TYPE_CHECKING
 from src.core.types import AgentState
-from src.core.prompts import Prompts
-from typing import Dict, Any, Callable, Sequence 
-from src.utils.parsing import robust_json_parse
-from src.utils.robustness import log_agent_action
-from langchain_core.messages import SystemMessage
+from src.core.constants import ROLE_QUANT
+from src.core.prompts import build_messages
+from typing import Dict, Any, Callable
 
-def create_quant_node(llm: ChatOllama) -> Callable[[AgentState], Dict[str, Any]]:
+if TYPE_CHECKING:
+    # Annotation only; the concrete client is constructed by the entry point
+    from langchain_ollama import ChatOllama
+
+def create_quant_node(llm: "ChatOllama") -> Callable[[AgentState], Dict[str, Any]]:
     """
     Creates the Quant node for data visualization.
     
@@ -28,14 +29,14 @@ def create_quant_node(llm: ChatOllama) -> Callable[[AgentState], Dict[str, Any]]
         Returns:
             Dict[str, Any]: Updated state with Quant's response.
         """
-        messages = [HumanMessage(content=Prompts.QUANT_SYSTEM)] + state["messages"]
+        messages = build_messages(ROLE_QUANT, state["messages"])
         response = llm.invoke(messages)
         content = response.content
         
         from src.utils.tool_parsing import ToolParser
         
         # Use centralized ToolParser (DRY Principle)
-        tool_call = ToolParser.parse_tool_call(content, ["create_plot"], "Quant")
+        tool_call = ToolParser.parse_tool_call(content, ["create_plot", "run_python"], "Quant")
         
         if tool_call:
             response.tool_calls = [tool_call]
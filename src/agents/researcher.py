@@ -1,15 +1,14 @@
-from langchain_ollama import ChatOllama
-from langchain_core.messages import HumanMessage, AIMessage
-from src.tools.rag_tool import query_financial_rag
+from typing import TYPE_CHECKING
 from src.core.types import AgentState
-from src.core.prompts import Prompts
-from typing import Dict, Any, Callable, Sequence
-from langchain_core.messages import BaseMessage
-from src.utils.parsing import robust_json_parse
-from src.utils.robustness import log_agent_action
-from langchain_core.messages import SystemMessage
+from src.core.constants import ROLE_RESEARCHER
+from src.core.prompts import build_messages
+from typing import Dict, Any, Callable
 
-def create_researcher_node(llm: ChatOllama) -> Callable[[AgentState], Dict[str, Any]]:
+if TYPE_CHECKING:
+    # Annotation only; the concrete client is constructed by the entry point
+    from langchain_ollama import ChatOllama
+
+def create_researcher_node(llm: "ChatOllama") -> Callable[[AgentState], Dict[str, Any]]:
     """
     Creates the Researcher node for financial data retrieval.
     
@@ -30,14 +29,14 @@ def create_researcher_node(llm: ChatOllama) -> Callable[[AgentState], Dict[str,
         Returns:
             Dict[str, Any]: Identify of the sender and updated messages.
         """
-        messages = [HumanMessage(content=Prompts.RESEARCHER_SYSTEM)] + state["messages"]
+        messages = build_messages(ROLE_RESEARCHER, state["messages"])
         response = llm.invoke(messages)
         content = response.content
         
         from src.utils.tool_parsing import ToolParser
         
         # Use centralized ToolParser (DRY Principle)
-        tool_call = ToolParser.parse_tool_call(content, ["query_financial_rag"], "Researcher")
+        tool_call = ToolParser.parse_tool_call(content, ["query_financial_rag", "fetch_artifact"], "Researcher")
         
         if tool_call:
             response.tool_calls = [tool_call]
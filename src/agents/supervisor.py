@@ -1,15 +1,52 @@
-from langchain_ollama import ChatOllama
-from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+from typing import TYPE_CHECKING
+from langchain_core.runnables import RunnableLambda
 import re
 
 # Import Types and Prompts
 from src.core.types import AgentState
-from src.core.prompts import Prompts
+from src.core.prompts import build_messages
 
-from typing import List, Sequence, Callable, Dict, Any
-from src.core.constants import ROLE_FINISH
+from typing import List, Callable, Dict, Any
+from src.core.constants import ROLE_SUPERVISOR, TOOL_OWNERS
 
-def create_supervisor_node(llm: ChatOllama, members: List[str]) -> Callable[[AgentState], Dict[str, Any]]:
+if TYPE_CHECKING:
+    # Annotation only; the concrete client is constructed by the entry point
+    from langchain_ollama import ChatOllama
+
+# Compiled once: parse_route runs on every supervisor turn, often over long <think> blocks
+_THINK_RE = re.compile(r"<think>.*?</think>", re.DOTALL | re.IGNORECASE)
+_ROUTE_RE = re.compile(r"Next:\s*(Researcher|Quant|FINISH)", re.IGNORECASE)
+_TOOL_CALL_RE = re.compile(r"TOOL_CALL:\s*(\w+)")
+
+def parse_route(ai_message: Any) -> Dict[str, str]:
+    """Regex routing parser with robust fallback; ``<think>`` blocks are ignored."""
+    text = ai_message.content
+    # 0. Strip <think> blocks for reasoning models (DeepSeek-R1, etc.)
+    text_to_parse = _THINK_RE.sub("", text)
+    
+    # Debug log for routing
+    from src.utils.robustness import log_agent_action
+    log_agent_action("Supervisor", "Thought", text_to_parse[:200].strip()) # Log truncated thought 
+    
+    # 1. Try strict regex on stripped content
+    match = _ROUTE_RE.search(text_to_parse)
+    if match:
+         return {"next": match.group(1).title() if match.group(1).upper() != "FINISH" else "FINISH"}
+    
+    # 2. Heuristic fallback
+    if "FINISH" in text.upper() and len(text) < 50:
+         return {"next": "FINISH"}
+
+    # 3. The shared system prompt shows every role's tools: a Supervisor "calling" one means
+    #    that member should act (the call itself is discarded; the Supervisor has no tools)
+    call = _TOOL_CALL_RE.search(text_to_parse)
+    if call and call.group(1) in TOOL_OWNERS:
+         return {"next": TOOL_OWNERS[call.group(1)]}
+    
+    # 4. Default safety net: If inconclusive, ask Researcher for more info
+    return {"next": "Researcher"}
+
+def create_supervisor_node(llm: "ChatOllama", members: List[str]) -> Callable[[AgentState], Dict[str, Any]]:
     """
     Creates the Supervisor node function (Regex Augmented for Robustness).
     
@@ -20,41 +57,14 @@ def create_supervisor_node(llm: ChatOllama, members: List[str]) -> Callable[[Age
     Returns:
         Callable[[AgentState], Dict[str, Any]]: The graph code for the supervisor.
     """
-    options = [ROLE_FINISH] + members
-    
-    # 构建 Prompt
-    prompt = ChatPromptTemplate.from_messages([
-        ("system", Prompts.SUPERVISOR_SYSTEM),
-        MessagesPlaceholder(variable_name="messages"),
-        (
-            "system",
-            "Based on the conversation, who should act next? "
-            "Respond with 'Next: <Role>' where <Role> is one of {options}.",
-        ),
-    ]).partial(options=str(options))
-
-    # Regex parser with robust fallback
-    def parse_route(ai_message):
-        text = ai_message.content
-        # 0. Strip <think> blocks for reasoning models (DeepSeek-R1, etc.)
-        text_to_parse = re.sub(r"<think>.*?</think>", "", text, flags=re.DOTALL | re.IGNORECASE)
-        
-        # Debug log for routing
-        from src.utils.robustness import log_agent_action
-        log_agent_action("Supervisor", "Thought", text_to_parse[:200].strip()) # Log truncated thought 
-        
-        # 1. Try strict regex on stripped content
-        match = re.search(r"Next:\s*(Researcher|Quant|FINISH)", text_to_parse, re.IGNORECASE)
-        if match:
-             return {"next": match.group(1).title() if match.group(1).upper() != "FINISH" else "FINISH"}
-        
-        # 2. Heuristic fallback
-        if "FINISH" in text.upper() and len(text) < 50:
-             return {"next": "FINISH"}
-        
-        # 3. Default safety net: If inconclusive, ask Researcher for more info
-        return {"next": "Researcher"}
-
-    supervisor_chain = prompt | llm | parse_route
+    # Shared cache-friendly layout (src/core/prompts.py): static prefix, history, routing instruction
+    prompt = RunnableLambda(lambda state: build_messages(ROLE_SUPERVISOR, state["messages"], members))
+
+    def route_with_usage(ai_message):
+        """Routing decision plus the token/duration usage of the routing call."""
+        from src.utils.accounting import message_usage, node_delta
+        return {**parse_route(ai_message), "metadata": node_delta("Supervisor", message_usage(ai_message))}
+
+    supervisor_chain = prompt | llm | route_with_usage
 
     return supervisor_chain
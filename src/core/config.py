@@ -1,5 +1,6 @@
 from pydantic_settings import BaseSettings
 from pathlib import Path
+from typing import Literal
 from pydantic import Field
 
 class Settings(BaseSettings):
@@ -11,6 +12,12 @@ class Settings(BaseSettings):
     LLM_TEMPERATURE: float = Field(default=0.0, ge=0.0, le=1.0)
     LLM_BASE_URL: str = Field(default="http://localhost:11434")
     LLM_TIMEOUT: int = Field(default=120, gt=0)
+    # Residency and transport (src/llm_client.py): how long Ollama keeps the model loaded after a
+    # request (duration like "30m", or seconds; -1 = forever), pooled connections per host,
+    # and whether main.py loads the model and primes the system prompts at startup
+    LLM_KEEP_ALIVE: str = "30m"
+    LLM_MAX_CONNECTIONS: int = Field(default=8, gt=0)
+    LLM_WARMUP: bool = True
 
     # Embedding Settings
     EMBEDDING_MODEL: str = "BAAI/bge-large-en-v1.5"
@@ -21,10 +28,97 @@ class Settings(BaseSettings):
     DATA_DIR: Path = Field(default_factory=lambda: Path.cwd() / "data")
     OUTPUT_DIR: Path = Field(default_factory=lambda: Path.cwd() / "output")
     LOG_FILE: str = "agent_trace.log"
+    # Audit log (JSONL via a background writer): level, console level, sampling of INFO records, queue bound
+    AUDIT_LOG_LEVEL: Literal["DEBUG", "INFO", "WARNING", "ERROR"] = "INFO"
+    AUDIT_CONSOLE_LEVEL: Literal["DEBUG", "INFO", "WARNING", "ERROR"] = "INFO"
+    AUDIT_SAMPLE_RATE: float = Field(default=1.0, ge=0.0, le=1.0)
+    AUDIT_QUEUE_SIZE: int = Field(default=10_000, gt=0)
     
     # RAG Settings
     RAG_DATA_PATH: Path = Field(default_factory=lambda: Path.cwd() / "data" / "parsed" / "llamaparse" / "parsed.md")
-    RAG_TOP_K: int = 3
+    RAG_TOP_K: int = Field(default=3, gt=0, description="Chunks passed to the answer synthesizer")
+    RAG_INDEX_DIR: Path = Field(default_factory=lambda: Path.cwd() / "data" / "index")
+    # Multi-filing corpus (<TICKER>/<YEAR>/*.md or <TICKER>_<YEAR>_*.md). When set, one
+    # index is built per (ticker, fiscal year) shard and queries are routed to shards.
+    RAG_CORPUS_DIR: Path | None = None
+
+    # ANN Retrieval (IVF). Exact search is kept for corpora below RAG_ANN_MIN_CHUNKS.
+    RAG_ANN_ENABLED: bool = False
+    RAG_ANN_NLIST: int = Field(default=0, ge=0, description="IVF cells (0 = sqrt(N))")
+    RAG_ANN_NPROBE: int = Field(default=8, gt=0, description="Cells scanned per query (recall/latency knob)")
+    RAG_ANN_MIN_CHUNKS: int = Field(default=10_000, ge=0)
+
+    # Reranking (opt-in: downloads a cross-encoder): retrieve RAG_RETRIEVE_TOP_K dense candidates,
+    # rerank down to RAG_TOP_K. Skipped per query when the dense top-k already leads by RAG_RERANK_MARGIN.
+    RAG_RERANK_ENABLED: bool = False
+    RAG_RERANK_MODEL: str = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+    RAG_RETRIEVE_TOP_K: int = Field(default=50, gt=0)
+    RAG_RERANK_MARGIN: float = Field(default=0.15, ge=0.0)
+
+    # Speculative retrieval of the user question while the Supervisor is deciding
+    RAG_PREFETCH_ENABLED: bool = True
+    RAG_PREFETCH_MIN_SIMILARITY: float = Field(default=0.5, ge=0.0, le=1.0)
+    
+    # Run persistence: LangGraph checkpoints (resumable runs) and whole-run answer cache
+    CHECKPOINT_ENABLED: bool = True
+    CHECKPOINT_DB: Path = Field(default_factory=lambda: Path.cwd() / "data" / "checkpoints.sqlite")
+    ANSWER_CACHE_ENABLED: bool = True
+    ANSWER_CACHE_TTL: int = Field(default=7 * 24 * 3600, ge=0, description="Seconds (0 = never expire)")
+    
+    # Chart rendering: pre-warmed process pool (0 = single background thread)
+    PLOT_WORKERS: int = Field(default=2, ge=0)
+    PLOT_PROFILE: Literal["preview", "publication", "vector"] = "publication"
+    # False: create_plot returns as soon as the render is queued (a later failure is reported by
+    # the next create_plot result); main drains the pool before exit
+    PLOT_WAIT: bool = True
+    # Charts are content-addressed in OUTPUT_DIR; least-recently-used ones are evicted past this size
+    OUTPUT_MAX_BYTES: int = Field(default=512 * 1024 * 1024, ge=0, description="Bytes (0 = unbounded)")
+    
+    # Quant code execution (src/tools/code_sandbox.py): pre-started workers with pandas/NumPy
+    # imported; per-call CPU, memory and wall-clock limits; calls beyond the queue are rejected.
+    # Workers drop privileges, environment and network before running any snippet.
+    SANDBOX_WORKERS: int = Field(default=2, gt=0)
+    SANDBOX_QUEUE_SIZE: int = Field(default=8, ge=0, description="Calls waiting for a free worker")
+    SANDBOX_TIMEOUT_S: float = Field(default=10.0, gt=0)
+    SANDBOX_CPU_S: int = Field(default=5, ge=0, description="CPU seconds per call (0 = only the timeout)")
+    SANDBOX_MEMORY_MB: int = Field(default=512, ge=0, description="Memory per worker beyond its imports (0 = unlimited)")
+    SANDBOX_MAX_ROWS: int = Field(default=20, gt=0, description="Rows shown per result table")
+    SANDBOX_MAX_OUTPUT_CHARS: int = Field(default=4000, gt=0)
+    SANDBOX_UID: int = Field(default=65534, ge=1, description="Unprivileged uid/gid workers switch to when started as root")
+    # Fail closed: workers that could not drop root or enter their own network namespace refuse
+    # every snippet. Turn off only where the host already confines the process (e.g. a container).
+    SANDBOX_REQUIRE_ISOLATION: bool = True
+    
+    # Append raw tool-argument strings seen by ToolParser here (JSONL) for parser benchmarks
+    TOOL_ARGS_CORPUS: Path | None = None
+    
+    # Monitoring: Prometheus endpoint and/or textfile, OTLP/JSON node spans, console rendering
+    METRICS_PORT: int | None = None
+    METRICS_HOST: str = "127.0.0.1"
+    METRICS_TEXTFILE: Path | None = None
+    METRICS_INTERVAL_S: float = Field(default=15.0, gt=0)
+    OTLP_SPANS_FILE: Path | None = None
+    HEADLESS: bool = False  # No Rich panels/spinner (batch runs)
+    
+    # --profile: sampling interval and where collapsed-stack (flamegraph) files go
+    PROFILE_INTERVAL_MS: float = Field(default=5.0, gt=0)
+    PROFILE_DIR: Path = Field(default_factory=lambda: Path.cwd() / "output" / "profiles")
+    
+    # Benchmark runner (src/experiments/run_comparison.py): questions in flight at once.
+    # Ollama serves OLLAMA_NUM_PARALLEL requests per model; beyond that, requests queue server-side.
+    BENCH_CONCURRENCY: int = Field(default=4, gt=0)
+    
+    # Large tool payloads (src/utils/artifacts.py): messages carry an ID and a preview,
+    # the full text stays in a per-run store (LRU-capped) and is fetched on demand.
+    ARTIFACT_PREVIEW_CHARS: int = Field(default=100, ge=0)
+    ARTIFACT_MAX_BYTES: int = Field(default=16 * 1024 * 1024, gt=0)
+    
+    # Run guard (src/utils/guard.py): per-query budgets and loop detection. A tripped
+    # guard finishes with the best answer so far; 0 disables the token/time budgets.
+    GUARD_MAX_LLM_CALLS: int = Field(default=10, gt=0)
+    GUARD_MAX_TOKENS: int = Field(default=50_000, ge=0)
+    GUARD_MAX_SECONDS: float = Field(default=600.0, ge=0.0)
+    GUARD_REPEAT_LIMIT: int = Field(default=3, ge=2, description="Consecutive hand-offs to one member treated as a loop")
     
     # Optional Keys
     LLAMA_CLOUD_API_KEY: str | None = None
@@ -39,6 +133,5 @@ class Settings(BaseSettings):
         self.OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
         # RAG_DATA_PATH directory is now managed by ingestion process, not auto-created empty.
 
-# Singleton instance
+# Singleton instance (directories are created by explicit init, not at import)
 settings = Settings()
-settings.ensure_dirs()
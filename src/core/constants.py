@@ -5,10 +5,18 @@ ROLE_SUPERVISOR = "Supervisor"
 ROLE_RESEARCHER = "Researcher"
 ROLE_QUANT = "Quant"
 ROLE_FINISH = "FINISH"
+# Run guard (src/utils/guard.py): sender of the answer it surfaces when it stops a run early
+ROLE_GUARD = "Guard"
+# Senders whose tool-call-free messages count as the run's answer
+ANSWER_SENDERS = (ROLE_RESEARCHER, ROLE_QUANT, ROLE_GUARD)
 
 # Tools
 TOOL_RAG = "query_financial_rag"
 TOOL_PLOT = "create_plot"
+TOOL_FETCH = "fetch_artifact"
+TOOL_PYTHON = "run_python"
+# Member whose section of the shared system prompt documents each tool
+TOOL_OWNERS = {TOOL_RAG: ROLE_RESEARCHER, TOOL_FETCH: ROLE_RESEARCHER, TOOL_PLOT: ROLE_QUANT, TOOL_PYTHON: ROLE_QUANT}
 
 # System
 DEFAULT_MODEL = "deepseek-r1:8b"
@@ -1,20 +1,28 @@
-# src/prompts.py
+# src/core/prompts.py
 
-import os
+from functools import lru_cache
 from pathlib import Path
+from typing import Any, List, Sequence, Tuple
+
+from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage, convert_to_messages
+
+from src.core.constants import ROLE_FINISH, ROLE_QUANT, ROLE_RESEARCHER, ROLE_SUPERVISOR
+
+# Module-level: the loader runs inside the class body, before the name Prompts exists
+PROMPTS_DIR = Path(__file__).parent.parent / "prompts"
 
 class Prompts:
     """Central repository for all agent system prompts (Loaded from files)."""
     
-    BASE_DIR = Path(__file__).parent.parent / "prompts" 
+    BASE_DIR = PROMPTS_DIR
     
     @staticmethod
     def _load(filename):
         try:
              # Ensure directory exists if clean clone
-             if not Prompts.BASE_DIR.exists():
+             if not PROMPTS_DIR.exists():
                  return "System Prompt Not Found."
-             return (Prompts.BASE_DIR / filename).read_text(encoding="utf-8")
+             return (PROMPTS_DIR / filename).read_text(encoding="utf-8")
         except Exception:
              return "Error Loading Prompt."
 
@@ -23,3 +31,57 @@ class Prompts:
 
     QUANT_SYSTEM = _load.__func__("quant.txt")
 
+
+
+# --- Prompt layout ---------------------------------------------------------
+# Ollama reuses its KV cache for the longest common token prefix with the
+# previous request. Every agent therefore sends the same static system prompt
+# (all three role prompts, options rendered once), then the conversation in
+# append-only order, then one short per-role instruction as the final user
+# turn. Consecutive hops, whichever agent makes them, share everything up to
+# the end of the previous hop's history; only the new turns are prefilled.
+# The instruction is a user turn, not a system message: chat templates hoist
+# every system message to the front, which would change the prefix per role.
+
+DEFAULT_MEMBERS = (ROLE_RESEARCHER, ROLE_QUANT)
+
+_TEAM_HEADER = (
+    "You are one agent of a financial analysis team. The role instructions for every "
+    "agent follow for reference only; the last message of each request names the role "
+    "you act as now. Follow that role's section alone: tools and reply formats listed "
+    "under the other roles are not available to you."
+)
+
+
+@lru_cache(maxsize=None)
+def shared_system(members: Tuple[str, ...] = DEFAULT_MEMBERS) -> str:
+    """The static system prompt every agent sends first (identical across hops)."""
+    options = str([ROLE_FINISH, *members])
+    sections = (
+        (ROLE_SUPERVISOR, Prompts.SUPERVISOR_SYSTEM.replace("{options}", options)),
+        (ROLE_RESEARCHER, Prompts.RESEARCHER_SYSTEM),
+        (ROLE_QUANT, Prompts.QUANT_SYSTEM),
+    )
+    return _TEAM_HEADER + "".join(f"\n\n## {role}\n{text.strip()}" for role, text in sections)
+
+
+@lru_cache(maxsize=None)
+def turn_instruction(role: str, members: Tuple[str, ...] = DEFAULT_MEMBERS) -> str:
+    """The short trailing instruction naming the acting role."""
+    if role == ROLE_SUPERVISOR:
+        options = str([ROLE_FINISH, *members])
+        return (
+            f"Act as the {ROLE_SUPERVISOR}. Based on the conversation, who should act next? "
+            f"Do not call tools. Respond with 'Next: <Role>' where <Role> is one of {options}."
+        )
+    return f"Act as the {role}, following the {role} instructions above."
+
+
+def build_messages(role: str, history: Sequence[Any], members: Sequence[str] = DEFAULT_MEMBERS) -> List[BaseMessage]:
+    """Canonical request for ``role``: shared system prompt, history in order, role instruction."""
+    members = tuple(members)
+    return [
+        SystemMessage(content=shared_system(members)),
+        *convert_to_messages(history),
+        HumanMessage(content=turn_instruction(role, members)),
+    ]
@@ -2,13 +2,26 @@
 from typing import TypedDict, Annotated, Sequence, Dict, Any, Union, List
 from langchain_core.messages import BaseMessage
 import operator
+from src.utils.accounting import merge_metadata
+
+class NodeStats(TypedDict, total=False):
+    """Per-node accounting, summed over every execution of the node in a run."""
+    calls: int
+    prompt_tokens: int
+    eval_tokens: int
+    load_ms: float
+    prefill_ms: float
+    generation_ms: float
+    wall_ms: float
+    tool_calls: int
 
 class AgentMetadata(TypedDict, total=False):
-    """Metadata for execution tracking."""
+    """Metadata for execution tracking (run totals plus the per-node breakdown)."""
     token_usage: int
     latency_ms: float
     step: int
     tool_calls: int
+    nodes: Dict[str, NodeStats]
 
 class AgentState(TypedDict):
     """
@@ -23,8 +36,14 @@ class AgentState(TypedDict):
     # sender: The agent who sent the last message
     sender: str
     
-    # metadata: Execution statistics and tracing info
-    metadata: AgentMetadata
+    # metadata: Execution statistics and tracing info (merged across nodes)
+    metadata: Annotated[AgentMetadata, merge_metadata]
+
+    # routes: Every Supervisor routing decision, in order (loop detection)
+    routes: Annotated[List[str], operator.add]
+
+    # guard: Set when the run guard stopped the run early (reason, llm_calls, calls_cut)
+    guard: Dict[str, Any]
 
 class FinancialData(TypedDict):
     """Structured representation of financial data for plotting."""
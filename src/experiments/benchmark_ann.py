@@ -0,0 +1,118 @@
+import argparse
+import time
+from typing import Dict, List, Any, Optional
+
+import numpy as np
+
+from src.retrieval.ann import IVFIndex, exact_search, _normalize
+
+
+def make_corpus(n: int, dim: int, n_clusters: int = 2048, spread: float = 1.0, seed: int = 0) -> np.ndarray:
+    """
+    Synthetic embedding corpus: a Gaussian mixture on the unit sphere.
+    Real sentence embeddings are strongly clustered (by topic, filing, section),
+    so uniform noise would understate what IVF achieves in practice.
+    """
+    rng = np.random.default_rng(seed)
+    centers = _normalize(rng.standard_normal((n_clusters, dim), dtype=np.float32))
+    out = np.empty((n, dim), dtype=np.float32)
+    chunk = 100_000
+    for start in range(0, n, chunk):
+        size = min(chunk, n - start)
+        labels = rng.integers(0, n_clusters, size)
+        noise = rng.standard_normal((size, dim), dtype=np.float32) * (spread / np.sqrt(dim))
+        out[start:start + size] = centers[labels] + noise
+    return _normalize(out)
+
+
+def make_queries(corpus: np.ndarray, n_queries: int, noise: float = 0.3, seed: int = 1) -> np.ndarray:
+    """Queries are perturbed corpus points, mimicking paraphrased questions."""
+    rng = np.random.default_rng(seed)
+    picks = corpus[rng.choice(corpus.shape[0], n_queries, replace=False)]
+    return _normalize(picks + rng.standard_normal(picks.shape, dtype=np.float32) * (noise / np.sqrt(corpus.shape[1])))
+
+
+def benchmark_size(
+    corpus: np.ndarray,
+    queries: np.ndarray,
+    k: int,
+    nprobes: List[int],
+    nlist: int = 0,
+) -> List[Dict[str, Any]]:
+    """
+    Measures exact vs IVF search on one corpus size.
+
+    Returns:
+        List[Dict[str, Any]]: One row per nprobe with recall@k and queries/sec.
+    """
+    n = corpus.shape[0]
+    ids = np.arange(n).astype(str)
+
+    # Ground truth + exact throughput
+    start = time.perf_counter()
+    truth = [set(exact_search(corpus, q, k)[0].tolist()) for q in queries]
+    exact_qps = len(queries) / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    ann = IVFIndex(nlist=nlist).build(ids, corpus)
+    build_s = time.perf_counter() - start
+
+    rows = []
+    for nprobe in nprobes:
+        start = time.perf_counter()
+        hits = [ann.search(q, k, nprobe=nprobe)[0] for q in queries]
+        ann_qps = len(queries) / (time.perf_counter() - start)
+        recall = np.mean([len(truth[i] & {int(x) for x in hit}) / k for i, hit in enumerate(hits)])
+        rows.append({
+            "n": n,
+            "nlist": ann.nlist,
+            "nprobe": nprobe,
+            "build_s": build_s,
+            f"recall@{k}": float(recall),
+            "exact_qps": exact_qps,
+            "ann_qps": ann_qps,
+            "speedup": ann_qps / exact_qps,
+        })
+    return rows
+
+
+def print_table(rows: List[Dict[str, Any]], k: int) -> None:
+    header = f"{'chunks':>9} {'nlist':>6} {'nprobe':>6} {'build(s)':>9} {'recall@' + str(k):>10} {'exact q/s':>10} {'ann q/s':>10} {'speedup':>8}"
+    print(header)
+    print("-" * len(header))
+    for r in rows:
+        print(
+            f"{r['n']:>9} {r['nlist']:>6} {r['nprobe']:>6} {r['build_s']:>9.2f} "
+            f"{r[f'recall@{k}']:>10.3f} {r['exact_qps']:>10.1f} {r['ann_qps']:>10.1f} {r['speedup']:>7.1f}x"
+        )
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Benchmark IVF ANN search against exact search")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--dim", type=int, default=384, help="Embedding dimension (bge-large is 1024; 1M x 1024 needs ~8GB RAM)")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--nlist", type=int, default=0, help="IVF cells (0 = sqrt(N))")
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 4, 8, 16, 32])
+    parser.add_argument("--embeddings", type=str, default=None, help="Optional .npy of real embeddings (overrides --sizes max)")
+    args = parser.parse_args(argv)
+
+    if args.embeddings:
+        base = _normalize(np.load(args.embeddings))
+    else:
+        base = make_corpus(max(args.sizes), args.dim)
+
+    rows: List[Dict[str, Any]] = []
+    for size in args.sizes:
+        corpus = base[:size]
+        queries = make_queries(corpus, min(args.queries, size))
+        print(f"Benchmarking {size} chunks (dim={corpus.shape[1]})...")
+        rows.extend(benchmark_size(corpus, queries, args.k, args.nprobe, args.nlist))
+
+    print("\n=== ANN Benchmark (IVF vs Exact) ===")
+    print_table(rows, args.k)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,12 @@
-
 import json
+import math
 import re
+import sys
 import argparse
-from typing import List, Dict, Any
+from typing import Any, Dict, IO, Iterable, Iterator, List, Optional
+
+# Compiled once: scoring runs these on every row of a sweep
+_NUMBER_RE = re.compile(r"[-+]?\d*\.\d+|\d+")
 
 def normalize_number(s: str) -> float:
     """
@@ -12,7 +16,7 @@ def normalize_number(s: str) -> float:
     # Remove commas
     s = s.replace(",", "")
     # Find float pattern
-    match = re.search(r"[-+]?\d*\.\d+|\d+", s)
+    match = _NUMBER_RE.search(s)
     if match:
         return float(match.group())
     return None
@@ -20,91 +24,236 @@ def normalize_number(s: str) -> float:
 def check_exact_match(model_answer: str, ground_truth: str) -> bool:
     """
     Evaluates if the model answer semantically contains the ground truth.
-    
+
     Methodology:
     1. Numerical Equivalence: Extracts floats and checks for equality within epsilon tolerance (1e-2).
     2. String Inclusion: For non-numeric truths, checks for case-insensitive substring existence.
-    
+
     Args:
         model_answer (str): The raw output from the LLM.
         ground_truth (str): The expected answer/value.
-        
+
     Returns:
         bool: True if the answer is judged correct, False otherwise.
     """
     if not ground_truth or ground_truth == "N/A":
         return False
-        
+
     # Strategy 1: Numerical Match
     gt_val = normalize_number(str(ground_truth))
     if gt_val is not None:
         # Remove commas from model answer for regex
         answer_clean = model_answer.replace(",", "")
-        numbers = re.findall(r"[-+]?\d*\.\d+|\d+", answer_clean)
-        
-        for num_str in numbers:
-            try:
-                val = float(num_str)
-                if abs(val - gt_val) < 0.01: # Epsilon tolerance
-                    return True
-            except:
-                continue
-    
+        for match in _NUMBER_RE.finditer(answer_clean):
+            if abs(float(match.group()) - gt_val) < 0.01: # Epsilon tolerance
+                return True
+
     # Strategy 2: Text Match (Fallback for qualitative answers)
     # If no number found in GT (or even if found, maybe the text context matters?)
     # For now, if numeric matching failed (or wasn't applicable), try naive inclusion.
     if str(ground_truth).lower() in model_answer.lower():
         return True
-        
+
     return False
 
+class LatencyHistogram:
+    """
+    Log-bucketed latency histogram: constant memory however many rows are
+    added, percentiles within ``growth - 1`` relative error (1% by default).
+    Values outside [min_s, max_s] are clamped into the edge buckets.
+    """
+
+    def __init__(self, min_s: float = 1e-3, max_s: float = 1e4, growth: float = 1.01) -> None:
+        self.min_s, self.growth = min_s, growth
+        self._log_growth = math.log(growth)
+        self.counts = [0] * (int(math.log(max_s / min_s) / self._log_growth) + 1)
+        self.count = 0
+        self.min = math.inf
+        self.max = 0.0
+
+    def _bucket(self, value: float) -> int:
+        if value <= self.min_s:
+            return 0
+        return min(int(math.log(value / self.min_s) / self._log_growth), len(self.counts) - 1)
+
+    def _upper(self, bucket: int) -> float:
+        return self.min_s * self.growth ** (bucket + 1)
+
+    def add(self, value: float) -> None:
+        self.counts[self._bucket(value)] += 1
+        self.count += 1
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def percentile(self, q: float) -> float:
+        """Nearest-rank percentile (q in 0-100); 0.0 when empty."""
+        if not self.count:
+            return 0.0
+        rank = max(1, math.ceil(q / 100 * self.count))
+        seen = 0
+        for bucket, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank:
+                # Geometric midpoint of the bucket, kept inside the observed range
+                mid = self.min_s * self.growth ** (bucket + 0.5)
+                return min(max(mid, self.min), self.max)
+        return self.max
+
+    def render(self, width: int = 40) -> List[str]:
+        """ASCII bars over 1-2-5 second boundaries, e.g. ``<=  2.0s  ######  12``."""
+        if not self.count:
+            return []
+        edges, decade = [], 10 ** math.floor(math.log10(max(self.min, self.min_s)))
+        while not edges or edges[-1] < self.max:
+            edges.extend(decade * m for m in (1, 2, 5))
+            decade *= 10
+        edges = [e for e in edges if e >= self.min] or [edges[-1]]
+        bins = [0] * len(edges)
+        for bucket, n in enumerate(self.counts):
+            if n:
+                upper = min(self._upper(bucket), self.max)
+                bins[next((i for i, e in enumerate(edges) if upper <= e), len(edges) - 1)] += n
+        peak = max(bins)
+        return [f"<= {edge:>7g}s {'#' * max(1 if n else 0, round(n / peak * width)):<{width}} {n}" for edge, n in zip(edges, bins)]
+
+class PipelineStats:
+    """One-pass accumulator for a pipeline's rows (no rows are retained)."""
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.correct = 0
+        self.latency_sum = 0.0
+        self.tokens_sum = 0
+        self.llm_calls_sum = 0
+        self.latency = LatencyHistogram()
+
+    def add(self, row: Dict[str, Any], is_correct: bool) -> None:
+        latency = row.get("latency_s", 0)
+        self.count += 1
+        self.correct += is_correct
+        self.latency_sum += latency
+        self.tokens_sum += row.get("tokens", 0)
+        self.llm_calls_sum += row.get("llm_calls", 0)
+        self.latency.add(latency)
+
+    def summary(self) -> Dict[str, Any]:
+        n = self.count or 1
+        return {
+            "accuracy": self.correct / n,
+            "avg_latency": self.latency_sum / n,
+            "p50_latency": self.latency.percentile(50),
+            "p95_latency": self.latency.percentile(95),
+            "p99_latency": self.latency.percentile(99),
+            "avg_tokens": self.tokens_sum / n,
+            "avg_llm_calls": self.llm_calls_sum / n,
+            "total_samples": self.count,
+        }
+
+def iter_results(path: str) -> Iterator[Dict[str, Any]]:
+    """Yields result rows: JSONL is streamed line by line; a JSON array file is loaded whole."""
+    with open(path, "r", encoding="utf-8") as f:
+        if not path.endswith(".jsonl"):
+            yield from json.load(f)
+            return
+        for line in f:
+            if line.strip():
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # line torn by an interrupted run
+
+def score_stream(rows: Iterable[Dict[str, Any]], scored_out: Optional[IO[str]] = None) -> Dict[str, PipelineStats]:
+    """
+    Scores rows in one pass, per pipeline (rows without one count as ``"all"``).
+    Each row is annotated with ``is_correct`` and, if ``scored_out`` is given,
+    written there as one JSONL line.
+    """
+    stats: Dict[str, PipelineStats] = {}
+    for row in rows:
+        row["is_correct"] = check_exact_match(row.get("model_answer", ""), row.get("ground_truth", ""))
+        stats.setdefault(row.get("pipeline", "all"), PipelineStats()).add(row, row["is_correct"])
+        if scored_out is not None:
+            scored_out.write(json.dumps(row) + "\n")
+    return stats
+
 def calculate_metrics(results: List[Dict[str, Any]]) -> Dict[str, Any]:
-    total = len(results)
-    if total == 0:
-        return {"accuracy": 0, "avg_latency": 0}
-        
-    correct_count = 0
-    total_latency = 0
-    
+    """Metrics over ``results`` taken as one group; rows are annotated with ``is_correct``."""
+    stats = PipelineStats()
     for row in results:
-        is_correct = check_exact_match(row.get("model_answer", ""), row.get("ground_truth", ""))
-        row["is_correct"] = is_correct # Annotate result
-        if is_correct:
-            correct_count += 1
-        total_latency += row.get("latency_s", 0)
-        
-    return {
-        "accuracy": correct_count / total,
-        "avg_latency": total_latency / total,
-        "total_samples": total
-    }
+        row["is_correct"] = check_exact_match(row.get("model_answer", ""), row.get("ground_truth", ""))
+        stats.add(row, row["is_correct"])
+    return stats.summary()
+
+def diff_runs(baseline: Dict[str, Dict[str, Any]], current: Dict[str, Dict[str, Any]], threshold: float) -> List[str]:
+    """
+    Latency regressions between two runs' per-pipeline summaries: any of
+    p50/p95/p99 more than ``threshold`` (fraction) above the baseline.
+    """
+    regressions = []
+    for pipeline in sorted(baseline.keys() & current.keys()):
+        for key in ("p50_latency", "p95_latency", "p99_latency"):
+            before, after = baseline[pipeline][key], current[pipeline][key]
+            if before > 0 and after > before * (1 + threshold):
+                regressions.append(f"{pipeline} {key[:3]}: {before:.2f}s -> {after:.2f}s ({after / before - 1:+.0%})")
+    return regressions
+
+def _summaries(stats: Dict[str, PipelineStats]) -> Dict[str, Dict[str, Any]]:
+    return {pipeline: s.summary() for pipeline, s in stats.items()}
 
 def main():
     parser = argparse.ArgumentParser(description="Calculate metrics for RAG experiment")
-    parser.add_argument("input_file", help="Path to JSON results file")
+    parser.add_argument("input_file", help="Path to JSON or JSONL results file")
+    parser.add_argument("--baseline", help="Earlier results file to diff latency percentiles against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Relative latency increase flagged as a regression (default 0.10)")
+    parser.add_argument("--histogram", action="store_true", help="Print a latency histogram per pipeline")
+    parser.add_argument("--no-write", action="store_true", help="Do not write the *_scored file")
     args = parser.parse_args()
-    
+
     try:
-        with open(args.input_file, "r", encoding="utf-8") as f:
-            data = json.load(f)
-            
-        metrics = calculate_metrics(data)
-        
+        stem, ext = args.input_file.rsplit(".", 1)
+        output_file = f"{stem}_scored.{ext}"
+        if args.no_write:
+            stats = score_stream(iter_results(args.input_file))
+        elif ext == "jsonl":
+            # Stream scored rows straight back out: memory stays flat however large the sweep
+            with open(output_file, "w", encoding="utf-8") as out:
+                stats = score_stream(iter_results(args.input_file), out)
+        else:
+            data = list(iter_results(args.input_file))
+            stats = score_stream(data)
+            with open(output_file, "w", encoding="utf-8") as f:
+                json.dump(data, f, indent=2)
+
+        summaries = _summaries(stats)
         print("\n=== Evaluation Metrics ===")
         print(f"Input File: {args.input_file}")
-        print(f"Total Samples: {metrics['total_samples']}")
-        print(f"Exact Match Accuracy: {metrics['accuracy']:.2%}")
-        print(f"Average Latency: {metrics['avg_latency']:.4f}s")
+        print(f"{'Pipeline':<22} {'N':>5} {'Accuracy':>9} {'Mean':>8} {'p50':>8} {'p95':>8} {'p99':>8}")
+        for pipeline, m in summaries.items():
+            print(
+                f"{pipeline:<22} {m['total_samples']:>5} {m['accuracy']:>9.2%} {m['avg_latency']:>7.2f}s "
+                f"{m['p50_latency']:>7.2f}s {m['p95_latency']:>7.2f}s {m['p99_latency']:>7.2f}s"
+            )
+            if args.histogram:
+                print("\n".join("    " + line for line in stats[pipeline].latency.render()))
         print("==========================\n")
-        
-        # Optionally save annotated results
-        output_file = args.input_file.replace(".json", "_scored.json")
-        with open(output_file, "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=2)
-        print(f"Scored results saved to: {output_file}")
-        
-    except Exception as e:
+        if not args.no_write:
+            print(f"Scored results saved to: {output_file}")
+
+        if args.baseline:
+            baseline = _summaries(score_stream(iter_results(args.baseline)))
+            regressions = diff_runs(baseline, summaries, args.threshold)
+            for pipeline in sorted(baseline.keys() & summaries.keys()):
+                delta = summaries[pipeline]["accuracy"] - baseline[pipeline]["accuracy"]
+                print(f"[{pipeline}] accuracy {delta:+.2%} vs {args.baseline}")
+            if regressions:
+                print(f"Latency regressions (> {args.threshold:.0%}):")
+                print("\n".join(f"  {line}" for line in regressions))
+                sys.exit(1)
+            print(f"No latency regressions beyond {args.threshold:.0%}.")
+
+    except (OSError, ValueError) as e:
         print(f"Error calculating metrics: {e}")
+        sys.exit(2)
 
 if __name__ == "__main__":
     main()
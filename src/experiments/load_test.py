@@ -0,0 +1,301 @@
+# src/experiments/load_test.py
+"""
+Load generator for the swarm: drives the compiled graph in-process at a series
+of load levels and records, per request, queue wait, per-node latency and
+end-to-end latency. Each level is summarised into a saturation curve
+(throughput and latency percentiles versus offered load).
+
+Closed loop (N analysts issuing back-to-back questions):
+    python -m src.experiments.load_test --concurrency 1,2,4,8 --duration 60
+Open loop (Poisson arrivals served by a fixed number of in-flight slots):
+    python -m src.experiments.load_test --rate 0.05,0.1,0.2 --workers 4 --duration 300
+Offline (scripted LLM and simulated retrieval, no Ollama or GPU):
+    python -m src.experiments.load_test --backend fake --fake-llm tests/data/fake_llm_script.json --concurrency 1,4,16
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import random
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from src.core.config import settings
+from src.experiments.evaluate_metrics import LatencyHistogram
+from src.experiments.run_comparison import load_questions
+
+logger = logging.getLogger("LoadTest")
+
+
+class SimulatedRAG:
+    """Stand-in for RAGAdapter under ``--backend fake``: fixed retrieval + synthesis latency, canned context."""
+
+    def __init__(self, latency_s: float) -> None:
+        self.latency_s = latency_s
+
+    async def aquery(self, question: str) -> Dict[str, Any]:
+        await asyncio.sleep(self.latency_s)
+        return {
+            "model_answer": f"Simulated context for: {question}\nRevenue: $26.97B (FY2023), $60.92B (FY2024).",
+            "source_nodes": [],
+            "latency_s": self.latency_s,
+        }
+
+    def prefetch(self, question: str) -> None:
+        pass
+
+    def cancel_prefetch(self, question: str) -> None:
+        pass
+
+
+class _NullCache:
+    """RAG cache that never hits, so repeated questions still do the full retrieval work."""
+
+    def get(self, key: Any, default: Any = None) -> Any:
+        return default
+
+    def set(self, key: Any, value: Any, **kwargs: Any) -> bool:
+        return True
+
+    def __contains__(self, key: Any) -> bool:
+        return False
+
+
+def build_backend(args: argparse.Namespace) -> Tuple[Any, Optional[Any]]:
+    """
+    Chat model for the graph, plus the RAG adapter the run binds with
+    ``adapter_scope`` (SimulatedRAG under ``--backend fake``; an uncached
+    RAGAdapter unless ``--rag-cache``; None keeps the process-wide adapter).
+    """
+    if args.backend == "fake":
+        from src.testing.fake_llm import FakeChatOllama, ScriptedResponder
+
+        rag = SimulatedRAG(args.rag_ms / 1000)
+        if args.fake_llm is not None:
+            return FakeChatOllama.from_file(args.fake_llm), rag
+        return FakeChatOllama(responder=ScriptedResponder()), rag
+
+    from src.llm_client import chat_model
+    from src.rag_adapter import RAGAdapter
+
+    rag = None
+    if not args.rag_cache:
+        rag = RAGAdapter()
+        rag.cache = _NullCache()
+    return chat_model(), rag
+
+
+async def run_request(graph: Any, question: str) -> Dict[str, Any]:
+    """One question through the graph; returns its merged AgentState metadata and whether it answered."""
+    from src.core.constants import ANSWER_SENDERS
+    from src.utils.accounting import merge_metadata
+    from src.utils.artifacts import artifact_scope
+    from src.utils.guard import recursion_limit
+
+    metadata: Dict[str, Any] = {}
+    answered = False
+    with artifact_scope():
+        async for step in graph.astream({"messages": [("user", question)]}, {"recursion_limit": recursion_limit()}):
+            for update in step.values():
+                metadata = merge_metadata(metadata, update.get("metadata"))
+                messages = update.get("messages") or []
+                if messages and not getattr(messages[-1], "tool_calls", None) and update.get("sender") in ANSWER_SENDERS:
+                    answered = True
+    return {"metadata": metadata, "answered": answered}
+
+
+class LevelRecorder:
+    """Per-level accumulators plus the raw per-request rows (written as JSONL)."""
+
+    def __init__(self, level: str, out: Any) -> None:
+        self.level = level
+        self.out = out
+        self.e2e = LatencyHistogram()
+        self.queue = LatencyHistogram()
+        self.nodes: Dict[str, LatencyHistogram] = {}
+        self.completed = 0
+        self.errors = 0
+        self.no_answer = 0
+        self.first_arrival: Optional[float] = None
+        self.last_end = 0.0
+
+    async def measure(self, graph: Any, question: str, arrived: float, slots: Optional[asyncio.Semaphore]) -> None:
+        if slots is not None:
+            await slots.acquire()
+        started = time.perf_counter()
+        self.first_arrival = arrived if self.first_arrival is None else min(self.first_arrival, arrived)
+        row: Dict[str, Any] = {"level": self.level, "question": question, "queue_wait_s": started - arrived}
+        try:
+            result = await run_request(graph, question)
+            row["nodes_ms"] = {name: stats.get("wall_ms", 0.0) for name, stats in result["metadata"].get("nodes", {}).items()}
+            row["tokens"] = result["metadata"].get("token_usage", 0)
+            row["answered"] = result["answered"]
+        except Exception as e:
+            row["error"] = f"{type(e).__name__}: {e}"
+        finally:
+            if slots is not None:
+                slots.release()
+        ended = time.perf_counter()
+        row["e2e_s"] = ended - arrived
+        self.last_end = max(self.last_end, ended)
+        if "error" in row:
+            self.errors += 1
+        else:
+            self.completed += 1
+            self.no_answer += not row["answered"]
+            self.e2e.add(row["e2e_s"])
+            self.queue.add(row["queue_wait_s"])
+            for name, ms in row["nodes_ms"].items():
+                self.nodes.setdefault(name, LatencyHistogram()).add(ms / 1000)
+        self.out.write(json.dumps(row) + "\n")
+
+    def summary(self, offered: float) -> Dict[str, Any]:
+        elapsed = self.last_end - (self.first_arrival or self.last_end)
+        return {
+            "level": self.level,
+            "offered": offered,
+            "completed": self.completed,
+            "errors": self.errors,
+            "no_answer": self.no_answer,
+            "throughput_qps": self.completed / elapsed if elapsed > 0 else 0.0,
+            "e2e_p50_s": self.e2e.percentile(50),
+            "e2e_p95_s": self.e2e.percentile(95),
+            "e2e_p99_s": self.e2e.percentile(99),
+            "queue_wait_p95_s": self.queue.percentile(95),
+            **{f"{name}_p95_s": hist.percentile(95) for name, hist in sorted(self.nodes.items())},
+        }
+
+
+async def closed_loop(graph: Any, questions: List[str], users: int, duration_s: float, recorder: LevelRecorder) -> None:
+    """``users`` analysts, each asking the next question as soon as the previous one is answered."""
+    deadline = time.perf_counter() + duration_s
+    counter = itertools.count()
+
+    async def analyst() -> None:
+        while time.perf_counter() < deadline:
+            question = questions[next(counter) % len(questions)]
+            await recorder.measure(graph, question, time.perf_counter(), None)
+
+    await asyncio.gather(*(analyst() for _ in range(users)))
+
+
+async def open_loop(graph: Any, questions: List[str], rate: float, workers: int, duration_s: float,
+                    recorder: LevelRecorder, rng: random.Random) -> None:
+    """Poisson arrivals at ``rate``/s for ``duration_s``, at most ``workers`` in flight; excess arrivals queue."""
+    slots = asyncio.Semaphore(workers)
+    tasks = []
+    start = time.perf_counter()
+    next_arrival = start + rng.expovariate(rate)
+    i = 0
+    while next_arrival < start + duration_s:
+        await asyncio.sleep(max(0.0, next_arrival - time.perf_counter()))
+        question = questions[i % len(questions)]
+        tasks.append(asyncio.create_task(recorder.measure(graph, question, next_arrival, slots)))
+        i += 1
+        next_arrival += rng.expovariate(rate)
+    await asyncio.gather(*tasks)
+
+
+def print_curve(rows: Sequence[Dict[str, Any]], unit: str) -> None:
+    print("\n=== Saturation Curve ===")
+    print(f"{unit:>10} {'Done':>6} {'Err':>5} {'q/s':>7} {'p50':>8} {'p95':>8} {'p99':>8} {'Queue p95':>10}")
+    peak = max((r["throughput_qps"] for r in rows), default=0.0) or 1.0
+    for r in rows:
+        bar = "#" * round(r["throughput_qps"] / peak * 20)
+        print(
+            f"{r['offered']:>10g} {r['completed']:>6} {r['errors']:>5} {r['throughput_qps']:>7.2f} "
+            f"{r['e2e_p50_s']:>7.2f}s {r['e2e_p95_s']:>7.2f}s {r['e2e_p99_s']:>7.2f}s {r['queue_wait_p95_s']:>9.2f}s  {bar}"
+        )
+    print("========================\n")
+
+
+def plot_curve(rows: Sequence[Dict[str, Any]], unit: str, path: Path) -> None:
+    """Throughput and p95/p99 latency versus offered load, one PNG."""
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    x = [r["offered"] for r in rows]
+    fig, ax = plt.subplots(figsize=(8, 5))
+    ax.plot(x, [r["throughput_qps"] for r in rows], "o-", color="tab:blue", label="throughput")
+    ax.set_xlabel(unit)
+    ax.set_ylabel("completed questions/s", color="tab:blue")
+    latency = ax.twinx()
+    latency.plot(x, [r["e2e_p95_s"] for r in rows], "s--", color="tab:red", label="p95")
+    latency.plot(x, [r["e2e_p99_s"] for r in rows], "^:", color="tab:orange", label="p99")
+    latency.set_ylabel("end-to-end latency (s)", color="tab:red")
+    fig.legend(loc="upper left")
+    ax.set_title("Swarm saturation curve")
+    fig.tight_layout()
+    fig.savefig(path, dpi=100)
+    plt.close(fig)
+
+
+async def run_load_test(args: argparse.Namespace) -> List[Dict[str, Any]]:
+    from src.graph import build_graph
+    from src.rag_adapter import adapter_scope
+
+    llm, rag = build_backend(args)
+    graph = build_graph(llm)
+    if args.backend == "ollama" and settings.LLM_WARMUP:
+        from src.llm_client import agent_prefixes, warm_up
+        # The first level should not measure a model load
+        await warm_up(agent_prefixes())
+    questions = [q["question"] for q in load_questions(args.questions)]
+    rng = random.Random(args.seed)
+    open_mode = args.rate is not None
+    levels = [float(v) for v in (args.rate if open_mode else args.concurrency).split(",")]
+    unit = "arrivals/s" if open_mode else "analysts"
+
+    run_dir = Path(args.output) / time.strftime("%Y%m%d-%H%M%S")
+    run_dir.mkdir(parents=True, exist_ok=True)
+    curve = []
+    # Request tasks are created inside the scope, so they all query ``rag``
+    with adapter_scope(rag), open(run_dir / "requests.jsonl", "w", encoding="utf-8") as out:
+        for level in levels:
+            label = f"{unit}={level:g}"
+            logger.info(f"Level {label} for {args.duration:g}s...")
+            recorder = LevelRecorder(label, out)
+            if open_mode:
+                await open_loop(graph, questions, level, args.workers, args.duration, recorder, rng)
+            else:
+                await closed_loop(graph, questions, int(level), args.duration, recorder)
+            curve.append(recorder.summary(level))
+            out.flush()
+            logger.info(f"Level {label}: {curve[-1]['completed']} done, {curve[-1]['throughput_qps']:.2f} q/s, p95 {curve[-1]['e2e_p95_s']:.2f}s")
+    from src.llm_client import close_pools
+    await close_pools()
+
+    (run_dir / "saturation.json").write_text(json.dumps(curve, indent=2), encoding="utf-8")
+    print_curve(curve, unit)
+    if not args.no_plot:
+        plot_curve(curve, unit, run_dir / "saturation.png")
+    print(f"Per-request rows and curve: {run_dir}")
+    return curve
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Swarm load test: throughput/latency saturation curves")
+    load = parser.add_mutually_exclusive_group()
+    load.add_argument("--concurrency", default="1,2,4,8", help="Closed loop: comma-separated analyst counts")
+    load.add_argument("--rate", default=None, help="Open loop: comma-separated Poisson arrival rates (questions/s)")
+    parser.add_argument("--workers", type=int, default=settings.BENCH_CONCURRENCY, help="Open loop: questions in flight at once")
+    parser.add_argument("--duration", type=float, default=60.0, help="Seconds per load level")
+    parser.add_argument("--backend", choices=["ollama", "fake"], default="ollama")
+    parser.add_argument("--fake-llm", type=Path, default=None, metavar="SCRIPT", help="Scripted LLM for --backend fake (src/testing)")
+    parser.add_argument("--rag-ms", type=float, default=200.0, help="Simulated retrieval latency for --backend fake")
+    parser.add_argument("--rag-cache", action="store_true", help="Let repeated questions hit the RAG answer cache")
+    parser.add_argument("--questions", default="data/benchmark_n50.json", help="Question set (run_comparison format)")
+    parser.add_argument("--output", default=str(settings.OUTPUT_DIR / "loadtest"))
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-plot", action="store_true")
+    args = parser.parse_args()
+
+    settings.ensure_dirs()
+    asyncio.run(run_load_test(args))
+
+
+if __name__ == "__main__":
+    main()
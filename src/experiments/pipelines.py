@@ -0,0 +1,186 @@
+# src/experiments/pipelines.py
+"""
+Pipeline configurations compared by run_comparison.py. Every pipeline is
+built from the same documents, the same embedding model instance and the same
+LLM client, passed explicitly (no global LlamaIndex ``Settings``), so the
+harness can run next to the swarm's own RAGAdapter.
+"""
+import hashlib
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+from llama_index.core import SimpleDirectoryReader, VectorStoreIndex
+from llama_index.core.instrumentation import get_dispatcher
+from llama_index.core.instrumentation.event_handlers import BaseEventHandler
+from llama_index.core.instrumentation.events import BaseEvent
+from llama_index.core.instrumentation.events.llm import LLMChatEndEvent, LLMCompletionEndEvent
+from llama_index.core.node_parser import SentenceSplitter
+from llama_index.core.query_engine import RetrieverQueryEngine
+from llama_index.core.schema import BaseNode, MetadataMode
+
+from src.core.config import settings
+
+PIPELINES = ("standard", "table", "hybrid", "swarm")
+PIPELINE_NAMES = {"standard": "Standard", "table": "Table-Aware", "hybrid": "Hybrid", "swarm": "Swarm"}
+
+# Per-question LLM usage; set by track_usage(), filled by the LlamaIndex event handler and SwarmPipeline
+_usage_var: ContextVar[Optional[Dict[str, int]]] = ContextVar("bench_usage", default=None)
+
+
+class _LLMUsageHandler(BaseEventHandler):
+    """Counts LlamaIndex LLM calls and Ollama token counts into the current question's usage."""
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "BenchLLMUsageHandler"
+
+    def handle(self, event: BaseEvent, **kwargs: Any) -> None:
+        if not isinstance(event, (LLMChatEndEvent, LLMCompletionEndEvent)):
+            return
+        usage = _usage_var.get()
+        if usage is None or event.response is None:
+            return
+        raw = getattr(event.response, "raw", None) or {}
+        usage["llm_calls"] += 1
+        usage["tokens"] += int(raw.get("prompt_eval_count") or 0) + int(raw.get("eval_count") or 0)
+
+
+_handler_installed = False
+
+
+@contextmanager
+def track_usage() -> Iterator[Dict[str, int]]:
+    """Collects ``tokens`` and ``llm_calls`` for the LLM work done inside the block (task-local)."""
+    global _handler_installed
+    if not _handler_installed:
+        get_dispatcher().add_event_handler(_LLMUsageHandler())
+        _handler_installed = True
+    usage = {"tokens": 0, "llm_calls": 0}
+    token = _usage_var.set(usage)
+    try:
+        yield usage
+    finally:
+        _usage_var.reset(token)
+
+
+def embed_shared(nodes: Sequence[BaseNode], embed_model: Any, cache: Dict[str, List[float]]) -> None:
+    """
+    Fills ``node.embedding`` from ``cache`` (keyed by chunk text), embedding only
+    texts no earlier pipeline has seen. VectorStoreIndex skips nodes that already
+    carry an embedding, so chunks shared between splitters are embedded once.
+    """
+    texts = {}
+    for node in nodes:
+        text = node.get_content(metadata_mode=MetadataMode.EMBED)
+        key = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        if key not in cache:
+            texts[key] = text
+    if texts:
+        vectors = embed_model.get_text_embedding_batch(list(texts.values()))
+        cache.update(zip(texts.keys(), vectors))
+    for node in nodes:
+        text = node.get_content(metadata_mode=MetadataMode.EMBED)
+        node.embedding = cache[hashlib.sha256(text.encode("utf-8")).hexdigest()]
+
+
+class SwarmPipeline:
+    """
+    The full LangGraph swarm behind a query-engine-like ``aquery``. The answer is
+    the last agent message without tool calls, as in main.py; token and LLM-call
+    counts come from the run's AgentState metadata.
+    """
+
+    def __init__(self, chat_model: Any, embed_model: Any) -> None:
+        import tempfile
+        import diskcache as dc
+        from src.graph import build_graph
+        from src.rag_adapter import RAGAdapter
+
+        # Its own adapter (the process-wide one is left alone): the harness's embedding model,
+        # and a throwaway RAG cache so earlier runs cannot answer
+        self._cache_dir = tempfile.mkdtemp(prefix="swarm_rag_cache_")
+        self.adapter = RAGAdapter()
+        self.adapter.embed_model = embed_model
+        self.adapter.cache = dc.Cache(self._cache_dir)
+        self.graph = build_graph(chat_model)
+
+    def close(self) -> None:
+        """Closes and deletes the throwaway RAG cache."""
+        import shutil
+
+        self.adapter.close()
+        shutil.rmtree(self._cache_dir, ignore_errors=True)
+
+    async def aquery(self, question: str) -> str:
+        from src.core.constants import ANSWER_SENDERS
+        from src.rag_adapter import adapter_scope
+        from src.utils.accounting import merge_metadata
+        from src.utils.artifacts import artifact_scope
+        from src.utils.guard import recursion_limit
+
+        answer, metadata = "", {}
+        with artifact_scope(), adapter_scope(self.adapter):
+            async for step in self.graph.astream({"messages": [("user", question)]}, {"recursion_limit": recursion_limit()}):
+                for update in step.values():
+                    metadata = merge_metadata(metadata, update.get("metadata"))
+                    messages = update.get("messages") or []
+                    if messages and not getattr(messages[-1], "tool_calls", None) and update.get("sender") in ANSWER_SENDERS:
+                        answer = messages[-1].content
+        usage = _usage_var.get()
+        if usage is not None:
+            usage["tokens"] += metadata.get("token_usage", 0)
+            usage["llm_calls"] += sum(s.get("calls", 0) for name, s in metadata.get("nodes", {}).items() if name != "tools")
+        return answer
+
+
+def build_pipelines(data_path: str, names: Sequence[str], reranker: Any = None) -> Dict[str, Any]:
+    """
+    Builds the requested pipelines (keys of ``PIPELINE_NAMES``) over ``data_path``.
+    The embedding model, LLM clients, source documents and chunk embeddings are shared.
+    """
+    from llama_index.embeddings.huggingface import HuggingFaceEmbedding
+    from src.llm_client import chat_model, index_llm
+    from src.retrieval.chunking import TableAwareSplitter
+    from src.retrieval.rerank import RerankingRetriever
+    from src.retrieval.retrievers import BM25Retriever, HybridRetriever
+
+    embed_model = HuggingFaceEmbedding(model_name=settings.EMBEDDING_MODEL)
+    llm = index_llm()
+    documents = SimpleDirectoryReader(input_files=[str(data_path)]).load_data()
+    cache: Dict[str, List[float]] = {}
+    pipelines: Dict[str, Any] = {}
+
+    def engine(retriever: Any) -> RetrieverQueryEngine:
+        return RetrieverQueryEngine.from_args(retriever, llm=llm)
+
+    if "standard" in names:
+        nodes = SentenceSplitter().get_nodes_from_documents(documents)
+        embed_shared(nodes, embed_model, cache)
+        index = VectorStoreIndex(nodes, embed_model=embed_model)
+        pipelines[PIPELINE_NAMES["standard"]] = engine(index.as_retriever(similarity_top_k=settings.RAG_TOP_K))
+
+    if {"table", "hybrid"} & set(names):
+        nodes = TableAwareSplitter().get_nodes_from_documents(documents)
+        embed_shared(nodes, embed_model, cache)
+        index = VectorStoreIndex(nodes, embed_model=embed_model)
+        if "table" in names:
+            pipelines[PIPELINE_NAMES["table"]] = engine(index.as_retriever(similarity_top_k=settings.RAG_TOP_K))
+            if reranker is not None:
+                # Retrieve-wide / rerank-narrow variant over the same index
+                reranker.load()
+                wide = index.as_retriever(similarity_top_k=max(settings.RAG_RETRIEVE_TOP_K, settings.RAG_TOP_K))
+                pipelines[PIPELINE_NAMES["table"] + "+Rerank"] = engine(RerankingRetriever(wide, reranker))
+        if "hybrid" in names:
+            # Same chunks and embeddings as Table-Aware, plus BM25 fused in
+            hybrid = HybridRetriever(
+                index.as_retriever(similarity_top_k=settings.RAG_TOP_K * 2),
+                BM25Retriever(nodes, similarity_top_k=settings.RAG_TOP_K * 2),
+                similarity_top_k=settings.RAG_TOP_K,
+            )
+            pipelines[PIPELINE_NAMES["hybrid"]] = engine(hybrid)
+
+    if "swarm" in names:
+        pipelines[PIPELINE_NAMES["swarm"]] = SwarmPipeline(chat_model(), embed_model)
+
+    return pipelines
@@ -1,52 +1,27 @@
+import asyncio
+import json
 import os
+import logging
 import time
-from typing import Dict, Any
-from llama_index.core import VectorStoreIndex, SimpleDirectoryReader, Settings
-from llama_index.embeddings.huggingface import HuggingFaceEmbedding
-from llama_index.llms.ollama import Ollama
-
-# Configure Global Settings as per user requirements
-Settings.embed_model = HuggingFaceEmbedding(model_name="BAAI/bge-large-en-v1.5")
-Settings.llm = Ollama(model="deepseek-r1:8b", request_timeout=60.0)
-
-def load_index(filepath: str, name: str, device: str = "cpu") -> VectorStoreIndex:
-    """
-    输入: 
-        filepath (str) - 解析后的 Markdown 文件路径
-        name (str) - 实验名称
-        device (str) - 运行设备
-    输出: 
-        VectorStoreIndex (LlamaIndex 对象)
-    """
-    # Simple loader for demo
-    if os.path.isdir(filepath):
-        documents = SimpleDirectoryReader(filepath).load_data()
-    else:
-        # Load single file as directory
-        temp_dir = "data/parsed/temp"
-        os.makedirs(temp_dir, exist_ok=True)
-        filename = os.path.basename(filepath)
-        import shutil
-        shutil.copy(filepath, os.path.join(temp_dir, filename))
-        documents = SimpleDirectoryReader(temp_dir).load_data()
-        
-    index = VectorStoreIndex.from_documents(documents)
-    return index
+from contextlib import ExitStack, nullcontext
+from typing import Dict, Any, List, Sequence
 
 async def evaluate_single_question(query_engine, row: Dict[str, Any], pipeline_name: str, semaphore=None, safe_mode=False) -> Dict[str, Any]:
     """
     输入语义: 
         query_engine: LlamaIndex 的查询引擎实例
         row: 包含 question 的字典
+        semaphore: 限制同时进行的查询数 (None = 不限制)
     """
-    start_time = time.time()
-    # Handle async query
-    if hasattr(query_engine, "aquery"):
-        response = await query_engine.aquery(row['question'])
-    else:
-        response = query_engine.query(row['question'])
-    
-    latency = time.time() - start_time
+    async with semaphore or nullcontext():
+        with track_usage() as usage:
+            start_time = time.perf_counter()
+            # Handle async query; sync engines run in a worker thread so they don't block the loop
+            if hasattr(query_engine, "aquery"):
+                response = await query_engine.aquery(row['question'])
+            else:
+                response = await asyncio.to_thread(query_engine.query, row['question'])
+            latency = time.perf_counter() - start_time
     
     return {
         "id": row.get("id", "N/A"),
@@ -54,89 +29,198 @@ async def evaluate_single_question(query_engine, row: Dict[str, Any], pipeline_n
         "ground_truth": row.get("ground_truth", "N/A"),
         "pipeline": pipeline_name,
         "model_answer": str(response),
-        "latency_s": latency
+        "latency_s": latency,
+        "tokens": usage["tokens"],
+        "llm_calls": usage["llm_calls"],
     }
+
+# Used when data/benchmark_n50.json is absent
+SAMPLE_QUESTIONS: List[Dict[str, Any]] = [
+    {"id": 1, "question": "What was NVIDIA's revenue in 2023?", "ground_truth": "26.974"}, # Billion (normalized)
+    {"id": 2, "question": "Compare AMD and NVIDIA 2024 gross margin.", "ground_truth": "NVIDIA: 72.7%, AMD: 46%"}, 
+    {"id": 3, "question": "Did NVIDIA's R&D expenses increase in 2024?", "ground_truth": "Yes, to $8.68B"}
+]
+
+def load_questions(benchmark_file: str = "data/benchmark_n50.json") -> List[Dict[str, Any]]:
+    """The golden set (README: 50 multi-hop financial questions), or a small sample set if the file is missing."""
+    if os.path.exists(benchmark_file):
+        with open(benchmark_file, "r") as f:
+            return json.load(f)
+    logging.getLogger("Experiment").info("Benchmark file not found. Using sample set.")
+    return SAMPLE_QUESTIONS
+
+def load_results(path: str) -> List[Dict[str, Any]]:
+    """Rows already written to a JSONL results file (a torn last line from a crash is ignored)."""
+    if not os.path.exists(path):
+        return []
+    rows = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                rows.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+    return rows
     
 
-import asyncio
 import argparse
-import json
 from src.core.config import settings
+from src.experiments.pipelines import PIPELINES, build_pipelines, track_usage
 
-import logging
 # Configure logger for experiment
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger("Experiment")
 
-async def run_benchmark(output_file: str = "experiments/results.json"):
+async def run_benchmark(output_file: str = "experiments/comparison_results.jsonl", rerank: bool = False, profile: bool = False,
+                        concurrency: int = settings.BENCH_CONCURRENCY, fresh: bool = False,
+                        pipeline_keys: Sequence[str] = PIPELINES):
     logger.info("Initializing Experiment...")
     
-    # 1. Setup RAG Engine (using Adapter logic or direct loading)
-    # For comparison, we might want to compare "Standard RAG" vs "Structure-Aware"
-    # Here we assume 'Standard' is just the same index but maybe queried differently, 
-    # or we load a different index. For simplicity in this artifact, we run one pipeline.
-    
-    # Check if index exists
+    # 1. Build the pipelines side by side over the same source (shared embedding model and chunk embeddings)
     index_path = settings.RAG_DATA_PATH
     if not os.path.exists(index_path):
-        logger.warning(f"Index not found at {index_path}. Using placeholder.")
-    
-    # Load Index (Structure-Aware by default as per our setup)
-    # In a real comparison, we'd load two indices.
+        logger.error(f"RAG data not found at {index_path}. Run src/data/ingest.py first.")
+        return
+
+    reranker = None
+    if rerank:
+        from src.retrieval.rerank import CrossEncoderReranker
+        reranker = CrossEncoderReranker(
+            model_name=settings.RAG_RERANK_MODEL,
+            top_n=settings.RAG_TOP_K,
+            margin=settings.RAG_RERANK_MARGIN,
+        )
     try:
-        index = load_index(index_path, "Structure-Aware")
-        query_engine = index.as_query_engine(similarity_top_k=3)
+        pipelines = await asyncio.to_thread(build_pipelines, index_path, pipeline_keys, reranker)
     except Exception as e:
-        logger.error(f"Failed to load index: {e}")
+        logger.error(f"Failed to build pipelines: {e}")
         return
+    logger.info(f"Pipelines: {', '.join(pipelines)}")
 
     # 2. Define Benchmark (Golden Set)
-    # As per README: 50 Multi-hop financial questions.
-    # We'll use a subset here for the runnable script if file doesn't exist.
-    benchmark_file = "data/benchmark_n50.json"
-    if os.path.exists(benchmark_file):
-        with open(benchmark_file, "r") as f:
-            questions = json.load(f)
-    else:
-        logger.info("Benchmark file not found. Using sample set.")
-        questions = [
-            {"id": 1, "question": "What was NVIDIA's revenue in 2023?", "ground_truth": "26.974"}, # Billion (normalized)
-            {"id": 2, "question": "Compare AMD and NVIDIA 2024 gross margin.", "ground_truth": "NVIDIA: 72.7%, AMD: 46%"}, 
-            {"id": 3, "question": "Did NVIDIA's R&D expenses increase in 2024?", "ground_truth": "Yes, to $8.68B"}
-        ]
-
-    results = []
-    logger.info(f"Running evaluation on {len(questions)} queries...")
-    
-    for row in questions:
-        logger.info(f"Processing Q{row['id']}: {row['question']}")
-        try:
-            res = await evaluate_single_question(query_engine, row, "Structure-Aware")
-            results.append(res)
-        except Exception as e:
-            logger.error(f"Error on Q{row['id']}: {e}")
-            
-    # 3. Save Results
-    os.makedirs(os.path.dirname(output_file), exist_ok=True)
-    with open(output_file, "w", encoding="utf-8") as f:
-        json.dump(results, f, indent=2)
-    logger.info(f"Results saved to {output_file}")
+    questions = load_questions()
+
+    # 3. Resume: results are appended to JSONL as they complete; finished (pipeline, id) pairs are skipped
+    os.makedirs(os.path.dirname(output_file) or ".", exist_ok=True)
+    if fresh and os.path.exists(output_file):
+        os.remove(output_file)
+    results = load_results(output_file)
+    finished = {(r["pipeline"], str(r["id"])) for r in results}
+    pending = [
+        (pipeline_name, row)
+        for pipeline_name in pipelines
+        for row in questions
+        if (pipeline_name, str(row["id"])) not in finished
+    ]
+    if finished:
+        logger.info(f"Resuming: {len(finished)} results already in {output_file}, {len(pending)} to go.")
+    logger.info(f"Running evaluation on {len(pending)} queries (concurrency {concurrency})...")
+
+    # --profile: one sampling profiler over the whole batch, one section per pipeline/question.
+    # Sections (and per-question rerank_ms) are only exact when questions run one at a time.
+    if profile and concurrency > 1:
+        logger.warning("--profile with --concurrency > 1: per-question sections blend; use --concurrency 1 for exact attribution.")
+    profiling = ExitStack()
+    profiler = None
+    if profile:
+        from src.utils.profiling import profile_run
+        profiler = profiling.enter_context(profile_run(settings.PROFILE_DIR, "run_comparison", settings.PROFILE_INTERVAL_MS / 1000))
+
+    semaphore = asyncio.Semaphore(concurrency)
+    completed = 0
+
+    async def run_one(pipeline_name: str, row: Dict[str, Any], out) -> None:
+        nonlocal completed
+        # Section and rerank baseline are taken once the question holds a slot, not while it queues
+        async with semaphore:
+            rerank_before = reranker.stats["rerank_s"] if reranker else 0.0
+            section = profiler.section(f"{pipeline_name}:Q{row['id']}") if profiler else nullcontext()
+            try:
+                with section:
+                    res = await evaluate_single_question(pipelines[pipeline_name], row, pipeline_name)
+            except Exception as e:
+                logger.error(f"[{pipeline_name}] Error on Q{row['id']}: {e}")
+                return
+            if reranker and pipeline_name.endswith("+Rerank") and concurrency == 1:
+                res["rerank_ms"] = (reranker.stats["rerank_s"] - rerank_before) * 1000
+        # One line per result, flushed immediately: a crash loses at most the questions in flight
+        out.write(json.dumps(res) + "\n")
+        out.flush()
+        results.append(res)
+        completed += 1
+        logger.info(f"[{pipeline_name}] Q{row['id']} done in {res['latency_s']:.2f}s ({completed}/{len(pending)})")
+
+    # Terminate a line torn by a previous crash so the next result starts on its own line
+    if os.path.exists(output_file) and os.path.getsize(output_file):
+        with open(output_file, "rb") as f:
+            f.seek(-1, os.SEEK_END)
+            torn = f.read(1) != b"\n"
+        if torn:
+            with open(output_file, "a", encoding="utf-8") as f:
+                f.write("\n")
+
+    start = time.perf_counter()
+    try:
+        with profiling, open(output_file, "a", encoding="utf-8") as out:
+            await asyncio.gather(*(run_one(name, row, out) for name, row in pending))
+    finally:
+        # Pipelines holding resources (the swarm's RAG cache) release them
+        for pipeline in pipelines.values():
+            if hasattr(pipeline, "close"):
+                pipeline.close()
+        from src.llm_client import close_pools
+        await close_pools()
+    wall_s = time.perf_counter() - start
+
+    if profiler is not None:
+        print("\n=== Profile (sampled busy ms per question) ===")
+        for name, n, busy_ms, hot in profiler.summary(top=1):
+            print(f"{name:<40} {busy_ms:>8.0f}ms  {hot[0][0] if hot else '-'}")
+        print(f"Flamegraph input: {profiler.output_path}")
+    logger.info(f"Results appended to {output_file}")
     
     # 4. Calculate Metrics
     try:
         from src.experiments.evaluate_metrics import calculate_metrics
-        metrics = calculate_metrics(results)
+        per_pipeline = {}
         print("\n=== Auto-Evaluation Metrics ===") # Keep strict output for pipe-ability
-        print(f"Exact Match Accuracy: {metrics['accuracy']:.2%}")
-        print(f"Average Latency: {metrics['avg_latency']:.4f}s")
+        print(f"{'Pipeline':<22} {'N':>4} {'Accuracy':>9} {'p50':>8} {'p95':>8} {'p99':>8} {'Tokens/ans':>11} {'LLM calls/ans':>14}")
+        for pipeline_name in pipelines:
+            rows = [r for r in results if r["pipeline"] == pipeline_name]
+            m = per_pipeline[pipeline_name] = calculate_metrics(rows)
+            print(
+                f"{pipeline_name:<22} {m['total_samples']:>4} {m['accuracy']:>9.2%} "
+                f"{m['p50_latency']:>7.2f}s {m['p95_latency']:>7.2f}s {m['p99_latency']:>7.2f}s "
+                f"{m['avg_tokens']:>11.0f} {m['avg_llm_calls']:>14.1f}"
+            )
+        if completed:
+            print(f"Throughput: {completed / wall_s:.2f} questions/s ({completed} answered in {wall_s:.1f}s, concurrency {concurrency})")
+        if reranker:
+            stats = reranker.stats
+            reranked = int(stats["reranked"])
+            avg_ms = stats["rerank_s"] * 1000 / reranked if reranked else 0.0
+            delta = per_pipeline["Table-Aware+Rerank"]["accuracy"] - per_pipeline["Table-Aware"]["accuracy"]
+            print(f"Rerank: {reranked} reranked, {int(stats['skipped'])} early-exit, avg {avg_ms:.1f}ms per rerank")
+            print(f"Rerank Accuracy Delta: {delta:+.2%}")
         print("===============================\n")
     except ImportError:
         logger.error("Could not import metric evaluator.")
 
 def main():
     parser = argparse.ArgumentParser()
-    parser.add_argument("--output", default="experiments/comparison_results.json")
+    parser.add_argument("--output", default="experiments/comparison_results.jsonl", help="JSONL results file; finished questions are skipped on rerun")
+    parser.add_argument("--concurrency", type=int, default=settings.BENCH_CONCURRENCY, help="Questions in flight at once")
+    parser.add_argument("--fresh", action="store_true", help="Discard existing results in --output instead of resuming")
+    parser.add_argument("--pipelines", default=",".join(PIPELINES), help=f"Comma-separated subset of {', '.join(PIPELINES)}")
+    parser.add_argument("--rerank", action="store_true", help="Also run Table-Aware with the cross-encoder reranker and report its latency/accuracy")
+    parser.add_argument("--profile", action="store_true", help="Sample-profile each question; write a flamegraph file and summary")
     args = parser.parse_args()
+    pipeline_keys = [p.strip() for p in args.pipelines.split(",") if p.strip()]
+    unknown = set(pipeline_keys) - set(PIPELINES)
+    if unknown:
+        parser.error(f"Unknown pipelines: {', '.join(sorted(unknown))}")
+    if args.rerank and "table" not in pipeline_keys:
+        parser.error("--rerank compares against the 'table' pipeline; include it in --pipelines")
     
     # Run async loop
     try:
@@ -145,7 +229,10 @@ def main():
         loop = asyncio.new_event_loop()
         asyncio.set_event_loop(loop)
         
-    loop.run_until_complete(run_benchmark(args.output))
+    loop.run_until_complete(run_benchmark(
+        args.output, rerank=args.rerank, profile=args.profile, concurrency=args.concurrency, fresh=args.fresh,
+        pipeline_keys=pipeline_keys,
+    ))
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,176 @@
+# src/graph.py
+import time
+from typing import Any, Callable, Dict, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.runnables import Runnable, RunnableConfig, RunnableLambda
+from langgraph.graph import StateGraph, START, END
+from langgraph.prebuilt import ToolNode
+
+from src.core.types import AgentState
+from src.agents.supervisor import create_supervisor_node
+from src.agents.researcher import create_researcher_node
+from src.agents.chart_gen import create_quant_node
+from src.core.config import settings
+from src.utils.accounting import node_timer, with_node_stats
+from src.utils.guard import forced_finish, route_stalled, stop_reason
+from src.utils.metrics import metrics, spans
+
+
+def _observe(name: str, output: Dict[str, Any]) -> None:
+    """Exports one node execution: Prometheus metrics and, if enabled, an OTLP span."""
+    stats = output["metadata"]["nodes"][name]
+    metrics.record_node(name, stats)
+    if "next" in output:
+        metrics.routing.inc(role=output["next"])
+    if settings.OTLP_SPANS_FILE is not None:
+        end_ns = time.time_ns()
+        start_ns = end_ns - int(stats.get("wall_ms", 0.0) * 1_000_000)
+        attributes = {f"swarm.{k}": v for k, v in stats.items() if k != "calls"}
+        spans.record(name, start_ns, end_ns, attributes)
+
+
+class ToolMetricsCallback(BaseCallbackHandler):
+    """Per-tool latency for swarm_tool_latency_seconds (ToolNode may run several tools per step)."""
+
+    def __init__(self) -> None:
+        self._started: Dict[UUID, tuple] = {}
+
+    def on_tool_start(self, serialized: Dict[str, Any], input_str: str, *, run_id: UUID, **kwargs: Any) -> None:
+        self._started[run_id] = ((serialized or {}).get("name") or kwargs.get("name", "unknown"), time.perf_counter())
+
+    def on_tool_end(self, output: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        started = self._started.pop(run_id, None)
+        if started is not None:
+            metrics.tool_latency.observe(time.perf_counter() - started[1], tool=started[0])
+
+    on_tool_error = on_tool_end
+
+
+def instrument(name: str, node: Any) -> Callable[..., Any]:
+    """
+    Wraps a node so every execution adds its wall time, LLM token/duration
+    usage and tool-call count to ``AgentState.metadata``. Runnables keep their
+    async path; plain functions stay sync (LangGraph runs them in a thread).
+    """
+    if isinstance(node, Runnable):
+        async def arun(state: AgentState, config: RunnableConfig) -> Dict[str, Any]:
+            with node_timer(name) as stats:
+                output = await node.ainvoke(state, config)
+            output = with_node_stats(name, output, stats)
+            _observe(name, output)
+            return output
+        return arun
+
+    def run(state: AgentState) -> Dict[str, Any]:
+        with node_timer(name) as stats:
+            output = node(state)
+        output = with_node_stats(name, output, stats)
+        _observe(name, output)
+        return output
+    return run
+
+
+def guard_supervisor(supervisor: Runnable) -> Runnable:
+    """
+    Puts the run guard in front of the Supervisor. A spent budget or a repeated
+    tool call finishes the run without another routing call; a routing decision
+    that would hand the same member the floor GUARD_REPEAT_LIMIT times in a row
+    is overridden to FINISH.
+    """
+    def decide(state: AgentState, output: Dict[str, Any]) -> Dict[str, Any]:
+        if route_stalled(state.get("routes") or [], output["next"]):
+            return stop(state, "repeated_route", output)
+        return {**output, "routes": [output["next"]]}
+
+    def stop(state: AgentState, reason: str, output: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        # When the routing call already ran, it counts as used and its usage metadata is kept
+        update = {**(output or {}), **forced_finish(state, reason, extra_calls=int(output is not None))}
+        metrics.guard_stops.inc(reason=reason)
+        return {**update, "routes": [update["next"]]}
+
+    def run(state: AgentState, config: RunnableConfig) -> Dict[str, Any]:
+        reason = stop_reason(state)
+        return stop(state, reason) if reason else decide(state, supervisor.invoke(state, config))
+
+    async def arun(state: AgentState, config: RunnableConfig) -> Dict[str, Any]:
+        reason = stop_reason(state)
+        return stop(state, reason) if reason else decide(state, await supervisor.ainvoke(state, config))
+
+    return RunnableLambda(run, afunc=arun, name="Supervisor")
+
+
+def build_graph(llm: Any, checkpointer: Optional[Any] = None) -> Any:
+    """
+    Builds and compiles the Supervisor -> {Researcher, Quant} -> tools workflow.
+
+    Args:
+        llm (Any): Chat model shared by all agents.
+        checkpointer (Optional[Any]): LangGraph checkpoint saver; enables resumable runs.
+
+    Returns:
+        Any: The compiled LangGraph graph.
+    """
+    from src.tools.rag_tool import query_financial_rag
+    from src.tools.plot_tool import create_plot
+    from src.tools.artifact_tool import fetch_artifact
+    from src.tools.code_tool import run_python
+
+    tools = [query_financial_rag, create_plot, fetch_artifact, run_python]
+    tool_node = ToolNode(tools)
+
+    members: list[str] = ["Researcher", "Quant"]
+    supervisor_node = create_supervisor_node(llm, members)
+    researcher_node = create_researcher_node(llm)
+    quant_node = create_quant_node(llm)
+
+    workflow = StateGraph(AgentState)
+
+    workflow.add_node("Supervisor", instrument("Supervisor", guard_supervisor(supervisor_node)))
+    workflow.add_node("Researcher", instrument("Researcher", researcher_node))
+    workflow.add_node("Quant", instrument("Quant", quant_node))
+    workflow.add_node("tools", instrument("tools", tool_node))
+
+    # Workflow:
+    # Supervisor -> Researcher/Quant -> tools -> Researcher/Quant -> Supervisor
+
+    # Conditional edge from Supervisor to members
+    workflow.add_conditional_edges(
+        "Supervisor",
+        lambda x: x["next"],
+        {
+            "Researcher": "Researcher",
+            "Quant": "Quant",
+            "FINISH": END
+        }
+    )
+
+    # Clean tool routing logic
+    def route_tool_output(state: AgentState):
+        """Standard routing: Callers handle their own tool outputs."""
+        return state.get("sender", "Supervisor")
+
+    workflow.add_conditional_edges("tools", route_tool_output)
+
+    # Conditional edge for member agents; a tripped guard hands back to the Supervisor to finish
+    def should_continue(state: AgentState):
+        messages = state["messages"]
+        last_message = messages[-1]
+        if last_message.tool_calls and stop_reason(state) is None:
+            return "tools"
+        return "Supervisor"
+
+    for member in members:
+        workflow.add_conditional_edges(
+            member,
+            should_continue,
+            {
+                "tools": "tools",
+                "Supervisor": "Supervisor"
+            }
+        )
+
+    workflow.add_edge(START, "Supervisor")
+
+    return workflow.compile(checkpointer=checkpointer)
@@ -0,0 +1,178 @@
+# src/llm_client.py
+"""
+Shared Ollama clients for all LLM traffic. The LangChain chat model used by
+the agents and the LlamaIndex LLM used by the RAG engine are built here, on
+one HTTP connection pool per Ollama host, with the configured ``keep_alive`` so
+the model stays resident between sparse requests. ``warm_up`` loads the model
+and primes the agents' shared system-prompt prefix; ``residency`` reports whether
+the model is currently loaded (the health check).
+"""
+import asyncio
+import threading
+import time
+import weakref
+from typing import Any, Dict, Iterable, List, Optional, Union
+
+import httpx
+import ollama
+
+from src.core.config import settings
+from src.utils.robustness import log_agent_action
+
+_lock = threading.Lock()
+_transports: Dict[str, "tuple[httpx.HTTPTransport, LoopPooledTransport]"] = {}
+_sync_clients: Dict[str, ollama.Client] = {}
+_async_clients: Dict[str, ollama.AsyncClient] = {}
+# Outcome of the last warm_up(): "cold" (not run), "warming", "warm" or "failed"
+_warmup: Dict[str, Any] = {"state": "cold", "seconds": None, "error": None}
+
+
+def _limits() -> httpx.Limits:
+    return httpx.Limits(max_connections=settings.LLM_MAX_CONNECTIONS, max_keepalive_connections=settings.LLM_MAX_CONNECTIONS)
+
+
+class LoopPooledTransport(httpx.AsyncBaseTransport):
+    """
+    Async transport shared by every client pointing at the same host. httpx
+    connection pools cannot cross event loops, so it keeps one pool per
+    running loop; ``aclose`` closes the current loop's pool (the next request
+    on that loop opens a new one) and pools of loops that are gone are dropped.
+    """
+
+    def __init__(self) -> None:
+        self._pools: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncHTTPTransport]" = weakref.WeakKeyDictionary()
+
+    def __len__(self) -> int:
+        return len(self._pools)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        loop = asyncio.get_running_loop()
+        pool = self._pools.get(loop)
+        if pool is None:
+            pool = self._pools[loop] = httpx.AsyncHTTPTransport(limits=_limits())
+        return await pool.handle_async_request(request)
+
+    async def aclose(self) -> None:
+        pool = self._pools.pop(asyncio.get_running_loop(), None)
+        if pool is not None:
+            await pool.aclose()
+
+
+def shared_transports(base_url: Optional[str] = None) -> "tuple[httpx.HTTPTransport, LoopPooledTransport]":
+    """The process-wide sync and async connection pools for ``base_url`` (LLM_BASE_URL by default)."""
+    base_url = base_url or settings.LLM_BASE_URL
+    with _lock:
+        if base_url not in _transports:
+            _transports[base_url] = (httpx.HTTPTransport(limits=_limits()), LoopPooledTransport())
+        return _transports[base_url]
+
+
+def shared_clients(base_url: Optional[str] = None) -> "tuple[ollama.Client, ollama.AsyncClient]":
+    """Sync and async Ollama clients for ``base_url`` on the shared connection pools."""
+    base_url = base_url or settings.LLM_BASE_URL
+    sync_transport, async_transport = shared_transports(base_url)
+    with _lock:
+        if base_url not in _sync_clients:
+            _sync_clients[base_url] = ollama.Client(base_url, timeout=float(settings.LLM_TIMEOUT), transport=sync_transport)
+            _async_clients[base_url] = ollama.AsyncClient(base_url, timeout=float(settings.LLM_TIMEOUT), transport=async_transport)
+        return _sync_clients[base_url], _async_clients[base_url]
+
+
+async def close_pools() -> None:
+    """Closes the running loop's connections to every Ollama host; await it before the loop shuts down."""
+    for _, async_transport in list(_transports.values()):
+        await async_transport.aclose()
+
+
+def keep_alive() -> Union[int, str]:
+    """LLM_KEEP_ALIVE as Ollama expects it: seconds as a number (-1 = forever) or a duration like "30m"."""
+    value = settings.LLM_KEEP_ALIVE.strip()
+    return int(value) if value.lstrip("-").isdigit() else value
+
+
+def chat_model(**overrides: Any) -> Any:
+    """ChatOllama for the agents, on the shared connection pools."""
+    from langchain_ollama import ChatOllama
+
+    base_url = overrides.pop("base_url", settings.LLM_BASE_URL)
+    sync_transport, async_transport = shared_transports(base_url)
+    return ChatOllama(**{
+        "model": settings.LLM_MODEL,
+        "temperature": settings.LLM_TEMPERATURE,
+        "base_url": base_url,
+        "keep_alive": keep_alive(),
+        "client_kwargs": {"timeout": float(settings.LLM_TIMEOUT)},
+        "sync_client_kwargs": {"transport": sync_transport},
+        "async_client_kwargs": {"transport": async_transport},
+        **overrides,
+    })
+
+
+def index_llm(**overrides: Any) -> Any:
+    """LlamaIndex Ollama LLM for the RAG query engines, on the shared clients."""
+    from llama_index.llms.ollama import Ollama
+
+    base_url = overrides.pop("base_url", settings.LLM_BASE_URL)
+    client, async_client = shared_clients(base_url)
+    return Ollama(**{
+        "model": settings.LLM_MODEL,
+        "base_url": base_url,
+        "request_timeout": float(settings.LLM_TIMEOUT),
+        "keep_alive": keep_alive(),
+        "client": client,
+        "async_client": async_client,
+        **overrides,
+    })
+
+
+def agent_prefixes() -> List[List[Dict[str, str]]]:
+    """The static prompt prefix; every agent shares it (see src/core/prompts.py)."""
+    from src.core.prompts import shared_system
+
+    return [[{"role": "system", "content": shared_system()}]]
+
+
+async def warm_up(prefixes: Iterable[List[Dict[str, str]]] = ()) -> bool:
+    """
+    Loads LLM_MODEL into memory and runs each prompt prefix once (one output
+    token) so it is already evaluated when the first agent call arrives.
+    Failures are logged, not raised: the first real call just pays the cold start.
+    """
+    _, client = shared_clients()
+    _warmup.update(state="warming", error=None)
+    start = time.perf_counter()
+    try:
+        # An empty chat only loads the model; it returns as soon as it is resident
+        await client.chat(model=settings.LLM_MODEL, messages=[], keep_alive=keep_alive())
+        for messages in prefixes:
+            await client.chat(
+                model=settings.LLM_MODEL,
+                messages=messages,
+                options={"num_predict": 1, "temperature": settings.LLM_TEMPERATURE},
+                keep_alive=keep_alive(),
+            )
+    except Exception as e:
+        _warmup.update(state="failed", error=str(e), seconds=time.perf_counter() - start)
+        log_agent_action("LLM", "WarmUpFailed", str(e))
+        return False
+    _warmup.update(state="warm", seconds=time.perf_counter() - start)
+    log_agent_action("LLM", "WarmUp", f"{settings.LLM_MODEL} resident", duration_ms=_warmup["seconds"] * 1000)
+    return True
+
+
+def residency() -> Dict[str, Any]:
+    """
+    Whether LLM_MODEL is loaded right now (Ollama ``/api/ps``): ``state`` is
+    "warm", "cold" or "unreachable", with the unload time and the last warm-up.
+    """
+    client, _ = shared_clients()
+    status: Dict[str, Any] = {"model": settings.LLM_MODEL, "keep_alive": settings.LLM_KEEP_ALIVE, "warmup": dict(_warmup)}
+    try:
+        loaded = {m.model: m for m in client.ps().models}
+    except Exception as e:
+        return {**status, "state": "unreachable", "error": str(e)}
+    model = loaded.get(settings.LLM_MODEL) or loaded.get(f"{settings.LLM_MODEL}:latest")
+    if model is None:
+        return {**status, "state": "cold"}
+    expires = model.expires_at.isoformat() if model.expires_at else None
+    return {**status, "state": "warm", "expires_at": expires}
@@ -1,43 +1,231 @@
 # src/rag_adapter.py
+from __future__ import annotations
+
 import os
+import json
 import asyncio
-from typing import Dict, Any, Optional
-from llama_index.core import VectorStoreIndex, SimpleDirectoryReader, Settings
-from llama_index.embeddings.huggingface import HuggingFaceEmbedding
-from llama_index.llms.ollama import Ollama
+import hashlib
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, Any, List, Optional, Tuple
 from src.core.config import settings
+from src.retrieval.sharding import ShardKey, WILDCARD_SHARD, discover_shards, shard_name
 from src.utils.robustness import retry_with_backoff, log_agent_action
+from src.utils.metrics import metrics
+import re
 import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator
 import diskcache as dc
 
+# LlamaIndex / HuggingFace (torch) / NumPy are imported inside the methods that
+# need them: importing this module (and the tools that wrap it) stays cheap.
+if TYPE_CHECKING:
+    from llama_index.core import VectorStoreIndex
+    from llama_index.core.retrievers import BaseRetriever
+    from src.retrieval.ann import IVFIndex
+    from src.retrieval.rerank import CrossEncoderReranker
+
+_STOPWORDS = frozenset("a an and are as at be by did do does for from how in is it of on or s the to was were what which with".split())
+
+
+def question_similarity(a: str, b: str) -> float:
+    """Jaccard overlap of content words; cheap enough to run on every tool call."""
+    tokens_a = set(re.findall(r"[a-z0-9.%]+", a.lower())) - _STOPWORDS
+    tokens_b = set(re.findall(r"[a-z0-9.%]+", b.lower())) - _STOPWORDS
+    if not tokens_a or not tokens_b:
+        return 0.0
+    return len(tokens_a & tokens_b) / len(tokens_a | tokens_b)
+
 class RAGAdapter:
     """
     Adapter for LlamaIndex RAG with persistent caching and non-blocking initialization.
     """
     def __init__(self) -> None:
-        self.cache = dc.Cache(settings.DATA_DIR / "rag_cache")
+        self._cache: Optional[Any] = None
         # 核心修改1: 初始化时不加载模型，移除副作用
         self.index = None 
         self.query_engine = None
+        self.embed_model = None
+        self.ann_index: Optional[IVFIndex] = None
+        self.shards: Dict[ShardKey, Tuple[VectorStoreIndex, Optional[IVFIndex]]] = {}
+        self.reranker: Optional[CrossEncoderReranker] = None
+        self.index_version = ""
         self._lock = asyncio.Lock() # 防止并发初始化竞争
 
+    @property
+    def cache(self) -> Any:
+        """Persistent RAG cache, opened on first use rather than at import time."""
+        if self._cache is None:
+            self._cache = dc.Cache(settings.DATA_DIR / "rag_cache")
+        return self._cache
+
+    @cache.setter
+    def cache(self, value: Any) -> None:
+        self._cache = value
+
+    def close(self) -> None:
+        """Closes the RAG cache if it was opened (an adapter owned by a harness run)."""
+        if self._cache is not None and hasattr(self._cache, "close"):
+            self._cache.close()
+
+    @staticmethod
+    def _source_fingerprint(files: List[Path]) -> str:
+        """Identifies the (source files, embedding model) pair a persisted index was built from."""
+        digest = hashlib.sha256(settings.EMBEDDING_MODEL.encode())
+        for path in sorted(files):
+            stat = os.stat(path)
+            digest.update(f"{path}:{stat.st_size}:{int(stat.st_mtime)}".encode())
+        return digest.hexdigest()[:16]
+
+    def source_version(self) -> str:
+        """
+        Version of the corpus the index is (or will be) built from. Computed from
+        file stats only, so callers can key caches without loading the index.
+        """
+        if settings.RAG_CORPUS_DIR is not None:
+            shards = discover_shards(Path(settings.RAG_CORPUS_DIR))
+            versions = [self._source_fingerprint(files) for _, files in sorted(shards.items())]
+            return hashlib.sha256("|".join(versions).encode()).hexdigest()[:16]
+        if not os.path.exists(settings.RAG_DATA_PATH):
+            return "missing"
+        return self._source_fingerprint([Path(settings.RAG_DATA_PATH)])
+
+    def cache_key(self, question: str) -> str:
+        """
+        RAG cache key: the question plus everything that changes its answer
+        (corpus version, retrieval config, models). Stats the corpus, so call
+        it off the event loop.
+        """
+        config = (
+            self.source_version(), settings.EMBEDDING_MODEL, settings.LLM_MODEL, str(settings.RAG_CORPUS_DIR),
+            settings.RAG_TOP_K, settings.RAG_ANN_ENABLED and (settings.RAG_ANN_NLIST, settings.RAG_ANN_NPROBE, settings.RAG_ANN_MIN_CHUNKS),
+            settings.RAG_RERANK_ENABLED and (settings.RAG_RERANK_MODEL, settings.RAG_RETRIEVE_TOP_K, settings.RAG_RERANK_MARGIN),
+        )
+        return f"{question}|{hashlib.sha256(repr(config).encode()).hexdigest()[:16]}"
+
     def _initialize_sync(self):
         """同步的、重型的初始化逻辑 (将在线程池中运行)"""
         log_agent_action("RAGAdapter", "Initialization", "Configuring Models & Loading Index...")
         
-        # 显式创建模型实例，不修改全局 Settings
-        embed_model = HuggingFaceEmbedding(model_name=settings.EMBEDDING_MODEL)
-        llm = Ollama(model=settings.LLM_MODEL, base_url=settings.LLM_BASE_URL)
+        from llama_index.embeddings.huggingface import HuggingFaceEmbedding
+        
+        # 显式创建模型实例，不修改全局 Settings (a caller may have injected a shared one)
+        if self.embed_model is None:
+            self.embed_model = HuggingFaceEmbedding(model_name=settings.EMBEDDING_MODEL)
+        
+        if settings.RAG_RERANK_ENABLED and self.reranker is None:
+            from src.retrieval.rerank import CrossEncoderReranker
+            self.reranker = CrossEncoderReranker(
+                model_name=settings.RAG_RERANK_MODEL,
+                top_n=settings.RAG_TOP_K,
+                margin=settings.RAG_RERANK_MARGIN,
+            )
+            # Loaded here, off the event loop, rather than lazily inside the first query
+            self.reranker.load()
+        
+        if settings.RAG_CORPUS_DIR is not None:
+            return self._initialize_shards_sync(Path(settings.RAG_CORPUS_DIR))
         
         # 加载数据
         data_path = settings.RAG_DATA_PATH
         if not os.path.exists(data_path):
              raise FileNotFoundError(f"RAG data not found at {data_path}")
         
-        documents = SimpleDirectoryReader(input_files=[data_path]).load_data()
+        index, self.ann_index, self.index_version = self._load_or_build_index([Path(data_path)], settings.RAG_INDEX_DIR)
+        return index
+
+    def _initialize_shards_sync(self, corpus_dir: Path) -> None:
+        """Builds (or loads) one index per (ticker, fiscal_year) shard of the corpus."""
+        shards = discover_shards(corpus_dir)
+        if not shards:
+            raise FileNotFoundError(f"No filings found under RAG corpus {corpus_dir}")
+        
+        versions = []
+        for key, files in sorted(shards.items()):
+            metadata = {} if key == WILDCARD_SHARD else {"ticker": key[0], "fiscal_year": key[1]}
+            index_dir = settings.RAG_INDEX_DIR / "shards" / shard_name(key)
+            index, ann, version = self._load_or_build_index(files, index_dir, metadata)
+            self.shards[key] = (index, ann)
+            versions.append(version)
+        
+        self.index_version = hashlib.sha256("|".join(versions).encode()).hexdigest()[:16]
+        log_agent_action("RAGAdapter", "Initialization", f"Loaded {len(self.shards)} shards from {corpus_dir}")
+
+    def _load_or_build_index(
+        self, files: List[Path], index_dir: Path, metadata: Optional[Dict[str, str]] = None
+    ) -> Tuple[VectorStoreIndex, Optional[IVFIndex], str]:
+        """
+        Loads the index persisted in ``index_dir`` if it was built from the same
+        files, otherwise rebuilds and persists it.
+
+        Returns:
+            Tuple[VectorStoreIndex, Optional[IVFIndex], str]: Index, optional ANN index, and version fingerprint.
+        """
+        from llama_index.core import VectorStoreIndex, SimpleDirectoryReader, StorageContext, load_index_from_storage
+        
+        fingerprint = self._source_fingerprint(files)
+        manifest_path = index_dir / "manifest.json"
+        
+        index = None
+        if manifest_path.exists():
+            try:
+                if json.loads(manifest_path.read_text()).get("fingerprint") == fingerprint:
+                    storage_context = StorageContext.from_defaults(persist_dir=str(index_dir))
+                    index = load_index_from_storage(storage_context, embed_model=self.embed_model)
+            except Exception as e:
+                log_agent_action("RAGAdapter", "Error", f"Persisted index at {index_dir} unusable, rebuilding: {e}")
+                index = None
         
-        # 显式传入嵌入模型
-        return VectorStoreIndex.from_documents(documents, embed_model=embed_model)
+        if index is None:
+            documents = SimpleDirectoryReader(input_files=[str(f) for f in files]).load_data()
+            for doc in documents:
+                doc.metadata.update(metadata or {})
+            # 显式传入嵌入模型
+            index = VectorStoreIndex.from_documents(documents, embed_model=self.embed_model)
+            index.storage_context.persist(persist_dir=str(index_dir))
+            manifest_path.write_text(json.dumps({"fingerprint": fingerprint}))
+        
+        ann = self._load_or_build_ann(index, fingerprint, index_dir) if settings.RAG_ANN_ENABLED else None
+        return index, ann, fingerprint
+
+    def _load_or_build_ann(self, index: VectorStoreIndex, fingerprint: str, index_dir: Path) -> Optional[IVFIndex]:
+        """
+        Returns the IVF index persisted next to the vector index, rebuilding it
+        when the source fingerprint or cell count changed. Small corpora stay on
+        exact search, which is faster than probing below a few thousand chunks.
+        """
+        import numpy as np
+        from src.retrieval.ann import IVFIndex
+        
+        embeddings = index.vector_store.to_dict()["embedding_dict"]
+        if len(embeddings) < settings.RAG_ANN_MIN_CHUNKS:
+            return None
+        
+        ann_path = index_dir / "ann_ivf.npz"
+        ann_fingerprint = f"{fingerprint}:nlist={settings.RAG_ANN_NLIST}"
+        if ann_path.exists():
+            try:
+                ann = IVFIndex.load(ann_path)
+                if ann.fingerprint == ann_fingerprint:
+                    ann.nprobe = settings.RAG_ANN_NPROBE
+                    return ann
+            except (ValueError, OSError, KeyError) as e:
+                log_agent_action("RAGAdapter", "Error", f"ANN index unusable, rebuilding: {e}")
+        
+        node_ids = list(embeddings.keys())
+        vectors = np.asarray([embeddings[node_id] for node_id in node_ids], dtype=np.float32)
+        ann = IVFIndex(nlist=settings.RAG_ANN_NLIST, nprobe=settings.RAG_ANN_NPROBE)
+        ann.build(node_ids, vectors, fingerprint=ann_fingerprint)
+        ann.save(ann_path)
+        log_agent_action("RAGAdapter", "Initialization", f"Built IVF index: {len(ann)} vectors, nlist={ann.nlist}")
+        return ann
+
+    def _build_retriever(self, index: VectorStoreIndex, ann: Optional[IVFIndex], top_k: int) -> BaseRetriever:
+        if ann is not None:
+            from src.retrieval.retrievers import ANNRetriever
+            return ANNRetriever(ann, index.docstore, self.embed_model, similarity_top_k=top_k)
+        return index.as_retriever(similarity_top_k=top_k)
 
     async def _ensure_initialized_async(self):
         """
@@ -56,19 +244,100 @@ class RAGAdapter:
             if self.query_engine is not None: # Double-check locking
                 return
             
+            from llama_index.core.query_engine import RetrieverQueryEngine
+            from src.llm_client import index_llm
+            from src.retrieval.rerank import RerankingRetriever
+            from src.retrieval.retrievers import ShardedRetriever
+            
             loop = asyncio.get_running_loop()
             # 核心修改3: 将重型初始化扔到线程池执行，彻底释放 Event Loop
             self.index = await loop.run_in_executor(None, self._initialize_sync)
             
+            # Retrieve wide when a reranker narrows the candidates down to RAG_TOP_K
+            top_k = settings.RAG_TOP_K
+            if self.reranker is not None:
+                top_k = max(settings.RAG_RETRIEVE_TOP_K, settings.RAG_TOP_K)
+            
+            if self.shards:
+                retriever = ShardedRetriever(
+                    {key: self._build_retriever(index, ann, top_k) for key, (index, ann) in self.shards.items()},
+                    self.embed_model,
+                    similarity_top_k=top_k,
+                )
+            else:
+                retriever = self._build_retriever(self.index, self.ann_index, top_k)
+            if self.reranker is not None:
+                retriever = RerankingRetriever(retriever, self.reranker)
+            
             # 显式传入 LLM 到查询引擎
-            llm = Ollama(model=settings.LLM_MODEL, base_url=settings.LLM_BASE_URL)
-            self.query_engine = self.index.as_query_engine(similarity_top_k=3, llm=llm)
+            llm = index_llm()
+            self.query_engine = RetrieverQueryEngine.from_args(retriever, llm=llm)
+
+    def prefetch(self, question: str) -> None:
+        """
+        Starts a speculative background retrieval (init + embed + search + rerank,
+        no LLM synthesis) for ``question``. A later :meth:`aquery` with a similar
+        question reuses the retrieved nodes instead of searching again.
+        Must be called from within the running event loop.
+        """
+        prefetches = _run_prefetches()
+        if not settings.RAG_PREFETCH_ENABLED or question in prefetches:
+            return
+
+        async def _retrieve():
+            loop = asyncio.get_running_loop()
+            if await loop.run_in_executor(None, lambda: self.cache_key(question) in self.cache):
+                return None
+            # Shielded: a cancelled prefetch must not abort the shared index load half-way
+            await asyncio.shield(self._ensure_initialized_async())
+            from llama_index.core.schema import QueryBundle
+            return await self.query_engine.aretrieve(QueryBundle(question))
+
+        prefetches[question] = asyncio.create_task(_retrieve())
+        log_agent_action("RAGAdapter", "Prefetch", f"Q: {question}")
+
+    def cancel_prefetch(self, question: str) -> None:
+        """Drops a pending speculative retrieval (e.g. when the route went elsewhere)."""
+        task = _run_prefetches().pop(question, None)
+        if task is not None and not task.done():
+            task.cancel()
+            log_agent_action("RAGAdapter", "Prefetch (Cancelled)", f"Q: {question}")
+
+    async def _take_prefetch(self, question: str) -> Optional[List[Any]]:
+        """Returns prefetched nodes for the most similar pending question, if similar enough."""
+        prefetches = _run_prefetches()
+        if not prefetches:
+            return None
+        best = max(prefetches, key=lambda q: question_similarity(q, question))
+        score = question_similarity(best, question)
+        if score < settings.RAG_PREFETCH_MIN_SIMILARITY:
+            return None
+
+        task = prefetches.pop(best)
+        try:
+            # Shielded, so a CancelledError here is either the prefetch's own or the caller's
+            nodes = await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if not task.cancelled():
+                # The caller is being cancelled: propagate, and drop the orphaned retrieval
+                task.cancel()
+                raise
+            log_agent_action("RAGAdapter", "Prefetch (Failed)", "cancelled")
+            return None
+        except Exception as e:
+            log_agent_action("RAGAdapter", "Prefetch (Failed)", f"{type(e).__name__}: {e}")
+            return None
+        if nodes is not None:
+            log_agent_action("RAGAdapter", "Prefetch (Hit)", f"similarity={score:.2f} Q: {question}")
+        return nodes
 
     async def aquery(self, question: str) -> Dict[str, Any]:
         loop = asyncio.get_running_loop()
         
-        # 1. Cache Check (Non-blocking)
-        cached_result = await loop.run_in_executor(None, lambda: self.cache.get(question))
+        # 1. Cache Check (Non-blocking); a changed corpus or retrieval config is a different key
+        key = await loop.run_in_executor(None, self.cache_key, question)
+        cached_result = await loop.run_in_executor(None, lambda: self.cache.get(key))
+        metrics.rag_cache.inc(result="hit" if cached_result else "miss")
         if cached_result:
             log_agent_action("RAGAdapter", "Query (Cache Hit)", f"Q: {question}")
             return cached_result
@@ -78,31 +347,30 @@ class RAGAdapter:
 
         start_time = time.time()
 
-        # 3. Query
+        # 3. Query (synthesizing from a speculative retrieval when one matches)
+        prefetched_nodes = await self._take_prefetch(question)
+
         @retry_with_backoff(retries=3)
         async def _execute_query():
+            if prefetched_nodes is not None:
+                from llama_index.core.schema import QueryBundle
+                return await self.query_engine.asynthesize(QueryBundle(question), prefetched_nodes)
             return await self.query_engine.aquery(question)
 
         try:
             response = await _execute_query()
             
-            # Extract citations logic
-            sources = []
-            if hasattr(response, "source_nodes"):
-                for node in response.source_nodes:
-                    sources.append(f"Content: {node.node.get_content()[:100]}...")
-            citation_str = "\n".join([f"[Source {i+1}]: {s}" for i, s in enumerate(sources)])
-
+            # Source texts are kept once, here; the tool layer cites them by artifact ID
             result = {
-                "model_answer": str(response) + f"\n\n**Citations**:\n{citation_str}",
+                "model_answer": str(response),
                 "source_nodes": [node.node.get_content() for node in response.source_nodes] if hasattr(response, "source_nodes") else [],
                 "latency_s": time.time() - start_time
             }
             
-            log_agent_action("RAGAdapter", "Query", f"Q: {question}")
+            log_agent_action("RAGAdapter", "Query", f"Q: {question}", duration_ms=result["latency_s"] * 1000)
             
             # Set Cache
-            await loop.run_in_executor(None, lambda: self.cache.set(question, result))
+            await loop.run_in_executor(None, lambda: self.cache.set(key, result))
             return result
             
         except Exception as e:
@@ -110,5 +378,53 @@ class RAGAdapter:
             log_agent_action("RAGAdapter", "Error", msg)
             return {"model_answer": f"Error: {msg}", "source_nodes": [], "latency_s": 0.0}
 
+# Speculative retrievals of the current run, keyed by the question they were started for
+# (see prefetch_scope): concurrent runs on one adapter never take each other's nodes
+_prefetch_var: ContextVar[Optional[Dict[str, asyncio.Task]]] = ContextVar("rag_prefetches", default=None)
+
+
+def _run_prefetches() -> Dict[str, asyncio.Task]:
+    """This run's prefetches; outside a prefetch_scope they are bound to the calling context."""
+    prefetches = _prefetch_var.get()
+    if prefetches is None:
+        prefetches = {}
+        _prefetch_var.set(prefetches)
+    return prefetches
+
+
+@contextmanager
+def prefetch_scope() -> Iterator[None]:
+    """Gives the run inside the block (and the tasks it starts) its own set of prefetches."""
+    token = _prefetch_var.set({})
+    try:
+        yield
+    finally:
+        _prefetch_var.reset(token)
+
+
 # Singleton instance
 adapter = RAGAdapter()
+
+# Adapter the RAG tool queries in the current run; harnesses bind their own (see adapter_scope)
+_adapter_var: ContextVar[Optional[Any]] = ContextVar("rag_adapter", default=None)
+
+
+def current_adapter() -> Any:
+    """The adapter bound by the enclosing :func:`adapter_scope`, else the process-wide one."""
+    bound = _adapter_var.get()
+    return adapter if bound is None else bound
+
+
+@contextmanager
+def adapter_scope(bound: Optional[Any]) -> Iterator[Any]:
+    """
+    Routes RAG tool calls made inside the block (and graph tasks started in it)
+    to ``bound`` instead of the singleton, leaving the singleton untouched.
+    ``None`` keeps the singleton.
+    """
+    token = _adapter_var.set(bound)
+    try:
+        with prefetch_scope():
+            yield current_adapter()
+    finally:
+        _adapter_var.reset(token)
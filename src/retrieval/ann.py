@@ -0,0 +1,192 @@
+# src/retrieval/ann.py
+import json
+import math
+from pathlib import Path
+from typing import List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    """L2-normalise rows so that inner product equals cosine similarity."""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k highest scores, best first (O(n) partition + O(k log k) sort)."""
+    k = min(k, scores.shape[0])
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    part = np.argpartition(-scores, k - 1)[:k]
+    return part[np.argsort(-scores[part])]
+
+
+def exact_search(vectors: np.ndarray, query: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Brute-force cosine search over pre-normalised vectors.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: Row positions and scores of the top-k hits.
+    """
+    scores = vectors @ _normalize(query)
+    top = _top_k(scores, k)
+    return top, scores[top]
+
+
+class IVFIndex:
+    """
+    Inverted-file (IVF) approximate nearest-neighbour index in pure NumPy.
+
+    Vectors are clustered with k-means into ``nlist`` cells; a query only scans
+    the ``nprobe`` cells whose centroids are closest to it. Raising ``nprobe``
+    trades latency for recall (``nprobe == nlist`` degenerates to exact search).
+    Vectors are stored contiguously grouped by cell so every probe is a single
+    BLAS mat-vec over a slice view.
+    """
+
+    FORMAT_VERSION = 1
+
+    def __init__(self, nlist: int = 0, nprobe: int = 8, seed: int = 42) -> None:
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.seed = seed
+        self.fingerprint = ""
+        self.ids: np.ndarray = np.empty(0, dtype=str)
+        self.centroids: np.ndarray = np.empty((0, 0), dtype=np.float32)
+        self.vectors: np.ndarray = np.empty((0, 0), dtype=np.float32)
+        self.offsets: np.ndarray = np.zeros(1, dtype=np.int64)
+
+    def __len__(self) -> int:
+        return int(self.vectors.shape[0])
+
+    @staticmethod
+    def auto_nlist(n: int) -> int:
+        """Rule of thumb: ~sqrt(N) cells keeps both probe and scan cost sub-linear."""
+        return max(1, int(math.sqrt(n)))
+
+    def _kmeans(self, data: np.ndarray, iterations: int) -> np.ndarray:
+        rng = np.random.default_rng(self.seed)
+        centroids = data[rng.choice(data.shape[0], self.nlist, replace=False)].copy()
+        for _ in range(iterations):
+            assign = self._assign(data, centroids)
+            counts = np.bincount(assign, minlength=self.nlist)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assign, data)
+            # Re-seed empty cells from random points so no cell is wasted
+            empty = counts == 0
+            if empty.any():
+                sums[empty] = data[rng.choice(data.shape[0], int(empty.sum()), replace=False)]
+                counts[empty] = 1
+            centroids = _normalize(sums / counts[:, None])
+        return centroids
+
+    @staticmethod
+    def _assign(data: np.ndarray, centroids: np.ndarray, batch: int = 65536) -> np.ndarray:
+        out = np.empty(data.shape[0], dtype=np.int64)
+        for start in range(0, data.shape[0], batch):
+            out[start:start + batch] = np.argmax(data[start:start + batch] @ centroids.T, axis=1)
+        return out
+
+    def build(
+        self,
+        ids: Sequence[str],
+        vectors: np.ndarray,
+        train_size: int = 64,
+        iterations: int = 10,
+        fingerprint: str = "",
+    ) -> "IVFIndex":
+        """
+        Train the coarse quantiser and populate the inverted lists.
+
+        Args:
+            ids (Sequence[str]): Node IDs, aligned with ``vectors``.
+            vectors (np.ndarray): (N, D) embedding matrix.
+            train_size (int): Training points sampled per cell for k-means.
+            iterations (int): Lloyd iterations.
+            fingerprint (str): Opaque tag identifying the source index version.
+        """
+        data = _normalize(vectors)
+        n = data.shape[0]
+        if n == 0:
+            raise ValueError("Cannot build an ANN index over zero vectors.")
+        self.nlist = min(self.nlist or self.auto_nlist(n), n)
+
+        rng = np.random.default_rng(self.seed)
+        sample_size = min(n, self.nlist * train_size)
+        sample = data[rng.choice(n, sample_size, replace=False)] if sample_size < n else data
+        self.centroids = self._kmeans(sample, iterations)
+
+        assign = self._assign(data, self.centroids)
+        order = np.argsort(assign, kind="stable")
+        self.vectors = np.ascontiguousarray(data[order])
+        self.ids = np.asarray(ids)[order]
+        self.offsets = np.concatenate([[0], np.cumsum(np.bincount(assign, minlength=self.nlist))]).astype(np.int64)
+        self.fingerprint = fingerprint
+        return self
+
+    def search(self, query: np.ndarray, k: int, nprobe: Optional[int] = None) -> Tuple[List[str], List[float]]:
+        """
+        Approximate top-k cosine search.
+
+        Args:
+            query (np.ndarray): (D,) query embedding.
+            k (int): Number of results.
+            nprobe (Optional[int]): Cells to scan; defaults to the index setting.
+
+        Returns:
+            Tuple[List[str], List[float]]: IDs and similarity scores, best first.
+        """
+        q = _normalize(query)
+        probes = _top_k(self.centroids @ q, min(nprobe or self.nprobe, self.nlist))
+
+        positions, scores = [], []
+        for cell in probes:
+            start, end = self.offsets[cell], self.offsets[cell + 1]
+            if start == end:
+                continue
+            positions.append(np.arange(start, end))
+            scores.append(self.vectors[start:end] @ q)
+        if not scores:
+            return [], []
+
+        all_pos = np.concatenate(positions)
+        all_scores = np.concatenate(scores)
+        top = _top_k(all_scores, k)
+        return self.ids[all_pos[top]].tolist(), all_scores[top].tolist()
+
+    def save(self, path: Union[str, Path]) -> None:
+        """Persist to a single ``.npz`` file (no pickling)."""
+        meta = {
+            "format_version": self.FORMAT_VERSION,
+            "nlist": self.nlist,
+            "nprobe": self.nprobe,
+            "seed": self.seed,
+            "fingerprint": self.fingerprint,
+        }
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "wb") as f:
+            np.savez(
+                f,
+                meta=np.array(json.dumps(meta)),
+                ids=self.ids.astype(str),
+                centroids=self.centroids,
+                vectors=self.vectors,
+                offsets=self.offsets,
+            )
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> "IVFIndex":
+        with np.load(path, allow_pickle=False) as data:
+            meta = json.loads(str(data["meta"]))
+            if meta.get("format_version") != cls.FORMAT_VERSION:
+                raise ValueError(f"Unsupported ANN index format: {meta.get('format_version')}")
+            index = cls(nlist=meta["nlist"], nprobe=meta["nprobe"], seed=meta["seed"])
+            index.fingerprint = meta["fingerprint"]
+            index.ids = data["ids"]
+            index.centroids = data["centroids"]
+            index.vectors = data["vectors"]
+            index.offsets = data["offsets"]
+        return index
@@ -0,0 +1,74 @@
+# src/retrieval/chunking.py
+import re
+from typing import List, Optional, Sequence
+
+from llama_index.core.node_parser import SentenceSplitter
+from llama_index.core.schema import Document, TextNode
+
+_TABLE_ROW_RE = re.compile(r"^\s*\|")
+_TABLE_SEPARATOR_RE = re.compile(r"^\s*\|?\s*:?-{3,}:?\s*(\|\s*:?-{3,}:?\s*)*\|?\s*$")
+_HEADING_RE = re.compile(r"^\s*#{1,6}\s+\S")
+
+
+class TableAwareSplitter:
+    """
+    Markdown chunker that never cuts a table away from its header.
+
+    Prose goes through the standard ``SentenceSplitter``. Each Markdown table is
+    split into groups of ``rows_per_chunk`` rows, and every group is prefixed with
+    the nearest section heading and the table's header and separator lines (the
+    Context-Injection scheme described in ``src/data/ingest.py``). A row such as
+    ``| Revenue | 60,922 |`` then stays tied to its column labels ("Fiscal 2024",
+    "$ in millions") in the chunk that gets embedded.
+    """
+
+    def __init__(self, chunk_size: int = 1024, chunk_overlap: int = 20, rows_per_chunk: int = 20) -> None:
+        self.rows_per_chunk = rows_per_chunk
+        self._prose = SentenceSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+
+    def get_nodes_from_documents(self, documents: Sequence[Document]) -> List[TextNode]:
+        nodes: List[TextNode] = []
+        for doc in documents:
+            nodes.extend(self._split(doc))
+        return nodes
+
+    def _split(self, doc: Document) -> List[TextNode]:
+        nodes: List[TextNode] = []
+        lines = doc.get_content().splitlines()
+        heading: Optional[str] = None
+        prose: List[str] = []
+        i = 0
+        while i < len(lines):
+            line = lines[i]
+            if not _TABLE_ROW_RE.match(line):
+                if _HEADING_RE.match(line):
+                    heading = line.strip()
+                prose.append(line)
+                i += 1
+                continue
+            start = i
+            while i < len(lines) and _TABLE_ROW_RE.match(lines[i]):
+                i += 1
+            nodes.extend(self._prose_nodes(prose, doc))
+            prose = []
+            nodes.extend(self._table_nodes(lines[start:i], heading, doc))
+        nodes.extend(self._prose_nodes(prose, doc))
+        return nodes
+
+    def _prose_nodes(self, lines: List[str], doc: Document) -> List[TextNode]:
+        text = "\n".join(lines).strip()
+        if not text:
+            return []
+        return self._prose.get_nodes_from_documents([Document(text=text, metadata=dict(doc.metadata))])
+
+    def _table_nodes(self, table: List[str], heading: Optional[str], doc: Document) -> List[TextNode]:
+        header_len = 2 if len(table) > 1 and _TABLE_SEPARATOR_RE.match(table[1]) else 1
+        header, rows = table[:header_len], table[header_len:] or [""]
+        context = ([heading] if heading else []) + header
+        return [
+            TextNode(
+                text="\n".join(context + rows[j:j + self.rows_per_chunk]).strip(),
+                metadata={**doc.metadata, "chunk_type": "table"},
+            )
+            for j in range(0, len(rows), self.rows_per_chunk)
+        ]
@@ -0,0 +1,111 @@
+# src/retrieval/rerank.py
+import asyncio
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from llama_index.core.bridge.pydantic import Field, PrivateAttr
+from llama_index.core.postprocessor.types import BaseNodePostprocessor
+from llama_index.core.retrievers import BaseRetriever
+from llama_index.core.schema import MetadataMode, NodeWithScore, QueryBundle
+
+from src.utils.robustness import log_agent_action
+
+
+def is_decisive(scores: List[float], top_n: int, margin: float) -> bool:
+    """
+    Early-exit policy: reranking can only change the answer context if some
+    candidate outside the dense top-n could overtake one inside it. When the
+    n-th dense score already leads the (n+1)-th by ``margin``, the cross-encoder
+    is very unlikely to reorder across that boundary, so we skip it.
+    """
+    if len(scores) <= top_n:
+        return True
+    ordered = sorted(scores, reverse=True)
+    return ordered[top_n - 1] - ordered[top_n] >= margin
+
+
+class CrossEncoderReranker(BaseNodePostprocessor):
+    """
+    Retrieve-wide / rerank-narrow stage: scores all dense candidates against
+    the query with a CPU cross-encoder in a single batched forward pass and
+    keeps the best ``top_n``.
+    """
+
+    model_name: str = Field(description="sentence-transformers CrossEncoder checkpoint")
+    top_n: int = Field(default=3, gt=0)
+    margin: float = Field(default=0.15, ge=0.0, description="Dense score gap that skips reranking")
+    device: str = Field(default="cpu")
+
+    _model: Any = PrivateAttr(default=None)
+    _load_lock: Any = PrivateAttr(default_factory=threading.Lock)
+    _stats: Dict[str, float] = PrivateAttr(default_factory=lambda: {"reranked": 0, "skipped": 0, "rerank_s": 0.0})
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "CrossEncoderReranker"
+
+    @property
+    def stats(self) -> Dict[str, float]:
+        """Cumulative counters: reranked/skipped queries and total cross-encoder seconds."""
+        return dict(self._stats)
+
+    def load(self) -> None:
+        """Loads (downloading if needed) the cross-encoder now instead of on the first rerank."""
+        self._get_model()
+
+    def _get_model(self) -> Any:
+        if self._model is None:
+            with self._load_lock:
+                if self._model is None:
+                    from sentence_transformers import CrossEncoder
+                    self._model = CrossEncoder(self.model_name, device=self.device)
+        return self._model
+
+    def _postprocess_nodes(
+        self,
+        nodes: List[NodeWithScore],
+        query_bundle: Optional[QueryBundle] = None,
+    ) -> List[NodeWithScore]:
+        if query_bundle is None or not nodes:
+            return nodes[: self.top_n]
+
+        dense = sorted(nodes, key=lambda n: n.score or 0.0, reverse=True)
+        if is_decisive([n.score or 0.0 for n in dense], self.top_n, self.margin):
+            self._stats["skipped"] += 1
+            return dense[: self.top_n]
+
+        start = time.perf_counter()
+        pairs = [(query_bundle.query_str, n.node.get_content(metadata_mode=MetadataMode.EMBED)) for n in dense]
+        scores = self._get_model().predict(pairs, batch_size=len(pairs), show_progress_bar=False)
+        elapsed = time.perf_counter() - start
+
+        self._stats["reranked"] += 1
+        self._stats["rerank_s"] += elapsed
+        log_agent_action("RAGAdapter", "Rerank", f"{len(pairs)} candidates", duration_ms=elapsed * 1000)
+
+        for node, score in zip(dense, scores):
+            node.score = float(score)
+        return sorted(dense, key=lambda n: n.score or 0.0, reverse=True)[: self.top_n]
+
+
+class RerankingRetriever(BaseRetriever):
+    """
+    ``retriever`` followed by ``reranker``. Used instead of registering the
+    reranker as a query-engine postprocessor: LlamaIndex runs postprocessors
+    synchronously even from ``aquery``, which would hold the event loop for the
+    whole cross-encoder pass. Here the async path scores in an executor thread.
+    """
+
+    def __init__(self, retriever: BaseRetriever, reranker: CrossEncoderReranker) -> None:
+        super().__init__()
+        self._retriever = retriever
+        self._reranker = reranker
+
+    def _retrieve(self, query_bundle: QueryBundle) -> List[NodeWithScore]:
+        return self._reranker.postprocess_nodes(self._retriever.retrieve(query_bundle), query_bundle)
+
+    async def _aretrieve(self, query_bundle: QueryBundle) -> List[NodeWithScore]:
+        nodes = await self._retriever.aretrieve(query_bundle)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self._reranker.postprocess_nodes, nodes, query_bundle)
@@ -0,0 +1,176 @@
+# src/retrieval/retrievers.py
+import asyncio
+import heapq
+import math
+import re
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from llama_index.core.retrievers import BaseRetriever
+from llama_index.core.schema import BaseNode, MetadataMode, NodeWithScore, QueryBundle
+
+from src.retrieval.ann import IVFIndex
+from src.retrieval.sharding import ShardKey, extract_route, select_shards
+from src.utils.robustness import log_agent_action
+
+# Shard searches from every ShardedRetriever share one pool (threads start on demand), so
+# rebuilding the query engine never leaves an orphaned executor behind
+_shard_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="shard")
+
+
+class ANNRetriever(BaseRetriever):
+    """
+    LlamaIndex retriever backed by an :class:`IVFIndex` instead of the
+    brute-force scan of ``SimpleVectorStore``. Node text is still resolved
+    from the index docstore, so the rest of the query engine is unchanged.
+    """
+
+    def __init__(
+        self,
+        ann_index: IVFIndex,
+        docstore: Any,
+        embed_model: Any,
+        similarity_top_k: int = 3,
+        nprobe: Optional[int] = None,
+    ) -> None:
+        super().__init__()
+        self._ann = ann_index
+        self._docstore = docstore
+        self._embed_model = embed_model
+        self._top_k = similarity_top_k
+        self._nprobe = nprobe
+
+    def _search(self, embedding: List[float]) -> List[NodeWithScore]:
+        ids, scores = self._ann.search(np.asarray(embedding), self._top_k, self._nprobe)
+        nodes = self._docstore.get_nodes(ids)
+        return [NodeWithScore(node=node, score=score) for node, score in zip(nodes, scores)]
+
+    def _retrieve(self, query_bundle: QueryBundle) -> List[NodeWithScore]:
+        embedding = query_bundle.embedding or self._embed_model.get_query_embedding(query_bundle.query_str)
+        return self._search(embedding)
+
+    async def _aretrieve(self, query_bundle: QueryBundle) -> List[NodeWithScore]:
+        embedding = query_bundle.embedding or await self._embed_model.aget_query_embedding(query_bundle.query_str)
+        return self._search(embedding)
+
+
+class ShardedRetriever(BaseRetriever):
+    """
+    Routes each query to the per-ticker/per-year shards it mentions and
+    searches them concurrently. The query is embedded once and the embedding
+    is shared by every shard; hits are merged by score (all shards use the
+    same embedding model, so cosine scores are comparable).
+    """
+
+    def __init__(
+        self,
+        shards: Dict[ShardKey, BaseRetriever],
+        embed_model: Any,
+        similarity_top_k: int = 3,
+    ) -> None:
+        super().__init__()
+        self._shards = shards
+        self._embed_model = embed_model
+        self._top_k = similarity_top_k
+        self._known_tickers = {key[0] for key in shards}
+
+    def _select(self, query_str: str) -> List[BaseRetriever]:
+        route = extract_route(query_str, self._known_tickers)
+        keys = select_shards(route, self._shards.keys())
+        log_agent_action("RAGAdapter", "ShardRoute", f"{sorted(route.tickers)} {sorted(route.years)} -> {len(keys)}/{len(self._shards)} shards")
+        return [self._shards[key] for key in keys]
+
+    def _merge(self, results: List[List[NodeWithScore]]) -> List[NodeWithScore]:
+        merged = [hit for hits in results for hit in hits]
+        merged.sort(key=lambda hit: hit.score or 0.0, reverse=True)
+        return merged[: self._top_k]
+
+    def _retrieve(self, query_bundle: QueryBundle) -> List[NodeWithScore]:
+        if query_bundle.embedding is None:
+            query_bundle.embedding = self._embed_model.get_query_embedding(query_bundle.query_str)
+        selected = self._select(query_bundle.query_str)
+        return self._merge(list(_shard_pool.map(lambda r: r.retrieve(query_bundle), selected)))
+
+    async def _aretrieve(self, query_bundle: QueryBundle) -> List[NodeWithScore]:
+        if query_bundle.embedding is None:
+            query_bundle.embedding = await self._embed_model.aget_query_embedding(query_bundle.query_str)
+        selected = self._select(query_bundle.query_str)
+        loop = asyncio.get_running_loop()
+        results = await asyncio.gather(*(loop.run_in_executor(_shard_pool, r.retrieve, query_bundle) for r in selected))
+        return self._merge(list(results))
+
+
+_TERM_RE = re.compile(r"[a-z0-9][a-z0-9.%$]*")
+
+
+def _terms(text: str) -> List[str]:
+    return [t.rstrip(".") for t in _TERM_RE.findall(text.lower())]
+
+
+class BM25Retriever(BaseRetriever):
+    """
+    Okapi BM25 over a fixed node set, via an in-memory inverted index. Exact
+    lexical matches (tickers, fiscal years, line-item names such as "R&D") are
+    where dense embeddings are weakest on financial tables.
+    """
+
+    def __init__(self, nodes: Sequence[BaseNode], similarity_top_k: int = 3, k1: float = 1.5, b: float = 0.75) -> None:
+        super().__init__()
+        self._nodes = list(nodes)
+        self._top_k = similarity_top_k
+        self._k1, self._b = k1, b
+        self._postings: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+        self._lengths: List[int] = []
+        for i, node in enumerate(self._nodes):
+            counts = Counter(_terms(node.get_content(metadata_mode=MetadataMode.NONE)))
+            self._lengths.append(sum(counts.values()))
+            for term, tf in counts.items():
+                self._postings[term].append((i, tf))
+        self._avg_len = sum(self._lengths) / len(self._lengths) if self._lengths else 0.0
+        n = len(self._nodes)
+        self._idf = {term: math.log(1 + (n - len(p) + 0.5) / (len(p) + 0.5)) for term, p in self._postings.items()}
+
+    def _retrieve(self, query_bundle: QueryBundle) -> List[NodeWithScore]:
+        scores: Dict[int, float] = defaultdict(float)
+        for term in set(_terms(query_bundle.query_str)):
+            idf = self._idf.get(term)
+            if idf is None:
+                continue
+            for i, tf in self._postings[term]:
+                norm = self._k1 * (1 - self._b + self._b * self._lengths[i] / (self._avg_len or 1.0))
+                scores[i] += idf * tf * (self._k1 + 1) / (tf + norm)
+        top = heapq.nlargest(self._top_k, scores.items(), key=lambda item: item[1])
+        return [NodeWithScore(node=self._nodes[i], score=score) for i, score in top]
+
+
+class HybridRetriever(BaseRetriever):
+    """
+    Dense + BM25 retrieval fused with Reciprocal Rank Fusion
+    (``score = sum 1 / (rrf_k + rank)``). RRF only uses ranks, so cosine and
+    BM25 scores need no calibration against each other.
+    """
+
+    def __init__(self, dense: BaseRetriever, sparse: BaseRetriever, similarity_top_k: int = 3, rrf_k: int = 60) -> None:
+        super().__init__()
+        self._dense, self._sparse = dense, sparse
+        self._top_k = similarity_top_k
+        self._rrf_k = rrf_k
+
+    def _fuse(self, *ranked: List[NodeWithScore]) -> List[NodeWithScore]:
+        fused: Dict[str, float] = defaultdict(float)
+        nodes: Dict[str, BaseNode] = {}
+        for hits in ranked:
+            for rank, hit in enumerate(hits, start=1):
+                fused[hit.node.node_id] += 1.0 / (self._rrf_k + rank)
+                nodes[hit.node.node_id] = hit.node
+        top = heapq.nlargest(self._top_k, fused.items(), key=lambda item: item[1])
+        return [NodeWithScore(node=nodes[node_id], score=score) for node_id, score in top]
+
+    def _retrieve(self, query_bundle: QueryBundle) -> List[NodeWithScore]:
+        return self._fuse(self._dense.retrieve(query_bundle), self._sparse.retrieve(query_bundle))
+
+    async def _aretrieve(self, query_bundle: QueryBundle) -> List[NodeWithScore]:
+        dense = await self._dense.aretrieve(query_bundle)
+        return self._fuse(dense, self._sparse.retrieve(query_bundle))
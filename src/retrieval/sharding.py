@@ -0,0 +1,127 @@
+# src/retrieval/sharding.py
+import re
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, FrozenSet, Iterable, List, Tuple
+
+# (ticker, fiscal_year); WILDCARD_SHARD holds filings whose metadata could not be inferred
+ShardKey = Tuple[str, str]
+WILDCARD_SHARD: ShardKey = ("*", "*")
+
+SUPPORTED_SUFFIXES = {".md", ".txt"}
+
+# Company names as they appear in analyst questions -> ticker used in shard keys
+TICKER_ALIASES: Dict[str, str] = {
+    "nvidia": "NVDA",
+    "advanced micro devices": "AMD",
+    "amd": "AMD",
+    "apple": "AAPL",
+    "microsoft": "MSFT",
+    "alphabet": "GOOGL",
+    "google": "GOOGL",
+    "amazon": "AMZN",
+    "meta": "META",
+    "facebook": "META",
+    "tesla": "TSLA",
+    "intel": "INTC",
+    "qualcomm": "QCOM",
+    "broadcom": "AVGO",
+    "tsmc": "TSM",
+}
+
+_ALIAS_RE = re.compile(r"\b(" + "|".join(sorted(map(re.escape, TICKER_ALIASES), key=len, reverse=True)) + r")(?:'s)?\b", re.IGNORECASE)
+_TICKER_RE = re.compile(r"\b[A-Z]{2,5}\b")
+_YEAR_RANGE_RE = re.compile(r"\b((?:19|20)\d{2})\s*(?:-|–|to|through|until)\s*((?:19|20)\d{2})\b", re.IGNORECASE)
+_YEAR_RE = re.compile(r"\b(?:FY\s?)?((?:19|20)\d{2})\b", re.IGNORECASE)
+_SHORT_FY_RE = re.compile(r"\bFY\s?'?(\d{2})\b", re.IGNORECASE)
+_FILENAME_RE = re.compile(r"^([A-Za-z][A-Za-z.]{0,5})[_\-\s]+(?:FY)?((?:19|20)\d{2})", re.IGNORECASE)
+
+
+@dataclass(frozen=True)
+class QueryRoute:
+    """Entities and fiscal periods mentioned in a question."""
+    tickers: FrozenSet[str] = field(default_factory=frozenset)
+    years: FrozenSet[str] = field(default_factory=frozenset)
+
+    @property
+    def is_routed(self) -> bool:
+        return bool(self.tickers or self.years)
+
+
+def shard_name(key: ShardKey) -> str:
+    """Filesystem-safe directory name for a shard's persisted index."""
+    return "_all" if key == WILDCARD_SHARD else f"{key[0]}_{key[1]}"
+
+
+def _key_for_file(path: Path, corpus_dir: Path) -> ShardKey:
+    # Layout 1: <corpus>/<TICKER>/<YEAR>/<file>
+    parts = path.relative_to(corpus_dir).parts
+    if len(parts) >= 3 and re.fullmatch(r"(?:19|20)\d{2}", parts[1]):
+        return parts[0].upper(), parts[1]
+    # Layout 2: <corpus>/<TICKER>_<YEAR>_<anything>.md (e.g. NVDA_2024_10K.md)
+    match = _FILENAME_RE.match(path.stem)
+    if match:
+        return match.group(1).upper(), match.group(2)
+    return WILDCARD_SHARD
+
+
+def discover_shards(corpus_dir: Path) -> Dict[ShardKey, List[Path]]:
+    """
+    Groups the filings under ``corpus_dir`` into per-ticker/per-year shards.
+
+    Args:
+        corpus_dir (Path): Root directory of parsed filings.
+
+    Returns:
+        Dict[ShardKey, List[Path]]: Files per (ticker, fiscal_year) shard.
+    """
+    shards: Dict[ShardKey, List[Path]] = {}
+    for path in sorted(Path(corpus_dir).rglob("*")):
+        if path.is_file() and path.suffix.lower() in SUPPORTED_SUFFIXES:
+            shards.setdefault(_key_for_file(path, Path(corpus_dir)), []).append(path)
+    return shards
+
+
+def extract_route(question: str, known_tickers: Iterable[str] = ()) -> QueryRoute:
+    """
+    Lightweight entity/period extractor (regex + alias table, no LLM call).
+
+    Args:
+        question (str): The user or tool question.
+        known_tickers (Iterable[str]): Tickers present in the corpus, matched verbatim.
+
+    Returns:
+        QueryRoute: Tickers and fiscal years referenced by the question.
+    """
+    tickers = {TICKER_ALIASES[m.group(1).lower()] for m in _ALIAS_RE.finditer(question)}
+    known = set(known_tickers)
+    tickers.update(tok for tok in _TICKER_RE.findall(question) if tok in known)
+
+    years = set()
+    for start, end in _YEAR_RANGE_RE.findall(question):
+        lo, hi = sorted((int(start), int(end)))
+        if hi - lo <= 20:
+            years.update(str(y) for y in range(lo, hi + 1))
+    years.update(_YEAR_RE.findall(question))
+    years.update(f"20{yy}" for yy in _SHORT_FY_RE.findall(question))
+    return QueryRoute(frozenset(tickers), frozenset(years))
+
+
+def select_shards(route: QueryRoute, keys: Iterable[ShardKey]) -> List[ShardKey]:
+    """
+    Picks the shards a routed question should search.
+
+    Each filter is only applied if it leaves at least one shard, so a question
+    about a ticker or year that is not indexed degrades to a wider search
+    instead of an empty one. Unrouted questions get every shard.
+    """
+    keys = list(keys)
+    wildcard = [k for k in keys if k == WILDCARD_SHARD]
+    candidates = [k for k in keys if k != WILDCARD_SHARD]
+    if route.tickers:
+        by_ticker = [k for k in candidates if k[0] in route.tickers]
+        candidates = by_ticker or candidates
+    if route.years:
+        by_year = [k for k in candidates if k[1] in route.years]
+        candidates = by_year or candidates
+    return candidates + wildcard
@@ -0,0 +1,5 @@
+"""Offline LLM stand-ins for tests and benchmarks (no GPU, no network)."""
+from src.testing.fake_llm import FakeChatOllama, RecordingCallback, ScriptedResponder, tool_call
+from src.testing.ollama_stub import OllamaStub
+
+__all__ = ["FakeChatOllama", "OllamaStub", "RecordingCallback", "ScriptedResponder", "tool_call"]
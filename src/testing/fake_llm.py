@@ -0,0 +1,276 @@
+# src/testing/fake_llm.py
+import asyncio
+import hashlib
+import json
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, Iterator, List, Literal, Optional, Sequence, Tuple, Union
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult, LLMResult
+from pydantic import ConfigDict, Field
+
+# A reply is plain text, or {"content": ..., "tool_calls": [{"name": ..., "args": {...}}]}
+Reply = Union[str, Dict[str, Any]]
+Turn = Tuple[str, str]  # (role, content)
+
+# Roughly one token per word plus its trailing whitespace; stable across runs
+_TOKEN_RE = re.compile(r"\S+\s*|\s+")
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN_RE.findall(text)
+
+
+def tool_call(name: str, **args: Any) -> str:
+    """Canned tool call in the text protocol ToolParser extracts (``TOOL_CALL: <name>\\nARGS: <json>``)."""
+    return f"TOOL_CALL: {name}\nARGS: {json.dumps(args)}"
+
+
+def prompt_key(turns: Sequence[Turn]) -> str:
+    """Stable key for a prompt; recordings are replayed by it."""
+    return hashlib.sha256(json.dumps(list(turns)).encode("utf-8")).hexdigest()[:16]
+
+
+# LangChain message types -> Ollama /api/chat roles, so keys match between FakeChatOllama and OllamaStub
+_ROLES = {"human": "user", "ai": "assistant", "system": "system", "tool": "tool"}
+
+
+def _turns(messages: Sequence[BaseMessage]) -> List[Turn]:
+    return [(_ROLES.get(m.type, m.type), m.content if isinstance(m.content, str) else json.dumps(m.content)) for m in messages]
+
+
+class ScriptedResponder:
+    """
+    Deterministic reply source shared by FakeChatOllama and the OllamaStub server.
+
+    Lookup order for each prompt:
+      1. ``recording``: replies captured from a real model by RecordingCallback, keyed by prompt.
+      2. ``rules``: regex -> replies. The first pattern found anywhere in the prompt
+         answers. With ``rule_index="calls"`` its replies are consumed in order
+         (the last one repeats); with ``"tool_turns"`` the reply is picked by the
+         number of tool results already in the prompt, so every conversation
+         replays the same script (needed when many runs share one responder).
+      3. ``script``: replies consumed in call order.
+      4. ``default``.
+
+    ``ttft_s`` and ``per_token_s`` set the simulated time-to-first-token and decode speed.
+    """
+
+    def __init__(
+        self,
+        script: Optional[Sequence[Reply]] = None,
+        rules: Optional[Dict[str, Sequence[Reply]]] = None,
+        default: Reply = "Next: FINISH",
+        recording: Optional[Dict[str, Reply]] = None,
+        ttft_s: float = 0.0,
+        per_token_s: float = 0.0,
+        rule_index: Literal["calls", "tool_turns"] = "calls",
+    ) -> None:
+        self.script = list(script or [])
+        self.rules = [(re.compile(p, re.IGNORECASE), list(r)) for p, r in (rules or {}).items()]
+        self.default = default
+        self.recording = dict(recording or {})
+        self.ttft_s, self.per_token_s = ttft_s, per_token_s
+        self.rule_index = rule_index
+        self.calls = 0
+        self._rule_pos: Dict[int, int] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_file(cls, path: Path) -> "ScriptedResponder":
+        """
+        Loads a JSON script: ``{"rules": {...}, "script": [...], "default": ...,
+        "recording": "<recording.jsonl>", "ttft_ms": 0, "per_token_ms": 0, "rule_index": "calls"}``.
+        """
+        spec = json.loads(Path(path).read_text(encoding="utf-8"))
+        recording = load_recording(Path(path).parent / spec["recording"]) if spec.get("recording") else None
+        return cls(
+            script=spec.get("script"),
+            rules=spec.get("rules"),
+            default=spec.get("default", "Next: FINISH"),
+            recording=recording,
+            ttft_s=spec.get("ttft_ms", 0) / 1000,
+            per_token_s=spec.get("per_token_ms", 0) / 1000,
+            rule_index=spec.get("rule_index", "calls"),
+        )
+
+    def reply(self, turns: Sequence[Turn]) -> Reply:
+        with self._lock:
+            self.calls += 1
+            key = prompt_key(turns)
+            if key in self.recording:
+                return self.recording[key]
+            text = "\n".join(content for _, content in turns)
+            for i, (pattern, replies) in enumerate(self.rules):
+                if replies and pattern.search(text):
+                    if self.rule_index == "tool_turns":
+                        pos = sum(1 for role, _ in turns if role == "tool")
+                    else:
+                        pos = self._rule_pos.get(i, 0)
+                        self._rule_pos[i] = pos + 1
+                    return replies[min(pos, len(replies) - 1)]
+            if self.script:
+                return self.script.pop(0)
+            return self.default
+
+    def usage(self, turns: Sequence[Turn], eval_count: int) -> Dict[str, Any]:
+        """Ollama-style final-chunk metrics (durations in ns) for the simulated timings."""
+        prefill_ns = int(self.ttft_s * 1e9)
+        eval_ns = int(self.per_token_s * eval_count * 1e9)
+        return {
+            "done": True,
+            "done_reason": "stop",
+            "total_duration": prefill_ns + eval_ns,
+            "load_duration": 0,
+            "prompt_eval_count": sum(len(tokenize(content)) for _, content in turns),
+            "prompt_eval_duration": prefill_ns,
+            "eval_count": eval_count,
+            "eval_duration": eval_ns,
+        }
+
+
+def _split(reply: Reply) -> Tuple[str, List[Dict[str, Any]]]:
+    if isinstance(reply, str):
+        return reply, []
+    calls = [
+        {"name": c["name"], "args": c.get("args", {}), "id": c.get("id", f"call_{i}"), "type": "tool_call"}
+        for i, c in enumerate(reply.get("tool_calls", []))
+    ]
+    return reply.get("content", ""), calls
+
+
+class FakeChatOllama(BaseChatModel):
+    """
+    Offline stand-in for ``langchain_ollama.ChatOllama``: scripted replies,
+    simulated time-to-first-token and per-token latency, and Ollama-shaped
+    ``response_metadata`` so node accounting, metrics and the usage report behave
+    exactly as against a live server. Supports invoke/ainvoke/stream/astream.
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    model: str = "fake-ollama"
+    temperature: float = 0.0
+    base_url: Optional[str] = None
+    responder: ScriptedResponder = Field(default_factory=ScriptedResponder)
+
+    @classmethod
+    def from_file(cls, path: Path, **kwargs: Any) -> "FakeChatOllama":
+        return cls(responder=ScriptedResponder.from_file(path), **kwargs)
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat-ollama"
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        return {"model": self.model, "temperature": self.temperature}
+
+    def bind_tools(self, tools: Sequence[Any], **kwargs: Any) -> "FakeChatOllama":
+        # Tool calls come from the script, not from the schema
+        return self
+
+    def _message(self, turns: List[Turn], reply: Reply) -> AIMessage:
+        content, calls = _split(reply)
+        usage = self.responder.usage(turns, len(tokenize(content)))
+        return AIMessage(
+            content=content,
+            tool_calls=calls,
+            response_metadata={"model": self.model, **usage},
+            usage_metadata={
+                "input_tokens": usage["prompt_eval_count"],
+                "output_tokens": usage["eval_count"],
+                "total_tokens": usage["prompt_eval_count"] + usage["eval_count"],
+            },
+        )
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        turns = _turns(messages)
+        message = self._message(turns, self.responder.reply(turns))
+        time.sleep(self.responder.ttft_s + self.responder.per_token_s * message.response_metadata["eval_count"])
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        turns = _turns(messages)
+        message = self._message(turns, self.responder.reply(turns))
+        await asyncio.sleep(self.responder.ttft_s + self.responder.per_token_s * message.response_metadata["eval_count"])
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _chunks(self, turns: List[Turn]) -> Iterator[Tuple[float, ChatGenerationChunk]]:
+        """(delay before emitting, chunk) pairs: first token after ttft, then one per token."""
+        message = self._message(turns, self.responder.reply(turns))
+        tokens = tokenize(message.content) or [""]
+        for i, token in enumerate(tokens):
+            delay = self.responder.ttft_s if i == 0 else self.responder.per_token_s
+            yield delay, ChatGenerationChunk(message=AIMessageChunk(content=token))
+        yield 0.0, ChatGenerationChunk(message=AIMessageChunk(
+            content="",
+            tool_call_chunks=[
+                {"name": c["name"], "args": json.dumps(c["args"]), "id": c["id"], "index": i}
+                for i, c in enumerate(message.tool_calls)
+            ],
+            response_metadata=message.response_metadata,
+            usage_metadata=message.usage_metadata,
+        ))
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        for delay, chunk in self._chunks(_turns(messages)):
+            time.sleep(delay)
+            if run_manager and chunk.text:
+                run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        for delay, chunk in self._chunks(_turns(messages)):
+            await asyncio.sleep(delay)
+            if run_manager and chunk.text:
+                await run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+
+
+def load_recording(path: Path) -> Dict[str, Reply]:
+    """Reads a RecordingCallback JSONL file into a ``prompt_key -> reply`` map."""
+    recording: Dict[str, Reply] = {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                entry = json.loads(line)
+                recording[entry["key"]] = {"content": entry["content"], "tool_calls": entry.get("tool_calls", [])}
+    return recording
+
+
+class RecordingCallback(BaseCallbackHandler):
+    """
+    Captures every chat-model reply as JSONL (``key``, ``content``, ``tool_calls``)
+    so a live session can be replayed offline: attach it to a real ChatOllama run,
+    then point a script's ``"recording"`` at the file.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        self._keys: Dict[UUID, str] = {}
+        self._lock = threading.Lock()
+
+    def on_chat_model_start(self, serialized: Dict[str, Any], messages: List[List[BaseMessage]], *, run_id: UUID, **kwargs: Any) -> None:
+        self._keys[run_id] = prompt_key(_turns(messages[0]))
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any) -> None:
+        key = self._keys.pop(run_id, None)
+        if key is None or not response.generations or not response.generations[0]:
+            return
+        message = getattr(response.generations[0][0], "message", None)
+        entry = {
+            "key": key,
+            "content": response.generations[0][0].text,
+            "tool_calls": [{"name": c["name"], "args": c["args"]} for c in getattr(message, "tool_calls", [])],
+        }
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry) + "\n")
@@ -0,0 +1,193 @@
+# src/testing/ollama_stub.py
+"""
+Local HTTP stand-in for an Ollama server, speaking enough of the REST protocol
+(``/api/chat`` streaming and non-streaming, ``/api/tags``, ``/api/show``,
+``/api/ps``, ``/api/version``) for a real ChatOllama client to run against it.
+
+Usage:
+    python -m src.testing.ollama_stub --script tests/data/fake_llm_script.json --port 11434
+"""
+import argparse
+import json
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from src.testing.fake_llm import ScriptedResponder, Turn, _split, tokenize
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
+
+
+class _OllamaHandler(BaseHTTPRequestHandler):
+    server: "_StubServer"
+    protocol_version = "HTTP/1.1"
+
+    def _send_json(self, payload: Dict[str, Any], status: int = 200) -> None:
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self) -> Dict[str, Any]:
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def do_GET(self) -> None:  # noqa: N802
+        path = self.path.split("?")[0]
+        if path == "/api/version":
+            self._send_json({"version": "0.0.0-stub"})
+        elif path == "/api/ps":
+            expires = self.server.expires_at
+            if expires is None or expires < datetime.now(timezone.utc):
+                self._send_json({"models": []})
+            else:
+                model = {"name": self.server.model, "model": self.server.model, "size": 0, "digest": "stub", "size_vram": 0}
+                self._send_json({"models": [{**model, "expires_at": expires.isoformat().replace("+00:00", "Z")}]})
+        elif path == "/api/tags":
+            self._send_json({"models": [{"name": self.server.model, "model": self.server.model, "size": 0, "digest": "stub"}]})
+        elif path == "/":
+            body = b"Ollama is running"
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        else:
+            self._send_json({"error": "not found"}, status=404)
+
+    def do_POST(self) -> None:  # noqa: N802
+        path = self.path.split("?")[0]
+        request = self._read_json()
+        if path == "/api/show":
+            self._send_json({"modelfile": "", "parameters": "", "template": "", "details": {"family": "stub"}, "model_info": {}, "capabilities": ["completion", "tools"]})
+        elif path == "/api/chat":
+            self._chat(request)
+        else:
+            self._send_json({"error": "not found"}, status=404)
+
+    def _chat(self, request: Dict[str, Any]) -> None:
+        responder = self.server.responder
+        self.server.touch(request.get("keep_alive"))
+        if not request.get("messages"):
+            # Ollama's load-only request: the model becomes resident, nothing is generated
+            self._send_json({"model": request.get("model") or self.server.model, "created_at": _now(), "message": {"role": "assistant", "content": ""}, "done_reason": "load", "done": True})
+            return
+        turns: List[Turn] = [(m.get("role", "user"), m.get("content") or "") for m in request.get("messages", [])]
+        content, calls = _split(responder.reply(turns))
+        tokens = tokenize(content)
+        model = request.get("model") or self.server.model
+        final = {
+            "model": model,
+            "created_at": _now(),
+            "message": {
+                "role": "assistant",
+                "content": "",
+                **({"tool_calls": [{"function": {"name": c["name"], "arguments": c["args"]}} for c in calls]} if calls else {}),
+            },
+            **responder.usage(turns, len(tokens)),
+        }
+
+        if not request.get("stream", True):
+            time.sleep(responder.ttft_s + responder.per_token_s * len(tokens))
+            final["message"]["content"] = content
+            self._send_json(final)
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for i, token in enumerate(tokens):
+            time.sleep(responder.ttft_s if i == 0 else responder.per_token_s)
+            self._write_chunk({"model": model, "created_at": _now(), "message": {"role": "assistant", "content": token}, "done": False})
+        self._write_chunk(final)
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _write_chunk(self, payload: Dict[str, Any]) -> None:
+        line = json.dumps(payload).encode() + b"\n"
+        self.wfile.write(f"{len(line):X}\r\n".encode() + line + b"\r\n")
+        self.wfile.flush()
+
+    def log_message(self, *args: Any) -> None:
+        pass
+
+
+class _StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address: Any, responder: ScriptedResponder, model: str) -> None:
+        super().__init__(address, _OllamaHandler)
+        self.responder, self.model = responder, model
+        self.expires_at: Optional[datetime] = None
+
+    def touch(self, keep_alive: Any) -> None:
+        """Model residency after a request, as Ollama applies ``keep_alive`` (seconds, "10m"/"1h", negative = forever)."""
+        if keep_alive is None:
+            keep_alive = "5m"
+        if isinstance(keep_alive, str) and keep_alive[-1:] in ("s", "m", "h"):
+            seconds = float(keep_alive[:-1]) * {"s": 1, "m": 60, "h": 3600}[keep_alive[-1]]
+        else:
+            seconds = float(keep_alive)
+        now = datetime.now(timezone.utc)
+        self.expires_at = now + timedelta(days=3650) if seconds < 0 else now + timedelta(seconds=seconds)
+
+
+class OllamaStub:
+    """
+    Background Ollama stand-in. ``port=0`` picks a free port; point ChatOllama
+    (or LLM_BASE_URL) at ``base_url``. Usable as a context manager.
+    """
+
+    def __init__(self, responder: Optional[ScriptedResponder] = None, host: str = "127.0.0.1", port: int = 0, model: str = "fake-ollama") -> None:
+        self.responder = responder or ScriptedResponder()
+        self._server = _StubServer((host, port), self.responder, model)
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "OllamaStub":
+        self._thread = threading.Thread(target=self._server.serve_forever, name="ollama-stub", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "OllamaStub":
+        return self.start()
+
+    def __exit__(self, *exc: Any) -> None:
+        self.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Scripted Ollama /api/chat stand-in")
+    parser.add_argument("--script", type=Path, help="JSON script (see ScriptedResponder.from_file)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--model", default="fake-ollama")
+    args = parser.parse_args()
+
+    responder = ScriptedResponder.from_file(args.script) if args.script else ScriptedResponder()
+    stub = OllamaStub(responder, host=args.host, port=args.port, model=args.model)
+    print(f"Ollama stub listening on {stub.base_url} (Ctrl+C to stop)")
+    try:
+        stub._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stub._server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,15 @@
+# src/tools/artifact_tool.py
+from langchain_core.tools import tool
+
+from src.utils.artifacts import get_store
+
+@tool
+def fetch_artifact(artifact_id: str) -> str:
+    """
+    Return the full text of a source cited by ID (e.g. src-3f2a9c1b7e) in an
+    earlier tool result. Use it only when the preview is not enough.
+    """
+    text = get_store().get(artifact_id)
+    if text is None:
+        return f"Error: unknown artifact '{artifact_id}' (IDs are valid for the current run only)."
+    return text
@@ -0,0 +1,500 @@
+# src/tools/code_sandbox.py
+"""
+Pool of long-lived Python worker processes for the Quant's ``run_python``
+tool. Workers are started ahead of time with pandas/NumPy imported, so a call
+only pays for the snippet itself. Each call runs under a CPU-time limit and
+an address-space cap (``resource`` rlimits), and the parent kills and replaces
+a worker that overruns the wall-clock timeout. Calls beyond the idle workers
+wait in a bounded queue; past that they are rejected.
+
+The OS-level confinement is the security boundary (Linux, see
+src/tools/confinement.py). After its imports, each worker enters an empty
+network namespace, is limited by Landlock to reading the Python installation
+(no writes anywhere, no TCP), runs in an empty read-only directory with a
+scrubbed environment and, when started as root, as ``SANDBOX_UID``. A worker
+missing the network namespace or the unprivileged uid refuses every snippet
+unless ``SANDBOX_REQUIRE_ISOLATION`` is turned off.
+
+On top of that, snippets are screened to keep them on the pandas/NumPy surface:
+imports come from a module allowlist, attribute reads are checked at run time
+so no other module object (``pd.core.frame.sys``...), frame or code object is
+reachable, and underscore attributes and the pandas/NumPy file I/O names
+(``read_*``, ``to_csv``..., ``np.load``/``np.save``) are refused. This
+narrows what a snippet can attempt; it is not what contains it.
+"""
+import ast
+import builtins
+import contextlib
+import io
+import math
+import multiprocessing
+import os
+import queue
+import shutil
+import stat
+import tempfile
+import sys
+import threading
+import types
+from typing import Any, Dict, List, Optional
+
+from src.core.config import settings
+from src.core.exceptions import ToolExecutionError
+from src.utils.robustness import log_agent_action
+
+try:
+    import resource
+except ImportError:  # Windows: no rlimits, only the wall-clock timeout applies
+    resource = None
+
+# Modules a snippet may import
+ALLOWED_IMPORTS = frozenset({
+    "math", "statistics", "decimal", "fractions", "datetime", "json", "re",
+    "itertools", "functools", "collections", "collections.abc", "operator",
+    "numpy", "numpy.linalg", "numpy.random", "numpy.fft", "numpy.ma", "numpy.polynomial",
+    "numpy.polynomial.polynomial", "pandas", "pandas.tseries.offsets",
+})
+# Module objects a snippet may hold: the importable ones plus public namespaces reached from them
+_ALLOWED_MODULES = ALLOWED_IMPORTS | {"numpy.lib.scimath", "numpy.dtypes", "numpy.exceptions", "pandas.arrays", "pandas.errors"}
+# Objects that lead back to module globals or interpreter internals
+_BLOCKED_TYPES = (types.FrameType, types.CodeType, types.TracebackType)
+# Builtins a snippet does not get (file and interpreter access, attribute access by string)
+_BLOCKED_BUILTINS = frozenset({
+    "open", "exec", "eval", "compile", "input", "breakpoint", "exit", "quit",
+    "getattr", "setattr", "delattr", "vars", "globals", "locals", "dir", "memoryview",
+    "help", "license", "credits", "copyright",
+})
+# Attributes (and imported names) a snippet may not touch: file I/O in pandas/NumPy, string
+# evaluation, and helpers that resolve attributes from strings. read_* is refused as a prefix.
+_BLOCKED_ATTRS = frozenset({
+    "io", "lib", "ctypeslib", "testing", "f2py", "api",
+    "load", "save", "savez", "savez_compressed", "fromfile", "tofile", "loadtxt", "savetxt",
+    "genfromtxt", "fromregex", "memmap", "open_memmap", "DataSource",
+    "HDFStore", "ExcelFile", "ExcelWriter", "eval", "query",
+    "format", "format_map", "attrgetter", "methodcaller",
+})
+# to_* conversions that stay in memory; every other to_* (to_csv, to_pickle, ...) writes files
+_SAFE_TO_ATTRS = frozenset({
+    "to_string", "to_dict", "to_list", "to_numpy", "to_frame", "to_records", "to_series",
+    "to_period", "to_timestamp", "to_datetime", "to_numeric", "to_timedelta", "to_pydatetime",
+    "to_flat_index", "to_offset",
+})
+# Worker start-up (interpreter + pandas/NumPy imports) is not charged to the first call's timeout
+_START_TIMEOUT_S = 60.0
+
+
+class CpuLimitExceeded(Exception):
+    pass
+
+
+def _on_sigxcpu(signum: int, frame: Any) -> None:
+    raise CpuLimitExceeded("CPU time limit exceeded")
+
+
+def _import_module(name: str, top: bool = False) -> Any:
+    """A snippet's ``import`` statement: allowlisted modules only; ``top`` returns the top-level package."""
+    if name not in ALLOWED_IMPORTS:
+        raise ImportError(f"import of '{name}' is not allowed in the sandbox")
+    import importlib
+
+    module = importlib.import_module(name)
+    return sys.modules[name.split(".")[0]] if top else module
+
+
+def _guard_value(value: Any, label: str) -> Any:
+    if isinstance(value, types.ModuleType) and value.__name__ not in _ALLOWED_MODULES or isinstance(value, _BLOCKED_TYPES):
+        raise PermissionError(f"'{label}' is not allowed in the sandbox")
+    return value
+
+
+def _guard_attr(obj: Any, name: str) -> Any:
+    """Every attribute read in a snippet: other modules, frames and code objects are not handed out."""
+    return _guard_value(getattr(obj, name), name)
+
+
+def _call(func: str, *args: Any) -> ast.Call:
+    return ast.Call(func=ast.Name(id=func, ctx=ast.Load()), args=[ast.Constant(a) if not isinstance(a, ast.AST) else a for a in args], keywords=[])
+
+
+class _Guard(ast.NodeTransformer):
+    """
+    Routes a snippet's attribute reads through ``_guard_attr`` and its import
+    statements through ``_import_module``. The interpreter's own ``__import__``
+    stays in place for the libraries, whose C code imports through the
+    calling frame's builtins.
+    """
+
+    def visit_Attribute(self, node: ast.Attribute) -> ast.AST:
+        self.generic_visit(node)
+        if not isinstance(node.ctx, ast.Load):
+            return node
+        return ast.copy_location(_call("_guard_attr", node.value, node.attr), node)
+
+    def visit_Import(self, node: ast.Import) -> List[ast.stmt]:
+        # ``import a.b`` binds ``a``; ``import a.b as c`` binds the submodule
+        return [
+            ast.copy_location(ast.Assign(
+                targets=[ast.Name(id=alias.asname or alias.name.split(".")[0], ctx=ast.Store())],
+                value=_call("_import_module", alias.name, alias.asname is None),
+            ), node)
+            for alias in node.names
+        ]
+
+    def visit_ImportFrom(self, node: ast.ImportFrom) -> List[ast.stmt]:
+        if node.level or any(alias.name == "*" for alias in node.names):
+            raise ImportError("relative and star imports are not allowed in the sandbox")
+        return [
+            ast.copy_location(ast.Assign(
+                targets=[ast.Name(id=alias.asname or alias.name, ctx=ast.Store())],
+                value=_call("_guard_attr", _call("_import_module", node.module), alias.name),
+            ), node)
+            for alias in node.names
+        ]
+
+
+def _check_name(name: str) -> None:
+    if (
+        name.startswith("_")
+        or name in _BLOCKED_ATTRS
+        or name.startswith("read_")
+        or (name.startswith("to_") and name not in _SAFE_TO_ATTRS)
+    ):
+        raise PermissionError(f"'{name}' is not allowed in the sandbox")
+
+
+def validate(tree: ast.AST) -> None:
+    """Refuses underscore and I/O attributes, dunder names and such imports; raises PermissionError."""
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Attribute):
+            _check_name(node.attr)
+        elif isinstance(node, ast.Name) and node.id.startswith("__"):
+            raise PermissionError(f"'{node.id}' is not allowed in the sandbox")
+        elif isinstance(node, ast.Import):
+            for alias in node.names:
+                for part in alias.name.split(".")[1:]:
+                    _check_name(part)
+        elif isinstance(node, ast.ImportFrom):
+            for part in (node.module or "").split(".")[1:]:
+                _check_name(part)
+            for alias in node.names:
+                _check_name(alias.name)
+
+
+def _world_readable(path: str) -> bool:
+    """Whether any uid can read ``path``: it and every directory above it allow others in."""
+    path = os.path.abspath(path)
+    if not os.stat(path).st_mode & stat.S_IROTH:
+        return False
+    while path != os.path.dirname(path):
+        path = os.path.dirname(path)
+        if not os.stat(path).st_mode & stat.S_IXOTH:
+            return False
+    return True
+
+
+def _library_dirs() -> List[str]:
+    """What a worker still reads after confinement: the interpreter's stdlib and site-packages, system libraries."""
+    import sysconfig
+
+    import numpy as np
+    import pandas as pd
+
+    paths = {sysconfig.get_paths()[key] for key in ("stdlib", "platstdlib", "purelib", "platlib")}
+    paths |= {os.path.dirname(os.path.dirname(m.__file__)) for m in (np, pd)}
+    return sorted(paths | {"/usr/lib", "/usr/lib64", "/lib", "/lib64", "/usr/local/lib"})
+
+
+def isolation_gaps(applied: Dict[str, Any]) -> List[str]:
+    """The required isolation steps a worker could not apply (see SANDBOX_REQUIRE_ISOLATION)."""
+    gaps = []
+    if not applied.get("network"):
+        gaps.append("network namespace")
+    if applied.get("uid") == 0:
+        gaps.append("unprivileged uid")
+    return gaps
+
+
+def _isolate(workdir: str, uid: int) -> Dict[str, Any]:
+    """
+    Cuts the worker off from the host before it runs any snippet (see
+    src/tools/confinement.py). Returns what was applied: ``network``,
+    ``filesystem`` (Landlock) and the ``uid`` snippets run as.
+    """
+    applied: Dict[str, Any] = {"network": False, "filesystem": False, "uid": os.getuid() if hasattr(os, "getuid") else None}
+    keep = {var: os.environ[var] for var in ("OPENBLAS_NUM_THREADS", "OMP_NUM_THREADS", "MKL_NUM_THREADS") if var in os.environ}
+    os.environ.clear()
+    os.environ.update(keep, HOME=workdir)
+    os.chdir(workdir)
+    if not sys.platform.startswith("linux"):
+        return applied
+    from src.tools import confinement
+
+    root = os.geteuid() == 0
+    with contextlib.suppress(OSError):
+        applied["network"] = confinement.unshare_network()
+    libraries = _library_dirs()
+    with contextlib.suppress(OSError):
+        applied["filesystem"] = confinement.restrict_filesystem(libraries)
+    # pandas imports submodules lazily, so the new uid must still read the installation: through
+    # CAP_DAC_READ_SEARCH once Landlock bounds the reads, otherwise only if it is world-readable
+    if root and (applied["filesystem"] or all(_world_readable(path) for path in libraries if os.path.exists(path))):
+        with contextlib.suppress(OSError):
+            confinement.drop_privileges(uid, keep_read_search=applied["filesystem"])
+        applied["uid"] = os.getuid()
+    if resource is not None:
+        import signal
+        # Writes to regular files fail with EFBIG instead of killing the worker
+        signal.signal(signal.SIGXFSZ, signal.SIG_IGN)
+        resource.setrlimit(resource.RLIMIT_FSIZE, (0, 0))
+    return applied
+
+
+def _vm_bytes() -> int:
+    """Current address-space size of this process (Linux), 0 where unknown."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[0]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return 0
+
+
+def format_value(value: Any, max_rows: int, max_chars: int) -> str:
+    """Compact text for a result: frames and series as truncated tables, everything else via repr."""
+    import numpy as np
+    import pandas as pd
+
+    if isinstance(value, np.generic):
+        value = value.item()
+    elif isinstance(value, np.ndarray) and value.ndim <= 2:
+        value = pd.DataFrame(value) if value.ndim == 2 else pd.Series(value)
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        fmt = lambda x: f"{x:,.4g}"
+        if isinstance(value, pd.DataFrame):
+            text = value.to_string(max_rows=max_rows, max_cols=12, float_format=fmt)
+            text = f"{text}\n[{value.shape[0]} rows x {value.shape[1]} columns]"
+        else:
+            text = value.to_string(max_rows=max_rows, float_format=fmt)
+            text = f"{text}\n[{len(value)} rows]"
+    else:
+        text = repr(value)
+    return text if len(text) <= max_chars else text[: max_chars - 15] + "\n... (truncated)"
+
+
+def execute(code: str, records: Optional[List[Dict[str, Any]]], columns: Optional[List[str]], max_rows: int, max_chars: int) -> str:
+    """
+    Runs ``code`` with ``pd``, ``np`` and (given data) ``df`` in scope. The
+    value of a trailing expression, or of a variable named ``result``, is
+    returned as a compact table after anything the code printed.
+    """
+    import numpy as np
+    import pandas as pd
+
+    tree = ast.parse(code, mode="exec")
+    validate(tree)
+    tree = ast.fix_missing_locations(_Guard().visit(tree))
+    tail = None
+    if tree.body and isinstance(tree.body[-1], ast.Expr):
+        tail = ast.Expression(tree.body.pop().value)
+    safe_builtins = {name: obj for name, obj in vars(builtins).items() if name not in _BLOCKED_BUILTINS}
+    namespace: Dict[str, Any] = {
+        "__builtins__": safe_builtins, "_guard_attr": _guard_attr, "_import_module": _import_module,
+        "pd": pd, "np": np, "math": math,
+    }
+    if records is not None:
+        namespace["df"] = pd.DataFrame(records, columns=columns)
+
+    stdout = io.StringIO()
+    with contextlib.redirect_stdout(stdout):
+        exec(compile(tree, "<sandbox>", "exec"), namespace)
+        value = eval(compile(tail, "<sandbox>", "eval"), namespace) if tail is not None else namespace.get("result")
+
+    parts = [stdout.getvalue().rstrip()] if stdout.getvalue().strip() else []
+    if value is not None:
+        parts.append(format_value(value, max_rows, max_chars))
+    output = "\n".join(parts) or "(no output: end with an expression or assign `result`)"
+    return output if len(output) <= max_chars else output[: max_chars - 15] + "\n... (truncated)"
+
+
+def _worker_main(conn: Any, memory_mb: int, cpu_s: int, workdir: str, uid: int, require_isolation: bool) -> None:
+    """Worker loop: import once, isolate, then run one snippet per request until told to stop."""
+    # One BLAS thread per worker: the pool is the parallelism, and idle thread stacks eat into the memory cap
+    for var in ("OPENBLAS_NUM_THREADS", "OMP_NUM_THREADS", "MKL_NUM_THREADS"):
+        os.environ[var] = "1"
+    import numpy
+    import pandas
+
+    # Loads the formatting code every result goes through while the imports are still unrestricted
+    format_value(pandas.DataFrame({"x": numpy.arange(2.0)}), 1, 100)
+    format_value(pandas.Series(numpy.arange(2.0)), 1, 100)
+    isolation = _isolate(workdir, uid)
+    # Fail closed: without the required isolation no snippet runs
+    refusal = None
+    if require_isolation and isolation_gaps(isolation):
+        refusal = (
+            f"PermissionError: sandbox isolation unavailable ({', '.join(isolation_gaps(isolation))}); "
+            "set SANDBOX_REQUIRE_ISOLATION=false only where the host already confines the process"
+        )
+
+    if resource is not None:
+        import signal
+        signal.signal(signal.SIGXCPU, _on_sigxcpu)
+        if memory_mb:
+            # Headroom on top of what the imports already mapped
+            limit = _vm_bytes() + memory_mb * 1024 * 1024
+            resource.setrlimit(resource.RLIMIT_AS, (limit, resource.getrlimit(resource.RLIMIT_AS)[1]))
+    cpu_hard = resource.getrlimit(resource.RLIMIT_CPU)[1] if resource is not None else None
+    conn.send(("ready", isolation))
+
+    while True:
+        try:
+            job = conn.recv()
+        except EOFError:
+            return
+        if job is None:
+            return
+        if resource is not None and cpu_s:
+            # RLIMIT_CPU counts the whole process lifetime: allow cpu_s more than used so far
+            usage = resource.getrusage(resource.RUSAGE_SELF)
+            resource.setrlimit(resource.RLIMIT_CPU, (math.ceil(usage.ru_utime + usage.ru_stime) + cpu_s, cpu_hard))
+        if refusal is not None:
+            conn.send(("error", refusal))
+            continue
+        try:
+            conn.send(("ok", execute(**job)))
+        except MemoryError:
+            conn.send(("error", f"MemoryError: exceeded the {memory_mb} MB memory limit"))
+        except BaseException as e:
+            conn.send(("error", f"{type(e).__name__}: {e}"))
+        finally:
+            if resource is not None and cpu_s:
+                resource.setrlimit(resource.RLIMIT_CPU, (cpu_hard, cpu_hard))
+
+
+class _Worker:
+    """One sandbox process and the parent's end of its pipe."""
+
+    def __init__(self, ctx: Any, workdir: str) -> None:
+        self.conn, child = ctx.Pipe()
+        self.process = ctx.Process(
+            target=_worker_main,
+            args=(child, settings.SANDBOX_MEMORY_MB, settings.SANDBOX_CPU_S, workdir, settings.SANDBOX_UID, settings.SANDBOX_REQUIRE_ISOLATION),
+            daemon=True,
+        )
+        self.process.start()
+        child.close()
+        self.isolation: Optional[Dict[str, Any]] = None
+
+    def call(self, job: Dict[str, Any], timeout: float) -> str:
+        """Sends one job and waits for its reply; raises TimeoutError or EOFError (worker gone)."""
+        if self.isolation is None:
+            if not self.conn.poll(_START_TIMEOUT_S):
+                raise TimeoutError("sandbox worker did not start")
+            _, self.isolation = self.conn.recv()
+        self.conn.send(job)
+        if not self.conn.poll(timeout):
+            raise TimeoutError(f"execution exceeded {timeout:g}s")
+        status, payload = self.conn.recv()
+        if status != "ok":
+            raise ToolExecutionError(payload)
+        return payload
+
+    def stop(self, kill: bool = False) -> None:
+        if kill:
+            self.process.kill()
+        else:
+            with contextlib.suppress(OSError):
+                self.conn.send(None)
+        self.process.join(timeout=1)
+        if self.process.is_alive():
+            self.process.kill()
+        self.conn.close()
+
+
+class CodeSandbox:
+    """
+    Fixed pool of sandbox workers with a bounded wait queue.
+
+    ``run`` blocks until a worker is free (callers on the event loop use it via
+    ``run_in_executor``); at most ``queue_size`` calls wait at once, further
+    ones raise ``ToolExecutionError`` immediately. A worker that times out or
+    dies is replaced, so one bad snippet never shrinks the pool.
+    """
+
+    def __init__(self, workers: int = 2, queue_size: int = 8) -> None:
+        self.workers = workers
+        self.queue_size = queue_size
+        # spawn: never fork a process that owns an event loop and worker threads
+        self._ctx = multiprocessing.get_context("spawn")
+        self._idle: "queue.Queue[_Worker]" = queue.Queue()
+        self._slots = threading.BoundedSemaphore(workers + queue_size)
+        self._started = False
+        self._lock = threading.Lock()
+        self._workdir: Optional[str] = None
+        # What the first worker to answer applied (see _isolate); None until then
+        self.isolation: Optional[Dict[str, Any]] = None
+
+    def warm(self) -> None:
+        """Starts every worker now so pandas/NumPy are imported before the first call."""
+        with self._lock:
+            if not self._started:
+                # Empty and read-only: the workers' cwd and HOME
+                self._workdir = tempfile.mkdtemp(prefix="sandbox_")
+                os.chmod(self._workdir, stat.S_IRUSR | stat.S_IXUSR | stat.S_IRGRP | stat.S_IXGRP | stat.S_IROTH | stat.S_IXOTH)
+                for _ in range(self.workers):
+                    self._idle.put(_Worker(self._ctx, self._workdir))
+                self._started = True
+
+    def _report_isolation(self, worker: _Worker) -> None:
+        """Logs once which isolation steps the host did not allow (snippets are refused unless opted out)."""
+        if self.isolation is not None or not worker.isolation:
+            return
+        self.isolation = worker.isolation
+        gaps = isolation_gaps(worker.isolation) + ([] if worker.isolation["filesystem"] else ["filesystem restriction"])
+        if gaps:
+            mode = "refusing snippets" if settings.SANDBOX_REQUIRE_ISOLATION else "running anyway (SANDBOX_REQUIRE_ISOLATION=false)"
+            log_agent_action("Quant", "SandboxIsolation", f"not applied: {', '.join(gaps)}; {mode}")
+
+    def run(self, code: str, records: Optional[List[Dict[str, Any]]] = None, columns: Optional[List[str]] = None) -> str:
+        """Executes ``code`` in a free worker and returns its compact output."""
+        self.warm()
+        if not self._slots.acquire(blocking=False):
+            raise ToolExecutionError(f"sandbox busy: {self.workers} running and {self.queue_size} queued calls")
+        try:
+            worker = self._idle.get()
+            job = {"code": code, "records": records, "columns": columns, "max_rows": settings.SANDBOX_MAX_ROWS, "max_chars": settings.SANDBOX_MAX_OUTPUT_CHARS}
+            try:
+                return worker.call(job, settings.SANDBOX_TIMEOUT_S)
+            except (TimeoutError, EOFError, OSError) as e:
+                # Busy or dead: its state is unknown, so it is replaced rather than reused
+                log_agent_action("Quant", "SandboxRestart", str(e) or type(e).__name__)
+                worker.stop(kill=True)
+                exitcode, worker = worker.process.exitcode, _Worker(self._ctx, self._workdir)
+                if isinstance(e, TimeoutError):
+                    raise ToolExecutionError(str(e))
+                raise ToolExecutionError(f"sandbox worker exited (exit code {exitcode})")
+            finally:
+                self._report_isolation(worker)
+                self._idle.put(worker)
+        finally:
+            self._slots.release()
+
+    def shutdown(self) -> None:
+        with self._lock:
+            started, self._started = self._started, False
+        while started:
+            try:
+                self._idle.get_nowait().stop()
+            except queue.Empty:
+                break
+        if started and self._workdir:
+            shutil.rmtree(self._workdir, ignore_errors=True)
+
+
+_sandbox: Optional[CodeSandbox] = None
+
+def get_sandbox() -> CodeSandbox:
+    """Process-wide sandbox pool configured from settings."""
+    global _sandbox
+    if _sandbox is None:
+        _sandbox = CodeSandbox(workers=settings.SANDBOX_WORKERS, queue_size=settings.SANDBOX_QUEUE_SIZE)
+    return _sandbox
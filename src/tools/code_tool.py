@@ -0,0 +1,52 @@
+# src/tools/code_tool.py
+import asyncio
+from typing import Any, Dict, List, Optional, Tuple
+from langchain_core.tools import StructuredTool
+from pydantic import BaseModel, Field
+from src.utils.robustness import log_agent_action
+from src.utils.validation import parse_dataframe
+from src.tools.code_sandbox import get_sandbox
+
+class PythonInput(BaseModel):
+    """Tool-call arguments; ``data_str`` is optional and becomes ``df`` in the snippet."""
+    code: str = Field(description="Python code using pd, np and df. End with an expression (or assign `result`) to return it.")
+    data_str: str = Field(default="", description="Optional JSON or CSV data, available as the DataFrame `df`.")
+
+def _records(data_str: str) -> Tuple[Optional[List[Dict[str, Any]]], Optional[List[str]]]:
+    """Validated payload as plain records (cheap to pickle into a worker), or no data."""
+    if not data_str.strip():
+        return None, None
+    df = parse_dataframe(data_str)
+    return df.to_dict(orient="records"), list(df.columns)
+
+def _run_python(code: str, data_str: str = "") -> str:
+    """
+    Run a short pandas/NumPy computation in a sandboxed worker and return its result as a compact table.
+
+    Args:
+        code (str): Python snippet; ``pd``, ``np`` and (with data) ``df`` are predefined.
+        data_str (str): Optional JSON or CSV payload, parsed into ``df``.
+
+    Returns:
+        str: Printed output plus the final value, or an error message.
+    """
+    log_agent_action("Quant", "RunPython", f"{len(code)} chars")
+    try:
+        records, columns = _records(data_str)
+        return get_sandbox().run(code, records, columns)
+    except Exception as e:
+        error_msg = f"Error running code: {str(e)}"
+        log_agent_action("Quant", "Error", error_msg)
+        return error_msg
+
+async def _arun_python(code: str, data_str: str = "") -> str:
+    """Async variant used by the graph: the blocking wait for a worker runs off the event loop."""
+    return await asyncio.get_running_loop().run_in_executor(None, _run_python, code, data_str)
+
+run_python = StructuredTool.from_function(
+    func=_run_python,
+    coroutine=_arun_python,
+    name="run_python",
+    description="Run a short pandas/NumPy computation on data and return the result as a compact table.",
+    args_schema=PythonInput,
+)
@@ -0,0 +1,180 @@
+# src/tools/plot_renderer.py
+import asyncio
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, List, Optional, Set
+
+from src.core.config import settings
+
+# Output profiles: quick PNG previews for the agent loop vs. print-quality figures
+PLOT_PROFILES: Dict[str, Dict[str, Any]] = {
+    "preview": {"dpi": 100, "format": "png", "figsize": (8, 5)},
+    "publication": {"dpi": 300, "format": "png", "figsize": (10, 6)},
+    "vector": {"dpi": 300, "format": "svg", "figsize": (10, 6)},
+}
+
+_sns = None
+
+def _plotting():
+    """
+    Imports seaborn/matplotlib and applies the academic theme once per process.
+    """
+    global _sns
+    if _sns is None:
+        import matplotlib
+        matplotlib.use("Agg")
+        import seaborn as sns
+        # Set academic style
+        sns.set_theme(style="whitegrid")
+        matplotlib.rcParams.update({'font.size': 12, 'figure.dpi': 300})
+        _sns = sns
+    return _sns
+
+def _init_worker() -> None:
+    """Pool initializer: pay the import, theme and font-cache cost before the first request."""
+    _plotting()
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    fig = Figure(figsize=(1, 1), dpi=10)
+    fig.add_subplot(111).set_title("warm-up")
+    FigureCanvasAgg(fig).draw()
+
+def _noop() -> None:
+    return None
+
+def render_chart(
+    records: List[Dict[str, Any]],
+    plot_type: str,
+    title: str,
+    xlabel: str,
+    ylabel: str,
+    out_path: str,
+    profile: str = "publication",
+    columns: Optional[List[str]] = None,
+) -> str:
+    """
+    Renders one chart to ``out_path``. Runs inside a pool worker, so it only
+    takes picklable arguments.
+
+    Returns:
+        str: The written image path.
+    """
+    import pandas as pd
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg as FigureCanvas
+
+    sns = _plotting()
+    spec = PLOT_PROFILES.get(profile, PLOT_PROFILES["publication"])
+    df = pd.DataFrame(records, columns=columns)
+
+    # Object-Oriented Approach: no pyplot global state, safe in long-lived workers
+    fig = Figure(figsize=spec["figsize"], dpi=spec["dpi"])
+    ax = fig.add_subplot(111)
+
+    if plot_type == "bar":
+        sns.barplot(x=df.columns[0], y=df.columns[1], data=df, palette="viridis", ax=ax)
+    elif plot_type == 'line':
+        sns.lineplot(data=df, x='year', y='value', marker='o', ax=ax)
+    elif plot_type == 'scatter':
+        sns.scatterplot(data=df, x='year', y='value', s=100, ax=ax)
+    elif plot_type == 'hist':
+        sns.histplot(data=df, x='value', kde=True, ax=ax)
+    else:
+        sns.barplot(data=df, x='label', y='value', ax=ax) # Default
+
+    ax.set_title(title, fontsize=16, fontweight='bold', pad=20)
+    ax.set_xlabel(xlabel, fontsize=12)
+    ax.set_ylabel(ylabel, fontsize=12)
+    fig.tight_layout()
+
+    # Write-then-rename so a concurrent cache lookup never sees a half-written image
+    tmp_path = f"{out_path}.{os.getpid()}.tmp"
+    FigureCanvas(fig).print_figure(tmp_path, bbox_inches='tight', format=spec["format"])
+    os.replace(tmp_path, out_path)
+    return out_path
+
+
+class ChartRenderer:
+    """
+    Renders charts off the event loop in a pre-warmed process pool.
+
+    ``submit`` returns a ``concurrent.futures.Future`` immediately; callers on
+    the event loop await it via ``asyncio.wrap_future`` so several charts render
+    in parallel while the agent loop keeps moving. With ``workers=0`` rendering
+    falls back to a single background thread in-process.
+    """
+
+    def __init__(self, workers: int = 2) -> None:
+        self.workers = workers
+        self._executor: Optional[Any] = None
+        self._pending: Set[Future] = set()
+        self._warm = False
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> Any:
+        with self._lock:
+            if self._executor is None:
+                if self.workers > 0:
+                    # spawn: never fork a process that owns an event loop and worker threads
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.workers,
+                        mp_context=multiprocessing.get_context("spawn"),
+                        initializer=_init_worker,
+                    )
+                else:
+                    self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="plot", initializer=_init_worker)
+            return self._executor
+
+    def warm(self) -> None:
+        """Starts every worker now (imports + theme) so the first chart doesn't pay for it. Idempotent."""
+        executor = self._get_executor()
+        with self._lock:
+            if self._warm:
+                return
+            self._warm = True
+        for _ in range(max(1, self.workers)):
+            executor.submit(_noop)
+
+    def submit(self, *args: Any, **kwargs: Any) -> Future:
+        """Queues ``render_chart(*args, **kwargs)``; returns its future."""
+        try:
+            future = self._get_executor().submit(render_chart, *args, **kwargs)
+        except BrokenProcessPool:
+            # A worker died (OOM, segfault in a backend): start a fresh pool once
+            self.shutdown(wait=False)
+            future = self._get_executor().submit(render_chart, *args, **kwargs)
+        with self._lock:
+            self._pending.add(future)
+        future.add_done_callback(self._discard)
+        return future
+
+    def _discard(self, future: Future) -> None:
+        with self._lock:
+            self._pending.discard(future)
+
+    async def drain(self) -> None:
+        """Waits for every outstanding render (e.g. fire-and-forget charts) to finish."""
+        with self._lock:
+            pending = list(self._pending)
+        if pending:
+            await asyncio.gather(*(asyncio.wrap_future(f) for f in pending), return_exceptions=True)
+
+    def shutdown(self, wait: bool = True) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+            self._warm = False
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=not wait)
+
+
+_renderer: Optional[ChartRenderer] = None
+
+def get_renderer() -> ChartRenderer:
+    """Process-wide renderer configured from settings."""
+    global _renderer
+    if _renderer is None:
+        _renderer = ChartRenderer(workers=settings.PLOT_WORKERS)
+    return _renderer
@@ -1,26 +1,180 @@
 # src/tools/plot_tool.py
-import seaborn as sns
-import matplotlib.pyplot as plt
-import pandas as pd
-import io
+import asyncio
+import hashlib
 import os
-from langchain_core.tools import tool
+import threading
+from concurrent.futures import Future
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional, Tuple
+from langchain_core.tools import StructuredTool
+from pydantic import BaseModel, Field
 from src.utils.robustness import log_agent_action
 from src.core.config import settings
-from src.utils.validation import validate_dataframe
+from src.utils.validation import infer_types, validate_dataframe
+from src.tools.plot_renderer import PLOT_PROFILES, get_renderer
 
-# Set academic style
-sns.set_theme(style="whitegrid")
-plt.rcParams.update({'font.size': 12, 'figure.dpi': 300})
+if TYPE_CHECKING:
+    import pandas as pd
 
-@tool
+class PlotInput(BaseModel):
+    """Tool-call arguments; ``data_str`` is parsed once by validate_dataframe."""
+    data_str: str = Field(description="JSON or CSV string containing the data.")
+    plot_type: str = Field(description="Type of chart ('bar', 'line', 'scatter', 'hist').")
+    title: str = Field(description="Title of the chart.")
+    xlabel: str = Field(description="Label for the X-axis.")
+    ylabel: str = Field(description="Label for the Y-axis.")
+
+# Renders in flight, by artifact key: a repeat while the first is still rendering joins it
+_inflight: Dict[str, Future] = {}
+_inflight_lock = threading.Lock()
+# Queued renders (PLOT_WAIT=false) that failed after the tool returned; reported by the next call
+_failed: List[str] = []
+
+def _artifact_key(csv_text: str, plot_type: str, title: str, xlabel: str, ylabel: str, profile: str) -> str:
+    """Content address of a chart: normalized data + everything that changes the image."""
+    payload = "\x1f".join([csv_text, plot_type, title, xlabel, ylabel, profile])
+    return hashlib.sha256(payload.encode()).hexdigest()[:16]
+
+def evict_outputs(output_dir: str, max_bytes: int, protect: Iterable[str] = ()) -> int:
+    """
+    Size-bounded LRU eviction of chart artifacts. A chart and its raw CSV share a
+    stem and are evicted together; cache hits refresh the mtime.
+
+    Returns:
+        int: Number of files removed.
+    """
+    if max_bytes <= 0:
+        return 0
+    groups: Dict[str, List[os.DirEntry]] = {}
+    with os.scandir(output_dir) as entries:
+        for entry in entries:
+            if entry.is_file() and not entry.name.endswith(".tmp"):
+                groups.setdefault(os.path.splitext(entry.name)[0], []).append(entry)
+    sizes = {stem: sum(e.stat().st_size for e in files) for stem, files in groups.items()}
+    total = sum(sizes.values())
+    if total <= max_bytes:
+        return 0
+    protected = {os.path.splitext(os.path.basename(p))[0] for p in protect}
+    removed = 0
+    for stem in sorted(groups, key=lambda k: max(e.stat().st_mtime for e in groups[k])):
+        if total <= max_bytes:
+            break
+        if stem in protected:
+            continue
+        for entry in groups[stem]:
+            try:
+                os.remove(entry.path)
+                removed += 1
+            except FileNotFoundError:
+                pass
+        total -= sizes[stem]
+    return removed
+
+def _touch(*paths: str) -> None:
+    for path in paths:
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+
+def _prepare(df: "pd.DataFrame", plot_type: str, title: str, xlabel: str, ylabel: str) -> Tuple[Optional[Dict[str, Any]], str, str]:
+    """
+    Writes the raw-data CSV and builds the render job for an already validated frame.
+    The CSV (and its hash) come from the payload as given; only the rendered copy
+    is type-coerced. Artifacts are content-addressed, so a repeat of an existing chart returns
+    no job and the existing paths.
+
+    Returns:
+        Tuple[Optional[Dict[str, Any]], str, str]: render_chart kwargs (None on a cache hit), image path, CSV path.
+    """
+    log_agent_action("Quant", "GenerateChart", f"Type: {plot_type}, Title: {title}")
+
+    output_dir = settings.OUTPUT_DIR
+    if not os.path.exists(output_dir):
+        os.makedirs(output_dir)
+
+    # 1. Content address: the payload's CSV is both the hash input and the audit file
+    profile = settings.PLOT_PROFILE
+    csv_text = df.to_csv(index=False)
+    key = _artifact_key(csv_text, plot_type, title, xlabel, ylabel, profile)
+    safe_title = "".join([c if c.isalnum() else "_" for c in title]).lower()[:64]
+    csv_path = os.path.join(output_dir, f"{safe_title}_{key}.csv")
+    image_path = os.path.join(output_dir, f"{safe_title}_{key}.{PLOT_PROFILES[profile]['format']}")
+
+    if os.path.exists(image_path) and os.path.exists(csv_path):
+        _touch(image_path, csv_path)
+        log_agent_action("Quant", "ChartCacheHit", image_path)
+        return None, image_path, csv_path
+
+    # 2. Save Raw Data (Audit Trail)
+    with open(csv_path, "w", encoding="utf-8", newline="") as f:
+        f.write(csv_text)
+
+    # 3. Render job (plain records so it pickles cheaply into the pool)
+    df = infer_types(df)
+    job = {
+        "records": df.to_dict(orient="records"),
+        "columns": list(df.columns),
+        "plot_type": plot_type,
+        "title": title,
+        "xlabel": xlabel,
+        "ylabel": ylabel,
+        "out_path": image_path,
+        "profile": profile,
+    }
+    return job, image_path, csv_path
+
+def _submit(job: Optional[Dict[str, Any]], image_path: str) -> Future:
+    """Queues the render, joining an identical one already in flight."""
+    if job is None:
+        done: Future = Future()
+        done.set_result(image_path)
+        return done
+    with _inflight_lock:
+        future = _inflight.get(image_path)
+        if future is not None and not future.done():
+            return future
+        future = get_renderer().submit(**job)
+        _inflight[image_path] = future
+    future.add_done_callback(lambda f: _finish(image_path, f))
+    return future
+
+def _finish(image_path: str, future: Future) -> None:
+    with _inflight_lock:
+        if _inflight.get(image_path) is future:
+            del _inflight[image_path]
+        protect = list(_inflight)
+    if not future.cancelled() and future.exception() is None:
+        evict_outputs(os.path.dirname(image_path), settings.OUTPUT_MAX_BYTES, protect=protect + [image_path])
+
+def _record_failure(image_path: str, future: Future) -> None:
+    if future.cancelled() or future.exception() is None:
+        return
+    log_agent_action("Quant", "Error", f"Error creating plot: {future.exception()}")
+    with _inflight_lock:
+        _failed.append(f"{image_path} ({future.exception()})")
+
+def _report(message: str) -> str:
+    """``message`` preceded by any queued charts that failed since the last call."""
+    with _inflight_lock:
+        failed = _failed[:]
+        _failed.clear()
+    if not failed:
+        return message
+    return "Earlier queued chart failed, it does not exist: " + "; ".join(failed) + "\n" + message
+
+def _error(e: Exception) -> str:
+    error_msg = f"Error creating plot: {str(e)}"
+    log_agent_action("Quant", "Error", error_msg)
+    return error_msg
+
+# df is annotated Any: ToolNode resolves these type hints at graph build time, and pandas stays lazy
 @validate_dataframe
-def create_plot(data_str: str, plot_type: str, title: str, xlabel: str, ylabel: str) -> str:
+def _create_plot(df: Any, plot_type: str, title: str, xlabel: str, ylabel: str) -> str:
     """
     Generate a publication-quality plot and save the raw data for verification.
 
     Args:
-        data_str (str): JSON or CSV string containing the data.
+        df (pd.DataFrame): Frame parsed from the ``data_str`` payload.
         plot_type (str): Type of chart ('bar', 'line', 'pie').
         title (str): Title of the chart.
         xlabel (str): Label for the X-axis.
@@ -30,67 +184,34 @@ def create_plot(data_str: str, plot_type: str, title: str, xlabel: str, ylabel:
         str: Success message with file paths.
     """
     try:
-        log_agent_action("Quant", "GenerateChart", f"Type: {plot_type}, Title: {title}")
-        
-        # Security: Input Size Limit (50KB)
-        MAX_DATA_SIZE = 1024 * 50
-        if len(data_str) > MAX_DATA_SIZE:
-             return "Error: Data size exceeds security limit (50KB)."
-
-        # Robust parsing
-        try:
-             df = pd.read_csv(io.StringIO(data_str))
-        except:
-             import json
-             data = json.loads(data_str)
-             df = pd.DataFrame(data)
-
-        # 1. Save Raw Data (Audit Trail)
-        output_dir = settings.OUTPUT_DIR
-        if not os.path.exists(output_dir):
-            os.makedirs(output_dir)
-            
-        
-        import uuid
-        safe_title = "".join([c if c.isalnum() else "_" for c in title]).lower()
-        unique_id = uuid.uuid4().hex[:8] # Generate unique ID
-        csv_path = os.path.join(output_dir, f"{safe_title}_{unique_id}.csv")
-        df.to_csv(csv_path, index=False)
-
-        # 2. Generate Plot
-        # 2. Generate Plot (Object-Oriented Approach)
-        from matplotlib.figure import Figure
-        from matplotlib.backends.backend_agg import FigureCanvasAgg as FigureCanvas
-        
-        fig = Figure(figsize=(10, 6), dpi=300)
-        ax = fig.add_subplot(111)
-        
-        if plot_type == "bar":
-            sns.barplot(x=df.columns[0], y=df.columns[1], data=df, palette="viridis", ax=ax)
-            if plot_type == 'bar' and 'label' in df.columns: # Redundant check from original logical, cleaning but keeping logic structure
-                 pass # simplified
-        elif plot_type == 'line':
-            sns.lineplot(data=df, x='year', y='value', marker='o', ax=ax)
-        elif plot_type == 'scatter':
-            sns.scatterplot(data=df, x='year', y='value', s=100, ax=ax)
-        elif plot_type == 'hist':
-            sns.histplot(data=df, x='value', kde=True, ax=ax)
-        else:
-            sns.barplot(data=df, x='label', y='value', ax=ax) # Default
-        
-        ax.set_title(title, fontsize=16, fontweight='bold', pad=20)
-        ax.set_xlabel(xlabel, fontsize=12)
-        ax.set_ylabel(ylabel, fontsize=12)
-        fig.tight_layout()
-        
-        png_path = os.path.join(output_dir, f"{safe_title}_{unique_id}.png")
-        
-        canvas = FigureCanvas(fig)
-        canvas.print_figure(png_path, bbox_inches='tight')
-         # No plt.close() needed as fig is local
-        
-        return f"Chart generated: {png_path} (Raw Data: {csv_path})"
+        job, image_path, csv_path = _prepare(df, plot_type, title, xlabel, ylabel)
+        _submit(job, image_path).result()
+        return _report(f"Chart generated: {image_path} (Raw Data: {csv_path})")
+    except Exception as e:
+        return _report(_error(e))
+
+@validate_dataframe
+async def _acreate_plot(df: Any, plot_type: str, title: str, xlabel: str, ylabel: str) -> str:
+    """
+    Async variant used by the graph: rendering runs in the plot pool, never on the event loop.
+    With ``PLOT_WAIT`` off the tool returns as soon as the job is queued, and a
+    render that fails later is reported at the start of the next call's result.
+    """
+    try:
+        job, image_path, csv_path = _prepare(df, plot_type, title, xlabel, ylabel)
+        future = _submit(job, image_path)
+        if not settings.PLOT_WAIT and not future.done():
+            future.add_done_callback(lambda f: _record_failure(image_path, f))
+            return _report(f"Chart queued: {image_path} (Raw Data: {csv_path})")
+        await asyncio.wrap_future(future)
+        return _report(f"Chart generated: {image_path} (Raw Data: {csv_path})")
     except Exception as e:
-        error_msg = f"Error creating plot: {str(e)}"
-        log_agent_action("Quant", "Error", error_msg)
-        return error_msg
+        return _report(_error(e))
+
+create_plot = StructuredTool.from_function(
+    func=_create_plot,
+    coroutine=_acreate_plot,
+    name="create_plot",
+    description="Generate a publication-quality plot and save the raw data for verification.",
+    args_schema=PlotInput,
+)
@@ -1,16 +1,27 @@
 # src/tools/rag_tool.py
 import os
-from typing import Optional
+from typing import Any, Dict, Optional
 from langchain_core.tools import tool
 
-from src.rag_adapter import adapter
+from src.rag_adapter import current_adapter
+from src.utils.artifacts import get_store, preview
+
+def format_result(result: Dict[str, Any]) -> str:
+    """
+    The answer plus one short line per source. Full source texts go to the
+    run's artifact store; the message only carries their IDs.
+    """
+    store = get_store()
+    lines = [f"[{store.put(text)}] {preview(text)}" for text in result.get("source_nodes") or []]
+    if not lines:
+        return result["model_answer"]
+    return result["model_answer"] + "\n\nSources (full text: fetch_artifact):\n" + "\n".join(lines)
 
 def query_rag_engine(question: str) -> str:
     """
     Interface with the Structure-Aware RAG Engine via Adapter.
     """
-    result = adapter.query(question)
-    return result["model_answer"]
+    return format_result(current_adapter().query(question))
 
 @tool
 async def query_financial_rag(question: str) -> str:
@@ -19,5 +30,4 @@ async def query_financial_rag(question: str) -> str:
     This tool is structure-aware and can handle complex tables and financial statements.
     Use this for any factual inquiries about company performance or metrics.
     """
-    result = await adapter.aquery(question)
-    return result["model_answer"]
+    return format_result(await current_adapter().aquery(question))
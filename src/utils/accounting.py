@@ -0,0 +1,110 @@
+# src/utils/accounting.py
+from __future__ import annotations
+
+import time
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Any, Dict, Iterator, Optional
+
+from src.utils.profiling import enter_node, exit_node
+from src.utils.robustness import node_var
+
+if TYPE_CHECKING:
+    # src.core.types uses merge_metadata as the AgentState.metadata reducer
+    from src.core.types import AgentMetadata, NodeStats
+
+# Ollama reports durations in nanoseconds
+_NS_PER_MS = 1_000_000
+
+# Summed when per-node stats are merged
+_COUNTERS = ("calls", "prompt_tokens", "eval_tokens", "load_ms", "prefill_ms", "generation_ms", "wall_ms", "tool_calls")
+
+
+def message_usage(message: Any) -> NodeStats:
+    """
+    Token counts and durations for one LLM response, read from the Ollama
+    response metadata (``prompt_eval_count``/``eval_count`` and the
+    ``*_duration`` fields). Falls back to LangChain ``usage_metadata``; returns
+    an empty dict for messages without usage (tool results, fakes).
+    """
+    meta = getattr(message, "response_metadata", None) or {}
+    usage: NodeStats = {}
+    if "eval_count" in meta or "prompt_eval_count" in meta:
+        usage["prompt_tokens"] = int(meta.get("prompt_eval_count") or 0)
+        usage["eval_tokens"] = int(meta.get("eval_count") or 0)
+        usage["load_ms"] = (meta.get("load_duration") or 0) / _NS_PER_MS
+        usage["prefill_ms"] = (meta.get("prompt_eval_duration") or 0) / _NS_PER_MS
+        usage["generation_ms"] = (meta.get("eval_duration") or 0) / _NS_PER_MS
+        return usage
+    usage_metadata = getattr(message, "usage_metadata", None)
+    if usage_metadata:
+        usage["prompt_tokens"] = int(usage_metadata.get("input_tokens", 0))
+        usage["eval_tokens"] = int(usage_metadata.get("output_tokens", 0))
+    return usage
+
+
+def node_delta(node: str, stats: NodeStats) -> AgentMetadata:
+    """Wraps one node's stats as an ``AgentState.metadata`` update."""
+    return {"nodes": {node: stats}}
+
+
+def _add(left: NodeStats, right: NodeStats) -> NodeStats:
+    merged: NodeStats = dict(left)  # type: ignore[assignment]
+    for key in _COUNTERS:
+        if key in right:
+            merged[key] = merged.get(key, 0) + right[key]  # type: ignore[literal-required]
+    return merged
+
+
+def merge_metadata(left: Optional[AgentMetadata], right: Optional[AgentMetadata]) -> AgentMetadata:
+    """
+    ``AgentState.metadata`` reducer: sums per-node stats and refreshes the run totals.
+    """
+    nodes: Dict[str, NodeStats] = dict((left or {}).get("nodes", {}))
+    for name, stats in (right or {}).get("nodes", {}).items():
+        nodes[name] = _add(nodes.get(name, {}), stats)
+    return {
+        "nodes": nodes,
+        "token_usage": sum(s.get("prompt_tokens", 0) + s.get("eval_tokens", 0) for s in nodes.values()),
+        "latency_ms": sum(s.get("wall_ms", 0.0) for s in nodes.values()),
+        "tool_calls": sum(s.get("tool_calls", 0) for s in nodes.values()),
+        "step": sum(s.get("calls", 0) for s in nodes.values()),
+    }
+
+
+@contextmanager
+def node_timer(node: str) -> Iterator[NodeStats]:
+    """
+    Times one node execution and tags audit records (and --profile samples) emitted inside it with the node name.
+    Yields the stats dict; ``wall_ms`` and ``calls`` are filled in on exit.
+    """
+    stats: NodeStats = {}
+    token = node_var.set(node)
+    active = enter_node(node)
+    start = time.perf_counter()
+    try:
+        yield stats
+    finally:
+        exit_node(active)
+        node_var.reset(token)
+        stats["wall_ms"] = (time.perf_counter() - start) * 1000
+        stats["calls"] = 1
+
+
+def with_node_stats(node: str, output: Dict[str, Any], stats: NodeStats) -> Dict[str, Any]:
+    """
+    Folds a node's wall time, tool-call count and LLM usage into its state update.
+    Usage comes from the node's own ``metadata`` update if it set one, else from
+    the AI messages it returned.
+    """
+    output = dict(output)
+    reported = (output.get("metadata") or {}).get("nodes", {}).get(node)
+    if reported is not None:
+        stats = _add(stats, reported)
+    else:
+        for message in output.get("messages", []):
+            stats = _add(stats, message_usage(message))
+    tool_messages = [m for m in output.get("messages", []) if getattr(m, "type", None) == "tool"]
+    if tool_messages:
+        stats["tool_calls"] = stats.get("tool_calls", 0) + len(tool_messages)
+    output["metadata"] = node_delta(node, stats)
+    return output
@@ -0,0 +1,67 @@
+import hashlib
+import json
+import re
+import time
+from typing import Any, Dict, Optional
+
+import diskcache as dc
+
+from src.core.config import settings
+from src.core.prompts import Prompts
+
+_THINK_RE = re.compile(r"<think>.*?</think>", re.DOTALL | re.IGNORECASE)
+
+
+def normalize_query(query: str) -> str:
+    """Case/whitespace/trailing-punctuation insensitive form of a question."""
+    return re.sub(r"\s+", " ", query).strip().lower().rstrip("?.! ")
+
+
+def model_config_fingerprint() -> str:
+    """Everything besides the question and the index that can change the final answer."""
+    config = {
+        "llm": settings.LLM_MODEL,
+        "temperature": settings.LLM_TEMPERATURE,
+        "embedding": settings.EMBEDDING_MODEL,
+        "top_k": settings.RAG_TOP_K,
+        "rerank": settings.RAG_RERANK_MODEL if settings.RAG_RERANK_ENABLED else None,
+        "prompts": hashlib.sha256(
+            (Prompts.SUPERVISOR_SYSTEM + Prompts.RESEARCHER_SYSTEM + Prompts.QUANT_SYSTEM).encode()
+        ).hexdigest()[:16],
+    }
+    return json.dumps(config, sort_keys=True)
+
+
+class AnswerCache:
+    """
+    End-to-end answer cache keyed by (normalized query, index version, model config).
+    A hit short-circuits the whole Supervisor/Researcher/Quant loop; entries carry
+    the run ID that originally produced the answer for provenance.
+    """
+
+    def __init__(self, directory: Any = None) -> None:
+        self.cache = dc.Cache(directory or settings.DATA_DIR / "answer_cache")
+
+    @staticmethod
+    def make_key(query: str, index_version: str) -> str:
+        payload = "\x1f".join([normalize_query(query), index_version, model_config_fingerprint()])
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def get(self, query: str, index_version: str) -> Optional[Dict[str, Any]]:
+        return self.cache.get(self.make_key(query, index_version))
+
+    def set(self, query: str, index_version: str, answer: str, run_id: str, steps: int) -> None:
+        """Stores the answer without reasoning-model ``<think>`` blocks; nothing is stored if that leaves it empty."""
+        answer = _THINK_RE.sub("", answer).strip()
+        if not answer:
+            return
+        entry = {
+            "answer": answer,
+            "run_id": run_id,
+            "query": query,
+            "index_version": index_version,
+            "steps": steps,
+            "created_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+        }
+        expire = settings.ANSWER_CACHE_TTL or None
+        self.cache.set(self.make_key(query, index_version), entry, expire=expire)
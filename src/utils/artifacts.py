@@ -0,0 +1,85 @@
+# src/utils/artifacts.py
+"""
+Out-of-band storage for large tool payloads. Tools put full texts (retrieved
+source chunks) here and put only a short preview plus the artifact ID into
+their ToolMessage; ``fetch_artifact`` returns the full text on demand. The
+graph state, and every prompt built from it, stays small.
+"""
+import hashlib
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from threading import Lock
+from typing import Iterator, Optional
+
+from src.core.config import settings
+
+
+class ArtifactStore:
+    """
+    Content-addressed, size-capped text store (least recently used evicted
+    first). IDs look like ``src-3f2a9c1b7e``: the same text always gets the
+    same ID, so repeated retrievals are stored once.
+    """
+
+    def __init__(self, max_bytes: Optional[int] = None) -> None:
+        self.max_bytes = settings.ARTIFACT_MAX_BYTES if max_bytes is None else max_bytes
+        self._items: "OrderedDict[str, str]" = OrderedDict()
+        self._bytes = 0
+        self._lock = Lock()
+
+    def put(self, text: str, kind: str = "src") -> str:
+        artifact_id = f"{kind}-{hashlib.sha256(text.encode('utf-8')).hexdigest()[:10]}"
+        with self._lock:
+            if artifact_id in self._items:
+                self._items.move_to_end(artifact_id)
+                return artifact_id
+            self._items[artifact_id] = text
+            self._bytes += len(text)
+            while self._bytes > self.max_bytes and len(self._items) > 1:
+                _, evicted = self._items.popitem(last=False)
+                self._bytes -= len(evicted)
+        return artifact_id
+
+    def get(self, artifact_id: str) -> Optional[str]:
+        with self._lock:
+            text = self._items.get(artifact_id.strip())
+            if text is not None:
+                self._items.move_to_end(artifact_id.strip())
+            return text
+
+    @property
+    def size_bytes(self) -> int:
+        return self._bytes
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+# Per-run store (see artifact_scope); runs outside a scope share the process-wide default
+_default_store = ArtifactStore()
+_store_var: ContextVar[Optional[ArtifactStore]] = ContextVar("artifact_store", default=None)
+
+
+def get_store() -> ArtifactStore:
+    """The current run's store."""
+    store = _store_var.get()
+    return _default_store if store is None else store
+
+
+@contextmanager
+def artifact_scope() -> Iterator[ArtifactStore]:
+    """A fresh store for one graph run; graph tasks started inside the block inherit it."""
+    store = ArtifactStore()
+    token = _store_var.set(store)
+    try:
+        yield store
+    finally:
+        _store_var.reset(token)
+
+
+def preview(text: str, limit: Optional[int] = None) -> str:
+    """First ``limit`` characters (ARTIFACT_PREVIEW_CHARS by default) on one line."""
+    limit = settings.ARTIFACT_PREVIEW_CHARS if limit is None else limit
+    flat = " ".join(text.split())
+    return flat if len(flat) <= limit else flat[: limit - 3].rstrip() + "..."
@@ -0,0 +1,102 @@
+# src/utils/guard.py
+"""
+Run guard: per-query LLM-call, token and wall-clock budgets plus loop
+detection (the same member routed over and over, or a tool called again with
+arguments it already answered). Everything is derived from ``AgentState``, so
+the checks hold across checkpoint resumes. A tripped guard finishes the run
+with the best answer so far instead of running into ``recursion_limit``.
+"""
+import json
+import re
+from typing import Any, Dict, List, Optional, Sequence
+
+from langchain_core.messages import AIMessage, BaseMessage
+
+from src.core.config import settings
+from src.core.constants import ROLE_FINISH, ROLE_GUARD
+
+_THINK_RE = re.compile(r"<think>.*?</think>", re.DOTALL | re.IGNORECASE)
+
+
+def recursion_limit() -> int:
+    """
+    LangGraph step backstop for the guard's LLM-call budget: every LLM call can
+    be followed by a tools step, plus room for the guard's own finishing step.
+    """
+    return 2 * settings.GUARD_MAX_LLM_CALLS + 5
+
+
+def tool_call_key(call: Dict[str, Any]) -> str:
+    """Identity of a tool call: name plus case- and whitespace-normalized arguments."""
+    args = json.dumps(call.get("args") or {}, sort_keys=True, default=str)
+    return f"{call.get('name')}:{' '.join(args.lower().split())}"
+
+
+def duplicate_tool_calls(messages: Sequence[BaseMessage]) -> int:
+    """Tool calls that repeat one made earlier in the run."""
+    seen, duplicates = set(), 0
+    for message in messages:
+        for call in getattr(message, "tool_calls", None) or []:
+            key = tool_call_key(call)
+            duplicates += key in seen
+            seen.add(key)
+    return duplicates
+
+
+def llm_calls(state: Dict[str, Any]) -> int:
+    """LLM calls made so far (every node except ``tools`` calls the model once per run)."""
+    nodes = (state.get("metadata") or {}).get("nodes", {})
+    return sum(stats.get("calls", 0) for name, stats in nodes.items() if name != "tools")
+
+
+def stop_reason(state: Dict[str, Any]) -> Optional[str]:
+    """Why the run should stop now (``None`` to carry on): a spent budget or a repeated tool call."""
+    metadata = state.get("metadata") or {}
+    if llm_calls(state) >= settings.GUARD_MAX_LLM_CALLS:
+        return "llm_call_budget"
+    if settings.GUARD_MAX_TOKENS and metadata.get("token_usage", 0) >= settings.GUARD_MAX_TOKENS:
+        return "token_budget"
+    if settings.GUARD_MAX_SECONDS and metadata.get("latency_ms", 0.0) >= settings.GUARD_MAX_SECONDS * 1000:
+        return "time_budget"
+    if duplicate_tool_calls(state.get("messages", [])):
+        return "duplicate_tool_call"
+    return None
+
+
+def route_stalled(routes: List[str], next_route: str) -> bool:
+    """True when ``next_route`` would be the GUARD_REPEAT_LIMIT-th consecutive hand-off to the same member."""
+    if next_route == ROLE_FINISH:
+        return False
+    recent = (routes + [next_route])[-settings.GUARD_REPEAT_LIMIT:]
+    return len(recent) == settings.GUARD_REPEAT_LIMIT and len(set(recent)) == 1
+
+
+def best_answer(messages: Sequence[BaseMessage]) -> str:
+    """The latest member answer (reasoning stripped), else the latest tool result, else ''."""
+    tool_result = ""
+    for message in reversed(messages):
+        if isinstance(message, AIMessage) and not message.tool_calls:
+            text = _THINK_RE.sub("", str(message.content)).strip()
+            if text:
+                return text
+        elif getattr(message, "type", None) == "tool" and not tool_result:
+            tool_result = str(message.content).strip()
+    return tool_result
+
+
+def forced_finish(state: Dict[str, Any], reason: str, extra_calls: int = 0) -> Dict[str, Any]:
+    """
+    Supervisor update that ends the run: routes to FINISH, records why and how
+    many LLM calls the budget would still have allowed (``calls_cut``), and
+    surfaces the best answer so far as a Guard message.
+    """
+    used = llm_calls(state) + extra_calls
+    update: Dict[str, Any] = {
+        "next": ROLE_FINISH,
+        "guard": {"reason": reason, "llm_calls": used, "calls_cut": max(0, settings.GUARD_MAX_LLM_CALLS - used)},
+    }
+    answer = best_answer(state.get("messages", []))
+    if answer:
+        update["messages"] = [AIMessage(content=answer, name=ROLE_GUARD)]
+        update["sender"] = ROLE_GUARD
+    return update
@@ -0,0 +1,265 @@
+# src/utils/metrics.py
+import json
+import os
+import secrets
+import threading
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.core.config import settings
+
+# Latency buckets (seconds): sub-100ms tool/cache work up to multi-minute local LLM calls
+DEFAULT_BUCKETS: Tuple[float, ...] = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _labels(labels: Dict[str, Any]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _fmt_labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(key) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    escaped = (v.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"') for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+class Counter:
+    """Monotonic counter with labels (Prometheus ``counter``)."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str) -> None:
+        self.name, self.help = name, help_text
+        self._values: Dict[LabelKey, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        key = _labels(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: Any) -> float:
+        return self._values.get(_labels(labels), 0.0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            return [f"{self.name}{_fmt_labels(k)} {v:g}" for k, v in sorted(self._values.items())]
+
+
+class Histogram:
+    """Cumulative-bucket histogram with labels (Prometheus ``histogram``)."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> None:
+        self.name, self.help, self.buckets = name, help_text, buckets
+        self._series: Dict[LabelKey, List[float]] = {}  # bucket counts..., +Inf count, sum
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = _labels(labels)
+        with self._lock:
+            series = self._series.setdefault(key, [0.0] * (len(self.buckets) + 2))
+            series[bisect_left(self.buckets, value)] += 1
+            series[-1] += value
+
+    def count(self, **labels: Any) -> int:
+        series = self._series.get(_labels(labels))
+        return int(sum(series[:-1])) if series else 0
+
+    def render(self) -> List[str]:
+        lines = []
+        with self._lock:
+            for key, series in sorted(self._series.items()):
+                cumulative = 0.0
+                for bound, n in zip(self.buckets + (float("inf"),), series[:-1]):
+                    cumulative += n
+                    le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                    lines.append(f"{self.name}_bucket{_fmt_labels(key, ('le', le))} {cumulative:g}")
+                lines.append(f"{self.name}_sum{_fmt_labels(key)} {series[-1]:g}")
+                lines.append(f"{self.name}_count{_fmt_labels(key)} {cumulative:g}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    Process-wide metrics in Prometheus text exposition format (stdlib only).
+    Rates such as queries/sec and tokens/sec are derived by the scraper
+    (``rate(swarm_queries_total[1m])``).
+    """
+
+    def __init__(self) -> None:
+        self.queries = Counter("swarm_queries_total", "Queries processed, by outcome.")
+        self.node_latency = Histogram("swarm_node_latency_seconds", "Wall time per graph node execution.")
+        self.tool_latency = Histogram("swarm_tool_latency_seconds", "Wall time per tool invocation.")
+        self.llm_tokens = Counter("swarm_llm_tokens_total", "LLM tokens by node and kind (prompt|eval).")
+        self.llm_generation = Counter("swarm_llm_generation_seconds_total", "LLM decode time by node (eval tokens / this = tokens/sec).")
+        self.rag_cache = Counter("swarm_rag_cache_requests_total", "RAG query cache lookups, by result (hit|miss).")
+        self.retries = Counter("swarm_retries_total", "Retries performed by retry_with_backoff, by function.")
+        self.routing = Counter("swarm_routing_decisions_total", "Supervisor routing decisions, by role.")
+        self.guard_stops = Counter("swarm_guard_stops_total", "Runs finished early by the run guard, by reason.")
+        self._metrics = [
+            self.queries, self.node_latency, self.tool_latency, self.llm_tokens,
+            self.llm_generation, self.rag_cache, self.retries, self.routing, self.guard_stops,
+        ]
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, path: Path) -> None:
+        """Atomic write for the node_exporter textfile collector."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        tmp.write_text(self.render(), encoding="utf-8")
+        os.replace(tmp, path)
+
+    def record_node(self, node: str, stats: Dict[str, Any]) -> None:
+        """Node latency and LLM usage from one accounting NodeStats delta."""
+        self.node_latency.observe(stats.get("wall_ms", 0.0) / 1000, node=node)
+        if stats.get("prompt_tokens"):
+            self.llm_tokens.inc(stats["prompt_tokens"], node=node, kind="prompt")
+        if stats.get("eval_tokens"):
+            self.llm_tokens.inc(stats["eval_tokens"], node=node, kind="eval")
+        if stats.get("generation_ms"):
+            self.llm_generation.inc(stats["generation_ms"] / 1000, node=node)
+
+
+metrics = MetricsRegistry()
+
+
+class SpanRecorder:
+    """
+    Collects one span per graph node execution and exports them as an OTLP/JSON
+    ``ExportTraceServiceRequest`` (one JSON object per line), ready for an
+    OpenTelemetry collector's file receiver or an OTLP/HTTP POST.
+    """
+
+    def __init__(self) -> None:
+        self._spans: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self.trace_id = secrets.token_hex(16)
+        self.run_id = ""
+
+    def start_trace(self, run_id: str) -> None:
+        with self._lock:
+            self._spans.clear()
+        self.run_id = run_id
+        self.trace_id = secrets.token_hex(16)
+
+    def record(self, name: str, start_ns: int, end_ns: int, attributes: Dict[str, Any]) -> None:
+        attrs = [
+            {"key": k, "value": {"intValue": str(v)} if isinstance(v, int) and not isinstance(v, bool)
+             else {"doubleValue": v} if isinstance(v, float) else {"stringValue": str(v)}}
+            for k, v in attributes.items()
+        ]
+        span = {
+            "traceId": self.trace_id,
+            "spanId": secrets.token_hex(8),
+            "name": name,
+            "kind": 1,  # SPAN_KIND_INTERNAL
+            "startTimeUnixNano": str(start_ns),
+            "endTimeUnixNano": str(end_ns),
+            "attributes": attrs,
+        }
+        with self._lock:
+            self._spans.append(span)
+
+    def export(self, path: Path) -> int:
+        """Appends the collected spans as one OTLP/JSON request line; returns the span count."""
+        with self._lock:
+            spans, self._spans = self._spans, []
+        if not spans:
+            return 0
+        request = {"resourceSpans": [{
+            "resource": {"attributes": [
+                {"key": "service.name", "value": {"stringValue": "financial-swarm"}},
+                {"key": "swarm.run_id", "value": {"stringValue": self.run_id}},
+            ]},
+            "scopeSpans": [{"scope": {"name": "src.graph"}, "spans": spans}],
+        }]}
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(request) + "\n")
+        return len(spans)
+
+
+spans = SpanRecorder()
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self) -> None:  # noqa: N802
+        path = self.path.split("?")[0]
+        if path == "/health":
+            self._health()
+            return
+        if path != "/metrics":
+            self.send_error(404)
+            return
+        body = metrics.render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _health(self) -> None:
+        """200 while the LLM endpoint answers, with the model's warm/cold residency; 503 otherwise."""
+        from src.llm_client import residency
+
+        llm = residency()
+        body = json.dumps({"status": "ok" if llm["state"] != "unreachable" else "degraded", "llm": llm}).encode()
+        self.send_response(200 if llm["state"] != "unreachable" else 503)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args: Any) -> None:
+        pass
+
+
+class MetricsExporter:
+    """
+    Background export per settings: a scrapeable ``/metrics`` endpoint, plus
+    ``/health`` with the LLM's warm/cold residency (METRICS_PORT), and/or a
+    periodic textfile write (METRICS_TEXTFILE).
+    """
+
+    def __init__(self) -> None:
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._stop = threading.Event()
+        self._writer: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if settings.METRICS_PORT and self._server is None:
+            self._server = ThreadingHTTPServer((settings.METRICS_HOST, settings.METRICS_PORT), _MetricsHandler)
+            threading.Thread(target=self._server.serve_forever, name="metrics-http", daemon=True).start()
+        if settings.METRICS_TEXTFILE and self._writer is None:
+            self._writer = threading.Thread(target=self._write_loop, name="metrics-textfile", daemon=True)
+            self._writer.start()
+
+    def _write_loop(self) -> None:
+        while not self._stop.wait(settings.METRICS_INTERVAL_S):
+            metrics.write_textfile(settings.METRICS_TEXTFILE)
+
+    def stop(self) -> None:
+        """Final textfile write, then stop the threads."""
+        self._stop.set()
+        if settings.METRICS_TEXTFILE:
+            metrics.write_textfile(settings.METRICS_TEXTFILE)
+        if self._server is not None:
+            self._server.shutdown()
+            self._server = None
+
@@ -1,5 +1,8 @@
+import sys
 import time
-from typing import Dict, Any, Optional
+from contextlib import nullcontext
+from contextvars import ContextVar
+from typing import ContextManager, Dict, Any, Optional, Tuple
 from rich.console import Console
 from rich.theme import Theme
 from rich.panel import Panel
@@ -20,17 +23,25 @@ custom_theme = Theme({
 console = Console(theme=custom_theme)
 
 import uuid
+from src.core.config import settings
+
+# (run ID, wall-clock start) of the run being rendered; set per run by start_trace()
+_run_var: ContextVar[Tuple[str, float]] = ContextVar("observability_run", default=("", 0.0))
 
 class Observability:
     """
     Handles system observability: Rich UI, Metrics, and Tracing.
     """
-    _start_time = 0
-    _run_id = str(uuid.uuid4())[:8]
+    # Headless: no Rich rendering at all (batch runs); only plain final/error lines
+    headless = settings.HEADLESS
     
     @staticmethod
-    def start_trace():
-        Observability._start_time = time.time()
+    def start_trace() -> str:
+        """Starts a new run in the current context and returns its run ID."""
+        run_id = uuid.uuid4().hex[:8]
+        _run_var.set((run_id, time.time()))
+        if Observability.headless:
+            return run_id
         banner = """
 [bold cyan]
 ███████╗██╗███╗   ██╗ █████╗ ███╗   ██╗ ██████╗██╗ █████╗ ██╗     
@@ -43,22 +54,29 @@ class Observability:
 [/bold cyan]
         """
         console.print(banner)
-        console.print(Panel(f"[bold green]Financial Swarm System Online (Run ID: {Observability._run_id})[/]", border_style="cyan"))
+        console.print(Panel(f"[bold green]Financial Swarm System Online (Run ID: {run_id})[/]", border_style="cyan"))
+        return run_id
 
     @staticmethod
-    def trace_agent(agent_name: str, content: str, metadata: Optional[Dict[str, Any]] = None):
+    def trace_agent(agent_name: str, content: str, metadata: Optional[Dict[str, Any]] = None, usage: Optional[Dict[str, Any]] = None):
         """
         Log an agent's action with rich formatting.
+        ``usage`` is the message's measured token usage (see accounting.message_usage).
         """
+        if Observability.headless:
+            return
         style = agent_name.lower()
         if style not in ["supervisor", "researcher", "quant"]:
             style = "info"
             
-        # Estimate tokens (Heuristic: 1 token ~= 4 chars)
-        tokens = len(content) // 4
+        if usage and "eval_tokens" in usage:
+            tokens = f"{usage.get('prompt_tokens', 0)} in / {usage['eval_tokens']} out"
+        else:
+            # No usage reported (cache hits, tool output): estimate (1 token ~= 4 chars)
+            tokens = f"~{len(content) // 4}"
         
         # Create metadata text
-        meta_text = f"[dim]Tokens: ~{tokens} | Time: {time.strftime('%H:%M:%S')}[/]"
+        meta_text = f"[dim]Tokens: {tokens} | Time: {time.strftime('%H:%M:%S')}[/]"
         if metadata:
             for k, v in metadata.items():
                 meta_text += f", {k}: {v}"
@@ -75,14 +93,98 @@ class Observability:
     @staticmethod
     def trace_tool(tool_name: str, args: str, result: str):
         """Log tool execution."""
+        if Observability.headless:
+            return
         console.print(f"  [dim]🛠️  Tool Call: {tool_name}({args})[/]")
         console.print(f"  [dim]   -> Result: {result[:100]}...[/]")
 
+    @staticmethod
+    def usage_report(metadata: Optional[Dict[str, Any]]):
+        """Per-node breakdown of where the run's time and tokens went."""
+        nodes = (metadata or {}).get("nodes") or {}
+        if not nodes or Observability.headless:
+            return
+        table = Table(title=f"Run {_run_var.get()[0]}: time & tokens by node", title_style="bold cyan")
+        for header in ["Node", "Calls", "Prompt tok", "Gen tok", "Load ms", "Prefill ms", "Gen ms", "Wall ms", "Tools"]:
+            table.add_column(header, justify="left" if header == "Node" else "right")
+        total_wall = sum(n.get("wall_ms", 0.0) for n in nodes.values()) or 1.0
+        for name, n in sorted(nodes.items(), key=lambda kv: kv[1].get("wall_ms", 0.0), reverse=True):
+            table.add_row(
+                name,
+                str(n.get("calls", 0)),
+                str(n.get("prompt_tokens", 0)),
+                str(n.get("eval_tokens", 0)),
+                f"{n.get('load_ms', 0.0):.0f}",
+                f"{n.get('prefill_ms', 0.0):.0f}",
+                f"{n.get('generation_ms', 0.0):.0f}",
+                f"{n.get('wall_ms', 0.0):.0f} ({n.get('wall_ms', 0.0) / total_wall:.0%})",
+                str(n.get("tool_calls", 0)),
+            )
+        table.add_section()
+        table.add_row(
+            "Total", str(metadata.get("step", 0)),
+            str(sum(n.get("prompt_tokens", 0) for n in nodes.values())),
+            str(sum(n.get("eval_tokens", 0) for n in nodes.values())),
+            f"{sum(n.get('load_ms', 0.0) for n in nodes.values()):.0f}",
+            f"{sum(n.get('prefill_ms', 0.0) for n in nodes.values()):.0f}",
+            f"{sum(n.get('generation_ms', 0.0) for n in nodes.values()):.0f}",
+            f"{metadata.get('latency_ms', 0.0):.0f}",
+            str(metadata.get("tool_calls", 0)),
+        )
+        console.print(table)
+
+    @staticmethod
+    def profile_report(profiler: Any, metadata: Optional[Dict[str, Any]] = None):
+        """Per-node profile summary: sampled busy time vs. wall time, hottest frames."""
+        nodes = (metadata or {}).get("nodes") or {}
+        rows = profiler.summary()
+        if Observability.headless:
+            for node, n, busy_ms, hot in rows:
+                print(f"profile node={node} samples={n} busy_ms={busy_ms:.0f} hot={hot[0][0] if hot else '-'}")
+            print(f"profile collapsed={profiler.output_path}")
+            return
+        table = Table(title=f"Profile ({profiler.interval_s * 1000:.0f}ms samples, {profiler.wall_s:.1f}s wall)", title_style="bold cyan")
+        for header in ["Node", "Samples", "Busy ms", "Wall ms", "Hottest frames (self)"]:
+            table.add_column(header, justify="right" if header in ("Samples", "Busy ms", "Wall ms") else "left")
+        for node, n, busy_ms, hot in rows:
+            wall = nodes.get(node, {}).get("wall_ms")
+            table.add_row(
+                node, str(n), f"{busy_ms:.0f}", f"{wall:.0f}" if wall is not None else "-",
+                "\n".join(f"{frame} x{count}" for frame, count in hot),
+            )
+        console.print(table)
+        console.print(f"[dim]Flamegraph input: {profiler.output_path} (flamegraph.pl / speedscope)[/]")
+
+    @staticmethod
+    def guard_report(guard: Optional[Dict[str, Any]]):
+        """One line when the run guard stopped the run early."""
+        if not guard:
+            return
+        line = f"reason={guard['reason']} llm_calls={guard['llm_calls']} calls_cut={guard['calls_cut']}"
+        if Observability.headless:
+            print(f"guard_stop {line}")
+            return
+        console.print(f"[warning]Run guard stopped the run early[/] ({line}); answering with the best result so far.")
+
     @staticmethod
     def final_report(total_steps: int):
-        elapsed = time.time() - Observability._start_time
+        run_id, started = _run_var.get()
+        elapsed = time.time() - started
+        if Observability.headless:
+            print(f"run={run_id} steps={total_steps} elapsed_s={elapsed:.2f}")
+            return
         console.print(f"\n[bold green]Mission Complete[/] in {elapsed:.2f}s ({total_steps} steps).")
 
+    @staticmethod
+    def status(message: str) -> ContextManager[Any]:
+        """Spinner while the graph runs; a no-op in headless mode."""
+        if Observability.headless:
+            return nullcontext()
+        return console.status(message, spinner="dots")
+
     @staticmethod
     def error(message: str):
+        if Observability.headless:
+            print(f"ERROR: {message}", file=sys.stderr)
+            return
         console.print(f"[danger]ERROR: {message}[/]")
@@ -1,40 +1,77 @@
-
 import json
 import re
+from collections import Counter
 from typing import Any, Dict, List, Union
 
+try:
+    # Optional C-accelerated decoder (pip install orjson); falls back to the stdlib C scanner.
+    # orjson.JSONDecodeError subclasses json.JSONDecodeError, so one except clause covers both.
+    from orjson import loads as _strict_loads
+except ImportError:
+    from json import loads as _strict_loads
+
+# Which tier decoded each payload: "strict", "repair", "json5" or "failed"
+PARSE_STATS: Counter = Counter()
+
+_FENCE_RE = re.compile(r"^\s*```(?:json5?|javascript)?\s*|\s*```\s*$", re.IGNORECASE)
+_TRAILING_COMMA_RE = re.compile(r'("(?:[^"\\]|\\.)*")|,\s*([}\]])')
+_PY_LITERAL_RE = re.compile(r'("(?:[^"\\]|\\.)*")|\b(True|False|None)\b')
+_PY_LITERALS = {"True": "true", "False": "false", "None": "null"}
+_SMART_QUOTES = str.maketrans({"“": '"', "”": '"', "‘": "'", "’": "'"})
+
+def _repair(json_str: str) -> str:
+    """
+    Targeted fixes for the malformations we see in LLM tool arguments: markdown
+    fences, smart quotes, single-quoted dicts, Python literals and trailing commas.
+    Python literals and trailing commas are only rewritten outside string values.
+    """
+    cleaned = _FENCE_RE.sub("", json_str.strip()).translate(_SMART_QUOTES)
+    # heuristic: replace single quotes if no double quotes exist
+    if "'" in cleaned and '"' not in cleaned:
+        cleaned = cleaned.replace("'", '"')
+    cleaned = _PY_LITERAL_RE.sub(lambda m: m.group(1) or _PY_LITERALS[m.group(2)], cleaned)
+    return _TRAILING_COMMA_RE.sub(lambda m: m.group(1) or m.group(2), cleaned)
+
+def parse_stats() -> Dict[str, int]:
+    """Snapshot of tier hit counters since process start (or the last reset)."""
+    return dict(PARSE_STATS)
+
+def reset_parse_stats() -> None:
+    PARSE_STATS.clear()
+
 def robust_json_parse(json_str: str) -> Union[Dict, List, Any]:
     """
-    Robustly parse JSON strings, strictly prioritizing professional libraries.
-    
-    1. Try `json5` (Handles trailing commas, comments, single quotes).
-    2. Fallback to standard `json`.
-    3. Last resort: Heuristic repair for common LLM malformations (e.g. invalid boolean literals).
+    Robustly parse JSON strings, cheapest decoder first.
+
+    1. Strict C-accelerated parse (`orjson` if installed, else stdlib `json`).
+    2. Targeted repair of common LLM malformations, then strict parse again.
+    3. Last resort: `json5` (comments, unquoted keys, hex literals, ...).
     """
     if not json_str:
         raise ValueError("Empty JSON string")
 
-    # 1. First Priority: json5 (Professional standard for loose JSON)
+    # 1. Fast path: well-formed JSON
     try:
-        import json5
-        return json5.loads(json_str)
-    except (ImportError, Exception):
+        result = _strict_loads(json_str)
+        PARSE_STATS["strict"] += 1
+        return result
+    except json.JSONDecodeError:
         pass
 
-    # 2. Second Priority: Standard JSON
+    # 2. Targeted repair
     try:
-        return json.loads(json_str)
+        result = _strict_loads(_repair(json_str))
+        PARSE_STATS["repair"] += 1
+        return result
     except json.JSONDecodeError:
         pass
 
-    # 3. Last Resort: Heuristic Fallback
-    # CAUTION: String replacement is dangerous. Only done if standard parsing fails.
+    # 3. Last Resort: json5 (pure Python, orders of magnitude slower)
     try:
-        # Resolve Python literals to JSON
-        cleaned = json_str.replace("True", "true").replace("False", "false").replace("None", "null")
-        # heuristic: replace single quotes if no double quotes exist
-        if "'" in cleaned and '"' not in cleaned:
-             cleaned = cleaned.replace("'", '"')
-        return json.loads(cleaned)
-    except json.JSONDecodeError:
+        import json5
+        result = json5.loads(json_str)
+        PARSE_STATS["json5"] += 1
+        return result
+    except (ImportError, Exception):
+        PARSE_STATS["failed"] += 1
         raise ValueError(f"Failed to parse JSON content: {json_str[:50]}...")
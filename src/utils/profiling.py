@@ -0,0 +1,154 @@
+# src/utils/profiling.py
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from pathlib import Path
+from types import CodeType, FrameType
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# Graph nodes currently executing, innermost last (maintained by accounting.node_timer).
+# Process-wide rather than a ContextVar: LangChain hops nodes across tasks and executor
+# threads, and the sampler must attribute every thread's stack to the node that caused it.
+# Entries carry a per-execution handle, so concurrent graphs only ever remove their own.
+ACTIVE_NODES: List[Tuple[str, object]] = []
+_active_lock = threading.Lock()
+# Running profilers; with none, node_timer skips the bookkeeping entirely
+_profilers = 0
+
+
+def enter_node(name: str) -> Optional[object]:
+    """Marks ``name`` active; returns the handle for :func:`exit_node` (None when no profiler runs)."""
+    if not _profilers:
+        return None
+    handle = object()
+    with _active_lock:
+        ACTIVE_NODES.append((name, handle))
+    return handle
+
+
+def exit_node(handle: Optional[object]) -> None:
+    if handle is None:
+        return
+    with _active_lock:
+        for i in range(len(ACTIVE_NODES) - 1, -1, -1):
+            if ACTIVE_NODES[i][1] is handle:
+                del ACTIVE_NODES[i]
+                return
+
+
+def active_node() -> Optional[str]:
+    with _active_lock:
+        return ACTIVE_NODES[-1][0] if ACTIVE_NODES else None
+
+# Frames that are pure scheduling noise at the root of every stack
+_SKIP_ROOTS = ("threading.py", "asyncio/", "concurrent/futures/", "runpy.py")
+
+
+def _label(code: CodeType) -> str:
+    return f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    """
+    Statistical profiler for graph runs: a daemon thread samples every thread's
+    Python stack each ``interval_s`` and attributes the sample to the graph node
+    active at that moment (or the current runner section). Nothing is installed
+    unless a profiler is started, so a disabled run pays no overhead. Nodes run
+    one at a time per graph; with several graphs in flight attribution blends.
+
+    Output is Brendan Gregg's collapsed-stack format (``node;frame;...;leaf count``),
+    readable by flamegraph.pl, speedscope and inferno.
+    """
+
+    def __init__(self, interval_s: float = 0.005) -> None:
+        self.interval_s = interval_s
+        self.samples: Counter = Counter()
+        self.node_samples: Counter = Counter()
+        self.self_samples: Dict[str, Counter] = defaultdict(Counter)
+        self._section: Optional[str] = None
+        self.wall_s = 0.0
+        self.ticks = 0
+        self.output_path: Optional[Path] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "SamplingProfiler":
+        global _profilers
+        with _active_lock:
+            _profilers += 1
+        self._thread = threading.Thread(target=self._run, name="swarm-profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        global _profilers
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+            with _active_lock:
+                _profilers -= 1
+
+    @contextmanager
+    def section(self, name: str) -> Iterator[None]:
+        """Attributes samples outside any graph node to ``name`` (e.g. one benchmark query)."""
+        previous, self._section = self._section, name
+        try:
+            yield
+        finally:
+            self._section = previous
+
+    def _run(self) -> None:
+        me = threading.get_ident()
+        while not self._stop.wait(self.interval_s):
+            self.ticks += 1
+            for ident, frame in sys._current_frames().items():
+                if ident != me:
+                    self._sample(frame)
+
+    def _sample(self, frame: Optional[FrameType]) -> None:
+        stack: List[str] = []
+        while frame is not None:
+            stack.append(_label(frame.f_code))
+            frame = frame.f_back
+        stack.reverse()
+        while stack and any(s in stack[0] for s in _SKIP_ROOTS):
+            stack.pop(0)
+        if not stack or stack[-1].startswith(("wait ", "select ", "_worker (", "_wait_for_tstate_lock ")):
+            return  # idle thread (parked executor worker, event loop poll)
+        owner = active_node() or self._section or "(other)"
+        self.samples[(owner, *stack)] += 1
+        self.node_samples[owner] += 1
+        self.self_samples[owner][stack[-1]] += 1
+
+    def write_collapsed(self, path: Path) -> Path:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in sorted(self.samples.items()):
+                f.write(";".join(s.replace(";", ":") for s in stack) + f" {count}\n")
+        return path
+
+    def summary(self, top: int = 3) -> List[Tuple[str, int, float, List[Tuple[str, int]]]]:
+        """Per node: samples, estimated busy ms, and the hottest leaf frames."""
+        # Real tick period (GIL contention stretches it past interval_s under CPU load)
+        tick_ms = self.wall_s * 1000 / self.ticks if self.ticks and self.wall_s else self.interval_s * 1000
+        return [
+            (node, n, n * tick_ms, self.self_samples[node].most_common(top))
+            for node, n in self.node_samples.most_common()
+        ]
+
+
+@contextmanager
+def profile_run(output_dir: Path, run_id: str, interval_s: float = 0.005) -> Iterator[SamplingProfiler]:
+    """Samples for the duration of the block, then writes ``<run_id>.collapsed`` to ``output_dir``."""
+    profiler = SamplingProfiler(interval_s).start()
+    start = time.perf_counter()
+    try:
+        yield profiler
+    finally:
+        profiler.stop()
+        profiler.wall_s = time.perf_counter() - start
+        profiler.output_path = profiler.write_collapsed(Path(output_dir) / f"{run_id}.collapsed")
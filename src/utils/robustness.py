@@ -1,26 +1,147 @@
+import asyncio
+import atexit
+import inspect
 import time
 import functools
 import logging
 import json
-from logging.handlers import RotatingFileHandler
-from typing import Any, Callable, Dict
+import queue
+import random
+import threading
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Any, Callable, Dict, Optional
 from src.core.config import settings
+from src.utils.metrics import metrics
 
-# Configure structured logger with rotation
+# Structured audit logger. Records are handed to a bounded queue and written as
+# JSONL by a background listener thread, so agents never block on file/console I/O.
+# Handlers are attached on first use (or via setup_logging()) so importing this
+# module never opens the log file.
 logger = logging.getLogger("SwarmTracer")
 logger.setLevel(logging.INFO)
+logger.propagate = False
+_configured = False
+_listener: Optional[QueueListener] = None
+_stats = {"queued": 0, "dropped": 0, "sampled_out": 0}
+_stats_lock = threading.Lock()
 
-handler = RotatingFileHandler(settings.LOG_FILE, maxBytes=5*1024*1024, backupCount=3)
-handler.setFormatter(logging.Formatter('%(asctime)s - [Robustness] - %(levelname)s - %(message)s'))
-logger.addHandler(handler)
-logger.addHandler(logging.StreamHandler())
+# Run/node context carried by every record (set by main / the graph nodes)
+run_id_var: ContextVar[Optional[str]] = ContextVar("run_id", default=None)
+run_start_var: ContextVar[float] = ContextVar("run_start", default=time.perf_counter())
+node_var: ContextVar[Optional[str]] = ContextVar("node", default=None)
+
+def set_run_context(run_id: str) -> None:
+    """Tag subsequent audit records with ``run_id`` and reset the elapsed-time origin."""
+    run_id_var.set(run_id)
+    run_start_var.set(time.perf_counter())
+
+def _count(stat: str) -> None:
+    with _stats_lock:
+        _stats[stat] += 1
+
+class _DroppingQueueHandler(QueueHandler):
+    """Never blocks: a full queue drops the record and counts it."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Formatting (json.dumps) happens on the listener thread, not here
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+            _count("queued")
+        except queue.Full:
+            _count("dropped")
+
+class JsonlFormatter(logging.Formatter):
+    """One JSON object per line: timestamp, level, run/node context and the audit fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+        }
+        audit = getattr(record, "audit", None)
+        if audit is not None:
+            entry.update(audit)
+        else:
+            entry["run_id"] = getattr(record, "run_id", None)
+            entry["message"] = record.getMessage()
+        return json.dumps(entry, default=str)
+
+class _ContextFilter(logging.Filter):
+    """Captures the caller's run ID for plain logger.warning/error records."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not hasattr(record, "run_id"):
+            record.run_id = run_id_var.get()
+        return True
+
+def setup_logging() -> logging.Logger:
+    """Attach the queue handler and start the JSONL writer thread once. Safe to call repeatedly."""
+    global _configured, _listener
+    if not _configured:
+        _configured = True
+        formatter = JsonlFormatter()
+        file_handler = RotatingFileHandler(settings.LOG_FILE, maxBytes=5*1024*1024, backupCount=3)
+        file_handler.setFormatter(formatter)
+        console_handler = logging.StreamHandler()
+        console_handler.setFormatter(formatter)
+        console_handler.setLevel(settings.AUDIT_CONSOLE_LEVEL)
+
+        handler = _DroppingQueueHandler(queue.Queue(maxsize=settings.AUDIT_QUEUE_SIZE))
+        handler.addFilter(_ContextFilter())
+        logger.addHandler(handler)
+        logger.setLevel(settings.AUDIT_LOG_LEVEL)
+        _listener = QueueListener(handler.queue, file_handler, console_handler, respect_handler_level=True)
+        _listener.start()
+        atexit.register(shutdown_logging)
+    return logger
+
+def shutdown_logging() -> None:
+    """Flush queued records and stop the writer thread (idempotent)."""
+    global _listener
+    if _listener is not None:
+        listener, _listener = _listener, None
+        listener.stop()
+
+def audit_stats() -> Dict[str, int]:
+    """Records queued, dropped on a full queue, and skipped by sampling."""
+    with _stats_lock:
+        return dict(_stats)
 
 def retry_with_backoff(retries: int = 3, backoff_in_seconds: int = 1):
     """
     Decorator to retry a function with exponential backoff.
-    Useful for local LLM inference consistency.
+    Useful for local LLM inference consistency. Coroutine functions are retried
+    with ``asyncio.sleep`` so the event loop is never blocked between attempts.
     """
     def decorator(func: Callable):
+        def next_delay(attempt: int, error: Exception) -> int:
+            # Shared bookkeeping: log, count the retry, and return the backoff (or give up)
+            setup_logging()
+            if attempt == retries:
+                logger.error(f"Function {func.__name__} failed after {retries} retries. Error: {error}")
+                raise error
+            metrics.retries.inc(function=func.__name__)
+            sleep = (backoff_in_seconds * 2 ** attempt)
+            logger.warning(f"Function {func.__name__} failed (Attempt {attempt+1}/{retries}). Retrying in {sleep}s...")
+            return sleep
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                x = 0
+                while True:
+                    try:
+                        return await func(*args, **kwargs)
+                    except Exception as e:
+                        await asyncio.sleep(next_delay(x, e))
+                        x += 1
+            return async_wrapper
+
         @functools.wraps(func)
         def wrapper(*args, **kwargs):
             x = 0
@@ -28,23 +149,49 @@ def retry_with_backoff(retries: int = 3, backoff_in_seconds: int = 1):
                 try:
                     return func(*args, **kwargs)
                 except Exception as e:
-                    if x == retries:
-                        logger.error(f"Function {func.__name__} failed after {retries} retries. Error: {e}")
-                        raise
-                    sleep = (backoff_in_seconds * 2 ** x)
-                    logger.warning(f"Function {func.__name__} failed (Attempt {x+1}/{retries}). Retrying in {sleep}s...")
-                    time.sleep(sleep)
+                    time.sleep(next_delay(x, e))
                     x += 1
         return wrapper
     return decorator
 
-def log_agent_action(agent_name: str, action: str, content: Any):
+def log_agent_action(
+    agent_name: str,
+    action: str,
+    content: Any,
+    level: Optional[int] = None,
+    duration_ms: Optional[float] = None,
+    node: Optional[str] = None,
+):
     """
     Log significant agent actions for audit trails.
+
+    Args:
+        agent_name (str): Agent or component emitting the record.
+        action (str): Short action label ("Query", "Error", ...).
+        content (Any): Payload; truncated to a 200-char preview.
+        level (Optional[int]): Logging level; defaults to ERROR for "Error" actions, else INFO.
+        duration_ms (Optional[float]): Timing of the logged operation, if any.
+        node (Optional[str]): Graph node; defaults to the current node context.
     """
+    if level is None:
+        level = logging.ERROR if action.startswith("Error") else logging.INFO
+    log = setup_logging()
+    if not log.isEnabledFor(level):
+        return
+    # Sample routine records only; warnings and errors are always kept
+    if level < logging.WARNING and settings.AUDIT_SAMPLE_RATE < 1.0 and random.random() >= settings.AUDIT_SAMPLE_RATE:
+        _count("sampled_out")
+        return
+
+    text = str(content)
     entry = {
+        "run_id": run_id_var.get(),
+        "node": node or node_var.get() or agent_name,
         "agent": agent_name,
         "action": action,
-        "content_preview": str(content)[:200] + "..." if len(str(content)) > 200 else str(content)
+        "content_preview": text[:200] + "..." if len(text) > 200 else text,
+        "elapsed_ms": round((time.perf_counter() - run_start_var.get()) * 1000, 1),
     }
-    logger.info(json.dumps(entry))
+    if duration_ms is not None:
+        entry["duration_ms"] = round(duration_ms, 1)
+    log.log(level, action, extra={"audit": entry})
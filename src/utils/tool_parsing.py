@@ -5,6 +5,19 @@ from typing import Dict, Any, Optional, List
 from langchain_core.messages import AIMessage
 from src.utils.parsing import robust_json_parse
 from src.utils.robustness import log_agent_action
+from src.core.config import settings
+
+def _capture_args(tool_name: str, args_str: str) -> None:
+    """Records the raw argument string for scripts/bench_json_parse.py (opt-in via TOOL_ARGS_CORPUS)."""
+    path = settings.TOOL_ARGS_CORPUS
+    if path is None:
+        return
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"tool": tool_name, "args": args_str}) + "\n")
+    except OSError:
+        pass
 
 class ToolParser:
     """
@@ -33,6 +46,7 @@ class ToolParser:
         if match:
             tool_name = match.group(1)
             args_str = match.group(2)
+            _capture_args(tool_name.strip(), args_str)
             try:
                 args = robust_json_parse(args_str)
                 call_id = f"call_{uuid.uuid4().hex[:8]}"
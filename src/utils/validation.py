@@ -1,61 +1,110 @@
 
-import pandas as pd
+import asyncio
 import functools
 import re
 import json
 import io
-from typing import Any, Callable
+from typing import TYPE_CHECKING, Any, Callable
 
-def validate_dataframe(func: Callable) -> Callable:
+if TYPE_CHECKING:
+    import pandas as pd
+
+# Security: Input Size Limit (50KB) for tool data payloads
+MAX_DATA_SIZE = 1024 * 50
+
+def infer_types(df: "pd.DataFrame") -> "pd.DataFrame":
     """
-    Decorator to validate that the input JSON string creates a valid DataFrame.
-    Performs a 'dry run' parse to ensure data integrity before tool execution.
+    Returns a copy of ``df`` with text columns that hold numbers (incl. "1,200",
+    "$5.2", "12%") converted to numeric dtypes; ``df`` itself is left as parsed.
     """
-    @functools.wraps(func)
-    def wrapper(*args, **kwargs):
-        data_str = kwargs.get('data_str')
-        if not data_str:
-            # Try positional arg
-            if len(args) > 0:
-                data_str = args[0]
-        
-        if not data_str:
-             raise ValueError("No data_str provided to Tool.")
+    import pandas as pd
+
+    df = df.copy()
+    for col in df.columns:
+        if pd.api.types.is_numeric_dtype(df[col]) or pd.api.types.is_bool_dtype(df[col]):
+            continue
+        cleaned = df[col].astype("string").str.replace(r"[,$%\s]", "", regex=True)
+        numeric = pd.to_numeric(cleaned, errors="coerce")
+        if numeric.notna().sum() == df[col].notna().sum():
+            df[col] = numeric
+    return df
+
+def parse_dataframe(data_str: str, infer: bool = True) -> "pd.DataFrame":
+    """
+    Parses and schema-checks a tool data payload exactly once.
+    JSON (list of records or dict of columns) is decoded with ``json``; anything
+    else is read as CSV. With ``infer``, column types are inferred on the
+    resulting frame; without it the frame holds the payload's values as given.
+
+    Raises:
+        ValueError: If the payload is missing, oversized, malformed or empty.
+    """
+    if not data_str:
+         raise ValueError("No data_str provided to Tool.")
 
-        # 1. Basic Length Check
-        if len(data_str) < 10:
-             raise ValueError("Data string too short to be valid JSON/CSV.")
-             
-        # 2. Schema/Format Validation (Dry Run)
-        # We assume the data is JSON list of dicts, as per prompt instructions
-        try:
-            # Use standard json first for speed, or robust logic if needed. 
-            # Since this is a validation step for a tool that expects clean JSON from the code generator,
-            # we can use the robust parser if available, or just standard json.
-            # Let's try standard json to be strict, or pd.read_json
-            
-            # Attempt to parse into a DataFrame to verify structure
-            # Handle user passing a string representation of a list
+    # 1. Basic Length Checks (before any parsing work)
+    if len(data_str) < 10:
+         raise ValueError("Data string too short to be valid JSON/CSV.")
+    if len(data_str) > MAX_DATA_SIZE:
+         raise ValueError("Data size exceeds security limit (50KB).")
+
+    # pandas imported lazily to keep CLI startup light
+    import pandas as pd
+
+    # 2. Schema/Format Validation
+    try:
+        text = data_str.strip()
+        if text[0] in "[{":
             try:
-                data = json.loads(data_str)
+                data = json.loads(text)
             except Exception:
-                # If json fails, maybe it's CSV? Unlikely for this specific tool intent but good for robustness
                 raise ValueError("Invalid JSON format.")
-                
-            if not isinstance(data, list):
+            if isinstance(data, dict):
+                if not all(isinstance(v, list) for v in data.values()):
+                     raise ValueError("JSON object must map column names to lists.")
+            elif not isinstance(data, list) or not all(isinstance(row, dict) for row in data):
                  raise ValueError("Data must be a list of dictionaries.")
-                 
             if len(data) == 0:
                  raise ValueError("Data list is empty.")
-                 
-            # Dry run dataframe creation
             df = pd.DataFrame(data)
-            if df.empty:
-                 raise ValueError("DataFrame is empty after parsing.")
-                 
-        except Exception as e:
-            raise ValueError(f"Data validation failed: {str(e)}")
+        else:
+            df = pd.read_csv(io.StringIO(text))
+        if df.empty:
+             raise ValueError("DataFrame is empty after parsing.")
+    except Exception as e:
+        raise ValueError(f"Data validation failed: {str(e)}")
+
+    return infer_types(df) if infer else df
 
+def validate_dataframe(func: Callable) -> Callable:
+    """
+    Decorator for tools taking a ``data_str`` payload: parses and validates it once
+    via ``parse_dataframe`` and calls ``func`` with the resulting DataFrame in its place.
+    The frame is not type-coerced, so anything the tool persists matches the payload;
+    tools call ``infer_types`` for the copy they compute on.
+    Works for both sync and async tool functions.
+    """
+    def convert(args, kwargs):
+        if 'data_str' in kwargs:
+            kwargs = dict(kwargs)
+            data_str = kwargs.pop('data_str')
+        elif len(args) > 0:
+            # Try positional arg
+            data_str, args = args[0], args[1:]
+        else:
+            data_str = None
+        return (parse_dataframe(data_str, infer=False), *args), kwargs
+
+    if asyncio.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            args, kwargs = convert(args, kwargs)
+            return await func(*args, **kwargs)
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        args, kwargs = convert(args, kwargs)
         return func(*args, **kwargs)
     return wrapper
 
@@ -0,0 +1,34 @@
+import asyncio
+from contextlib import nullcontext
+from typing import Any, Dict, List, Optional, Tuple
+from unittest.mock import patch
+
+import pytest
+
+
+def _run_graph(llm: Any, question: str, rag_result: Optional[Dict[str, Any]] = None, recursion_limit: int = 25) -> List[Tuple[str, Dict[str, Any]]]:
+    """
+    Streams one offline graph run driven by ``llm`` (a FakeChatOllama) and returns
+    its (node, update) events in order. With ``rag_result`` the process-wide RAG
+    adapter is patched to answer every query with it.
+    """
+    from src.graph import build_graph
+
+    async def run():
+        events = []
+        with patch("src.rag_adapter.adapter") if rag_result is not None else nullcontext() as rag:
+            if rag_result is not None:
+                async def aquery(question):
+                    return {"latency_s": 0.0, **rag_result}
+                rag.aquery = aquery
+            async for event in build_graph(llm).astream({"messages": [("user", question)]}, {"recursion_limit": recursion_limit}):
+                events.extend(event.items())
+        return events
+
+    return asyncio.run(run())
+
+
+@pytest.fixture
+def run_graph():
+    """The offline graph runner: ``run_graph(llm, question, rag_result=None, recursion_limit=25)``."""
+    return _run_graph
@@ -0,0 +1,33 @@
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+# Timing-sensitive, so opt-in: RUN_BENCHMARKS=1 pytest tests/test_benchmarks.py (or make bench)
+@pytest.mark.skipif(os.getenv("RUN_BENCHMARKS") != "1", reason="Set RUN_BENCHMARKS=1 to run the hot-path benchmarks")
+def test_hot_paths_within_baseline():
+    """Each hot path stays within BENCH_TOLERANCE of the calibrated baseline recorded on this host."""
+    sys.path.insert(0, str(ROOT / "scripts"))
+    from bench_hotpaths import CASES, DEFAULT_TOLERANCE, check, load_baselines
+
+    baselines = load_baselines()
+    if not baselines:
+        pytest.skip("No baselines recorded on this host: run python scripts/bench_hotpaths.py --update first")
+    assert set(CASES) <= set(baselines), f"Cases without a baseline: {sorted(set(CASES) - set(baselines))}"
+    _, regressions = check(baselines, DEFAULT_TOLERANCE)
+    assert not regressions, "Hot-path regressions:\n" + "\n".join(regressions)
+
+
+def test_shared_prompt_prefix_reuses_cache():
+    """Every hop after the first extends the previous request, so only the new turns are prefilled."""
+    sys.path.insert(0, str(ROOT / "scripts"))
+    from bench_prompt_prefix import build_messages, estimate, legacy_messages
+
+    shared, legacy = estimate(build_messages), estimate(legacy_messages)
+    assert sum(r["prefill"] for r in shared) < sum(r["prefill"] for r in legacy) / 2
+    # Switching agents no longer re-prefills a different system prompt
+    assert all(r["prefill"] < r["prompt"] / 2 for r in shared[1:])
@@ -12,6 +12,7 @@ from unittest.mock import MagicMock, patch
 def test_config_loading():
     """Verify config loads correctly."""
     assert settings.LLM_MODEL is not None
+    settings.ensure_dirs()  # Directories are created by explicit init, not at import
     assert os.path.exists(settings.DATA_DIR)
 
 # Test Tools
@@ -31,8 +32,174 @@ def test_plot_tool():
         assert "Chart generated successfully" in result, f"Tool failed with: {result}"
         assert os.path.exists(os.path.join(settings.OUTPUT_DIR, "test_plot.png"))
 
-# Test LLM Connection (Skip if Ollama not running)
-@pytest.mark.skipif(os.getenv("CI") == "true", reason="Skipping local LLM test in CI")
+def test_parse_dataframe_single_pass():
+    """JSON and CSV payloads parse once, with numeric text columns inferred."""
+    from src.utils.validation import parse_dataframe
+
+    df = parse_dataframe('[{"year": "2023", "value": "1,200"}, {"year": "2024", "value": "$1,500"}]')
+    assert list(df["value"]) == [1200, 1500]
+    assert df["year"].dtype.kind in "if"
+
+    csv_df = parse_dataframe("label,value\nA,1\nB,2\n")
+    assert list(csv_df.columns) == ["label", "value"]
+
+    with pytest.raises(ValueError):
+        parse_dataframe('[{"value": 1}]' + " " * (50 * 1024))
+
+def test_chart_renderer_preview_profile(tmp_path):
+    """Renders off the caller's thread and honours the DPI/format profile."""
+    from src.tools.plot_renderer import ChartRenderer
+
+    renderer = ChartRenderer(workers=0)  # in-process thread: no spawn cost in the test
+    try:
+        future = renderer.submit(
+            [{"label": "A", "value": 1}, {"label": "B", "value": 2}],
+            "default", "Preview", "x", "y", str(tmp_path / "preview.png"), profile="preview",
+        )
+        path = future.result(timeout=60)
+    finally:
+        renderer.shutdown()
+    assert os.path.getsize(path) > 0
+
+def test_chart_raw_csv_keeps_payload_values(tmp_path, monkeypatch):
+    """The audit CSV records the payload as given; only the rendered copy is coerced."""
+    import csv
+    from concurrent.futures import Future
+    from src.tools import plot_tool
+
+    jobs = []
+    class Renderer:
+        def submit(self, **job):
+            jobs.append(job)
+            done = Future()
+            done.set_result(job["out_path"])
+            return done
+    monkeypatch.setattr(plot_tool, "get_renderer", lambda: Renderer())
+    monkeypatch.setattr(settings, "OUTPUT_DIR", str(tmp_path))
+    result = create_plot.invoke({
+        "data_str": '[{"year": "2023", "value": "$1,200"}, {"year": "2024", "value": "12%"}]',
+        "plot_type": "bar", "title": "Raw", "xlabel": "x", "ylabel": "y",
+    })
+    assert result.startswith("Chart generated")
+    (csv_path,) = tmp_path.glob("*.csv")
+    with open(csv_path, newline="") as f:
+        assert [row["value"] for row in csv.DictReader(f)] == ["$1,200", "12%"]
+    assert [r["value"] for r in jobs[0]["records"]] == [1200, 12]
+
+def test_queued_chart_failure_reported_on_next_call(tmp_path, monkeypatch):
+    """With PLOT_WAIT off, a render that fails after the tool returned is surfaced by the next create_plot result."""
+    import asyncio
+    from concurrent.futures import Future
+    from src.tools import plot_tool
+
+    futures = []
+    class Renderer:
+        def submit(self, **job):
+            futures.append(Future())
+            return futures[-1]
+    monkeypatch.setattr(plot_tool, "get_renderer", lambda: Renderer())
+    monkeypatch.setattr(settings, "OUTPUT_DIR", str(tmp_path))
+    monkeypatch.setattr(settings, "PLOT_WAIT", False)
+    args = {"data_str": '[{"label": "A", "value": 1}, {"label": "B", "value": 2}]', "plot_type": "bar", "xlabel": "x", "ylabel": "y"}
+
+    first = asyncio.run(create_plot.ainvoke({**args, "title": "First"}))
+    assert first.startswith("Chart queued")
+    futures[0].set_exception(RuntimeError("backend crashed"))
+    second = asyncio.run(create_plot.ainvoke({**args, "title": "Second"}))
+    assert "Earlier queued chart failed" in second and "backend crashed" in second and "first_" in second
+    assert "failed" not in asyncio.run(create_plot.ainvoke({**args, "title": "Third"}))
+
+def test_output_eviction_is_lru_by_chart(tmp_path):
+    """Charts and their CSVs are evicted together, oldest first, until under budget."""
+    from src.tools.plot_tool import evict_outputs
+
+    for i, stem in enumerate(["old_aaaa", "mid_bbbb", "new_cccc"]):
+        for ext in ("png", "csv"):
+            path = tmp_path / f"{stem}.{ext}"
+            path.write_bytes(b"x" * 100)
+            os.utime(path, (1000 + i, 1000 + i))
+
+    removed = evict_outputs(str(tmp_path), max_bytes=400, protect=[str(tmp_path / "mid_bbbb.png")])
+    assert removed == 2
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["mid_bbbb.csv", "mid_bbbb.png", "new_cccc.csv", "new_cccc.png"]
+
+def test_code_sandbox_limits_and_tables(monkeypatch):
+    """run_python returns compact tables; blocked imports, timeouts and a full queue become errors, not crashes."""
+    import threading
+    import time
+    from src.core.exceptions import ToolExecutionError
+    from src.tools import code_tool
+    from src.tools.code_sandbox import CodeSandbox
+
+    monkeypatch.setattr(settings, "SANDBOX_TIMEOUT_S", 2.0)
+    monkeypatch.setattr(settings, "SANDBOX_CPU_S", 0)
+    sandbox = CodeSandbox(workers=1, queue_size=0)
+    monkeypatch.setattr(code_tool, "get_sandbox", lambda: sandbox)
+    data = '[{"year": 2023, "revenue": 26.97}, {"year": 2024, "revenue": 60.92}]'
+    try:
+        out = code_tool.run_python.invoke({"code": "df.assign(growth=df.revenue.pct_change())", "data_str": data})
+        assert "growth" in out and "1.259" in out and "[2 rows x 3 columns]" in out
+        assert "not allowed" in code_tool.run_python.invoke({"code": "import os"})
+
+        # A runaway call holds the only worker: the next one is rejected, then the worker is replaced
+        errors = []
+        def runaway():
+            try:
+                sandbox.run("while True: pass")
+            except ToolExecutionError as e:
+                errors.append(str(e))
+        thread = threading.Thread(target=runaway)
+        thread.start()
+        while sandbox._slots._value:
+            time.sleep(0.01)
+        assert "sandbox busy" in code_tool.run_python.invoke({"code": "1 + 1"})
+        thread.join()
+        assert errors and "exceeded 2s" in errors[0]
+        assert code_tool.run_python.invoke({"code": "print('ok')\nresult = np.arange(4).sum()"}) == "ok\n6"
+    finally:
+        sandbox.shutdown()
+
+def test_code_sandbox_refuses_host_access(monkeypatch, tmp_path):
+    """Snippets cannot reach other modules, files or the OS through pandas/NumPy; unconfined workers fail closed."""
+    from src.tools import code_tool
+    from src.tools.code_sandbox import CodeSandbox, isolation_gaps
+
+    assert isolation_gaps({"network": False, "filesystem": True, "uid": 0}) == ["network namespace", "unprivileged uid"]
+    sandbox = CodeSandbox(workers=1, queue_size=0)
+    monkeypatch.setattr(code_tool, "get_sandbox", lambda: sandbox)
+    escapes = [
+        "pd.core.frame.sys.modules['os'].popen('id').read()",
+        "from pandas.core.frame import sys",
+        "import pandas.core.frame",
+        "pd.io.common.os.getcwd()",
+        "pd.read_csv('/etc/hostname')",
+        "np.load('/etc/hostname')",
+        "pd.DataFrame({'a': [1]}).to_csv('leak.csv')",
+        "().__class__.__base__.__subclasses__()",
+        "'{0.__class__}'.format(1)",
+        "(x for x in []).gi_frame.f_globals",
+    ]
+    try:
+        out = code_tool.run_python.invoke({"code": "pd.Series([1, 2]).to_list()"})
+        if isolation_gaps(sandbox.isolation):
+            # Fail closed: a worker that could not drop root or the network runs nothing
+            assert "isolation unavailable" in out
+            return
+        assert out == "[1, 2]"
+        for code in escapes:
+            out = code_tool.run_python.invoke({"code": code})
+            assert out.startswith("Error running code:") and "not allowed" in out, code
+        assert "not defined" in code_tool.run_python.invoke({"code": "getattr(pd, 'read_csv')('/etc/hostname')"})
+        if sandbox.isolation["filesystem"]:
+            # Method names passed as strings bypass the screening; the OS confinement still stops the write
+            leak = tmp_path / "leak.csv"
+            assert code_tool.run_python.invoke({"code": f"pd.Series([1]).agg('to_csv', path_or_buf={str(leak)!r})"}).startswith("Error running code:")
+            assert not leak.exists()
+    finally:
+        sandbox.shutdown()
+
+# Test LLM Connection (live Ollama only; offline protocol coverage is test_chat_ollama_against_stub)
+@pytest.mark.skipif(os.getenv("OLLAMA_LIVE") != "1", reason="Set OLLAMA_LIVE=1 to test against a running Ollama")
 def test_llm_connection():
     """Verify we can talk to Ollama."""
     try:
@@ -51,11 +218,12 @@ def test_supervisor_validity_under_noise():
     This proves the 'Routing Stability' claim in the README.
     """
     from src.agents.supervisor import create_supervisor_node
-    from langchain_core.messages import AIMessage
+    from src.testing import FakeChatOllama, ScriptedResponder
     
-    # 1. Simulate a completely broken LLM response using a callable (LCEL compatible)
-    def broken_llm(input):
-        return AIMessage(content="I am a stochastic parrot behaving badly with no structured output.")
+    # 1. Simulate a completely broken LLM response
+    broken_llm = FakeChatOllama(responder=ScriptedResponder(
+        default="I am a stochastic parrot behaving badly with no structured output."
+    ))
     
     # 2. Create supervisor with standard roles
     members = ["Researcher", "Quant"]
@@ -76,3 +244,199 @@ def test_supervisor_validity_under_noise():
     
     # 5. Verify asymmetric bias (should fall back to Researcher for safety)
     assert result["next"] == "Researcher", "Ideally, ambiguous input should bias towards data retrieval (Researcher)."
+
+# Test Offline LLM Stand-ins
+def test_chat_ollama_against_stub():
+    """A real ChatOllama client runs against the scripted /api/chat stand-in, streaming and not."""
+    from src.testing import OllamaStub, ScriptedResponder, tool_call
+    from src.utils.accounting import message_usage
+
+    responder = ScriptedResponder(
+        rules={"act next": ["Next: Researcher", "Next: FINISH"]},
+        script=[tool_call("query_financial_rag", question="NVIDIA revenue 2024")],
+    )
+    with OllamaStub(responder) as stub:
+        llm = ChatOllama(model="fake-ollama", base_url=stub.base_url)
+        first = llm.invoke("Who should act next?")
+        assert first.content == "Next: Researcher"
+        usage = message_usage(first)
+        assert usage["prompt_tokens"] == 4 and usage["eval_tokens"] == 2
+
+        streamed = "".join(chunk.content for chunk in llm.stream("Who should act next?"))
+        assert streamed == "Next: FINISH"
+
+        call = llm.invoke("Find the revenue.").content
+        assert call.startswith("TOOL_CALL: query_financial_rag")
+
+def test_shared_ollama_clients_warm_up_and_health(monkeypatch):
+    """All models share one pooled client per host; warm-up makes the model resident and /health reports it."""
+    import asyncio
+    import json
+    import socket
+    import urllib.request
+    from src.llm_client import agent_prefixes, chat_model, close_pools, index_llm, residency, shared_transports, warm_up
+    from src.testing import OllamaStub, ScriptedResponder
+    from src.utils.metrics import MetricsExporter
+
+    with OllamaStub(ScriptedResponder(default="ok"), model="fake-ollama") as stub:
+        monkeypatch.setattr(settings, "LLM_BASE_URL", stub.base_url)
+        monkeypatch.setattr(settings, "LLM_MODEL", "fake-ollama")
+        monkeypatch.setattr(settings, "LLM_KEEP_ALIVE", "-1")
+        with socket.socket() as probe:
+            probe.bind(("127.0.0.1", 0))
+            port = probe.getsockname()[1]
+        monkeypatch.setattr(settings, "METRICS_HOST", "127.0.0.1")
+        monkeypatch.setattr(settings, "METRICS_PORT", port)
+        assert residency()["state"] == "cold"
+
+        agents, rag = chat_model(), index_llm()
+        sync_pool, async_pool = shared_transports()
+        assert agents.sync_client_kwargs["transport"] is sync_pool
+        assert agents.async_client_kwargs["transport"] is chat_model().async_client_kwargs["transport"] is async_pool
+        assert rag.async_client is index_llm().async_client
+
+        async def closing(coro):
+            try:
+                return await coro
+            finally:
+                await close_pools()
+
+        assert asyncio.run(closing(warm_up(agent_prefixes())))
+        # The pool is per event loop, so separate asyncio.run calls keep working; each closes its own
+        assert [asyncio.run(closing(agents.ainvoke("hi"))).content for _ in range(2)] == ["ok", "ok"]
+        assert len(async_pool) == 0
+
+        exporter = MetricsExporter()
+        exporter.start()
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/health") as resp:
+                health = json.loads(resp.read())
+        finally:
+            exporter.stop()
+    assert health["status"] == "ok" and health["llm"]["state"] == "warm"
+    assert health["llm"]["warmup"]["state"] == "warm"
+
+def test_fake_llm_latency_and_graph_run(run_graph):
+    """FakeChatOllama drives the full graph offline with simulated TTFT and decode time."""
+    import time
+    from pathlib import Path
+    from src.testing import FakeChatOllama
+    from src.utils.accounting import merge_metadata
+
+    script = Path(__file__).parent / "data" / "fake_llm_script.json"
+    llm = FakeChatOllama.from_file(script)
+    start = time.perf_counter()
+    chunks = [c.content for c in llm.stream("Who should act next?")]
+    assert "".join(chunks) == "Next: Researcher"
+    assert time.perf_counter() - start >= 0.02 + 0.002
+
+    events = run_graph(
+        FakeChatOllama.from_file(script), "Compare NVIDIA revenue 2023 vs 2024.",
+        rag_result={"model_answer": "Revenue: $26.97B (2023), $60.92B (2024)."}, recursion_limit=20,
+    )
+    metadata = {}
+    for _, update in events:
+        metadata = merge_metadata(metadata, update.get("metadata"))
+    nodes = metadata["nodes"]
+    assert nodes["Supervisor"]["calls"] == 2 and nodes["Researcher"]["calls"] == 2
+    assert nodes["Researcher"]["eval_tokens"] > 0 and metadata["tool_calls"] == 1
+
+def test_run_guard_stops_tool_loop(run_graph):
+    """A model repeating the same tool call is cut off and the run finishes with the best answer so far."""
+    from src.testing import FakeChatOllama, ScriptedResponder, tool_call
+
+    loop = tool_call("query_financial_rag", question="NVIDIA revenue 2024")
+    llm = FakeChatOllama(responder=ScriptedResponder(rules={"who should act next": ["Next: Researcher"] * 20, "Act as the Researcher": [loop] * 20}))
+
+    updates = [u for _, u in run_graph(llm, "NVIDIA revenue 2024?", rag_result={"model_answer": "Revenue: $60.92B (2024)."})]
+    guard = next(u["guard"] for u in updates if "guard" in u)
+    assert guard["reason"] == "duplicate_tool_call" and guard["calls_cut"] > 0
+    assert updates[-1]["next"] == "FINISH" and updates[-1]["sender"] == "Guard"
+    assert "60.92" in updates[-1]["messages"][-1].content
+    # One RAG call served; the repeat never reached the tool node
+    assert sum(1 for u in updates if u.get("metadata", {}).get("nodes", {}).get("tools")) == 1
+
+def test_supervisor_tool_call_routes_to_tool_owner(run_graph):
+    """Every agent sees all tool formats; a Supervisor TOOL_CALL routes to the member owning the tool and runs nothing."""
+    from src.testing import FakeChatOllama, ScriptedResponder, tool_call
+
+    llm = FakeChatOllama(responder=ScriptedResponder(rules={
+        "who should act next": [tool_call("run_python", code="df['revenue'].pct_change()"), "Next: FINISH"],
+        "Act as the Quant": ["Revenue grew 126% from fiscal 2023 to 2024."],
+    }))
+
+    updates = run_graph(llm, "How much did NVIDIA revenue grow?", recursion_limit=10)
+    assert [node for node, _ in updates] == ["Supervisor", "Quant", "Supervisor"]
+    assert updates[0][1]["next"] == "Quant" and updates[-1][1]["next"] == "FINISH"
+    assert "126%" in updates[1][1]["messages"][-1].content
+
+def test_large_sources_stay_out_of_graph_state(run_graph):
+    """RAG sources are held in the run's artifact store; messages carry IDs and fetch_artifact returns the text."""
+    from src.testing import FakeChatOllama, ScriptedResponder, tool_call
+    from src.utils.artifacts import ArtifactStore, artifact_scope, get_store
+
+    source = "Fiscal 2024 revenue table. " + "Data Center $47,525M; Gaming $10,447M. " * 200
+    source_id = ArtifactStore().put(source)
+    llm = FakeChatOllama(responder=ScriptedResponder(rules={
+        "who should act next": ["Next: Researcher", "Next: FINISH"],
+        "Act as the Researcher": [
+            tool_call("query_financial_rag", question="NVIDIA segment revenue 2024"),
+            tool_call("fetch_artifact", artifact_id=source_id),
+            "Data Center revenue was $47,525M in fiscal 2024.",
+        ],
+    }))
+
+    with artifact_scope() as store:
+        events = run_graph(llm, "NVIDIA segments 2024?", rag_result={"model_answer": "Data Center: $47.5B.", "source_nodes": [source]})
+    messages = [m for _, update in events for m in update.get("messages") or []]
+    rag_result, fetched = [m.content for m in messages if m.type == "tool"]
+    assert source_id in rag_result and len(rag_result) < 400
+    assert fetched == source and len(store) == 1
+    assert get_store().get(source_id) is None  # scoped to the run
+
+def test_load_test_offline_saturation_curve(tmp_path):
+    """The load generator drives the graph against the scripted backend and summarises each level."""
+    import argparse
+    import asyncio
+    import json
+    from pathlib import Path
+    from src.experiments.load_test import run_load_test
+    from src.rag_adapter import adapter, current_adapter
+
+    args = argparse.Namespace(
+        backend="fake", fake_llm=Path(__file__).parent / "data" / "fake_llm_script.json", rag_ms=10.0,
+        rag_cache=False, questions=str(tmp_path / "missing.json"), output=str(tmp_path), seed=0,
+        concurrency="1,3", rate=None, workers=2, duration=0.3, no_plot=True,
+    )
+    curve = asyncio.run(run_load_test(args))
+    assert [row["offered"] for row in curve] == [1.0, 3.0]
+    assert all(row["completed"] > 0 and row["errors"] == 0 and row["no_answer"] == 0 for row in curve)
+    assert curve[1]["throughput_qps"] > curve[0]["throughput_qps"]
+    assert "Researcher_p95_s" in curve[0] and "tools_p95_s" in curve[0]
+    # The simulated RAG was scoped to the run; the process-wide adapter is untouched
+    assert current_adapter() is adapter
+
+    rows = [json.loads(line) for line in next(tmp_path.glob("*/requests.jsonl")).read_text().splitlines()]
+    assert len(rows) == sum(row["completed"] for row in curve)
+    assert {"queue_wait_s", "e2e_s", "nodes_ms"} <= rows[0].keys()
+
+
+def test_swarm_pipeline_owns_its_rag_adapter():
+    """The comparison harness's swarm gets its own adapter and cache; the process-wide adapter is untouched."""
+    import os
+    from src.experiments.pipelines import SwarmPipeline
+    from src.rag_adapter import adapter, adapter_scope, current_adapter
+    from src.testing.fake_llm import FakeChatOllama, ScriptedResponder
+
+    cache, embed_model = adapter._cache, adapter.embed_model
+    embed = object()
+    pipeline = SwarmPipeline(FakeChatOllama(responder=ScriptedResponder()), embed)
+    try:
+        assert adapter._cache is cache and adapter.embed_model is embed_model
+        assert pipeline.adapter is not adapter and pipeline.adapter.embed_model is embed
+        with adapter_scope(pipeline.adapter):
+            assert current_adapter() is pipeline.adapter
+        assert current_adapter() is adapter
+    finally:
+        pipeline.close()
+    assert not os.path.exists(pipeline._cache_dir)
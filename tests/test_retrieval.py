@@ -0,0 +1,152 @@
+import numpy as np
+from src.retrieval.ann import IVFIndex, exact_search, _normalize
+
+
+def _corpus(n=2000, dim=32, seed=0):
+    rng = np.random.default_rng(seed)
+    return _normalize(rng.standard_normal((n, dim)).astype(np.float32))
+
+
+def test_ivf_full_probe_matches_exact_search():
+    """Probing every cell must reproduce brute-force results exactly."""
+    vectors = _corpus()
+    ids = [f"node-{i}" for i in range(len(vectors))]
+    ann = IVFIndex(nlist=16).build(ids, vectors)
+
+    query = vectors[7] + 0.01
+    exact_pos, _ = exact_search(vectors, query, 5)
+    ann_ids, ann_scores = ann.search(query, 5, nprobe=ann.nlist)
+
+    assert ann_ids == [ids[i] for i in exact_pos]
+    assert ann_scores == sorted(ann_scores, reverse=True)
+
+
+def test_ivf_persistence_roundtrip(tmp_path):
+    vectors = _corpus(500)
+    ann = IVFIndex(nlist=8, nprobe=2).build([str(i) for i in range(500)], vectors, fingerprint="v1")
+    path = tmp_path / "ann_ivf.npz"
+    ann.save(path)
+
+    loaded = IVFIndex.load(path)
+    assert loaded.fingerprint == "v1"
+    assert loaded.nlist == 8 and len(loaded) == 500
+    assert loaded.search(vectors[3], 3) == ann.search(vectors[3], 3)
+
+
+def test_route_extraction_and_shard_selection():
+    from src.retrieval.sharding import WILDCARD_SHARD, extract_route, select_shards
+
+    keys = [("NVDA", "2023"), ("NVDA", "2024"), ("AMD", "2024"), WILDCARD_SHARD]
+    route = extract_route("Compare AMD's 2024 gross margin with NVDA", known_tickers={"NVDA", "AMD"})
+    assert route.tickers == {"AMD", "NVDA"}
+    assert route.years == {"2024"}
+    assert select_shards(route, keys) == [("NVDA", "2024"), ("AMD", "2024"), WILDCARD_SHARD]
+
+    # Ranges expand; a ticker that is not indexed degrades to the year filter only
+    route = extract_route("Apple revenue from 2022 to 2023")
+    assert route.tickers == {"AAPL"} and route.years == {"2022", "2023"}
+    assert select_shards(route, keys) == [("NVDA", "2023"), WILDCARD_SHARD]
+
+    # Unrouted questions fan out to every shard
+    assert select_shards(extract_route("What drives margins?"), keys) == keys
+
+
+def test_reranker_early_exit_and_batched_scoring():
+    from unittest.mock import MagicMock
+    from llama_index.core.schema import NodeWithScore, QueryBundle, TextNode
+    from src.retrieval.rerank import CrossEncoderReranker, is_decisive
+
+    assert is_decisive([0.9, 0.5, 0.4], top_n=1, margin=0.15)
+    assert not is_decisive([0.62, 0.61, 0.60], top_n=1, margin=0.15)
+
+    nodes = [NodeWithScore(node=TextNode(text=f"chunk {i}"), score=0.6 - i * 0.01) for i in range(4)]
+    reranker = CrossEncoderReranker(model_name="unused", top_n=2, margin=0.15)
+    model = MagicMock()
+    model.predict.return_value = [0.1, 0.2, 0.9, 0.3]
+    reranker._model = model
+
+    top = reranker.postprocess_nodes(nodes, QueryBundle("revenue?"))
+    assert [n.node.get_content() for n in top] == ["chunk 2", "chunk 3"]
+    model.predict.assert_called_once()  # single batched forward pass
+    assert reranker.stats["reranked"] == 1 and reranker.stats["skipped"] == 0
+
+
+def test_reranking_retriever_scores_off_the_event_loop():
+    """Async retrieval runs the cross-encoder in an executor thread, not on the loop."""
+    import asyncio
+    import threading
+    from unittest.mock import MagicMock
+    from llama_index.core.retrievers import BaseRetriever
+    from llama_index.core.schema import NodeWithScore, QueryBundle, TextNode
+    from src.retrieval.rerank import CrossEncoderReranker, RerankingRetriever
+
+    class Dense(BaseRetriever):
+        def _retrieve(self, query_bundle):
+            return [NodeWithScore(node=TextNode(text=f"chunk {i}"), score=0.6 - i * 0.01) for i in range(4)]
+
+    threads = []
+    model = MagicMock()
+    model.predict.side_effect = lambda pairs, **_: threads.append(threading.get_ident()) or [0.1, 0.2, 0.9, 0.3]
+    reranker = CrossEncoderReranker(model_name="unused", top_n=2, margin=0.15)
+    reranker._model = model
+
+    async def run():
+        return threading.get_ident(), await RerankingRetriever(Dense(), reranker).aretrieve(QueryBundle("revenue?"))
+
+    loop_thread, top = asyncio.run(run())
+    assert [n.node.get_content() for n in top] == ["chunk 2", "chunk 3"]
+    assert threads and threads[0] != loop_thread
+
+
+def test_table_aware_chunks_keep_headers_and_hybrid_fusion():
+    from llama_index.core.schema import Document, NodeWithScore, QueryBundle, TextNode
+    from llama_index.core.retrievers import BaseRetriever
+    from src.retrieval.chunking import TableAwareSplitter
+    from src.retrieval.retrievers import BM25Retriever, HybridRetriever
+
+    rows = "\n".join(f"| Item {i} | {i}.0 | {i}.5 |" for i in range(5))
+    doc = Document(text=f"# Income Statement\nAll figures in $bn.\n\n| Metric | 2023 | 2024 |\n| :--- | :---: | :---: |\n{rows}\n\nOutlook text.")
+    nodes = TableAwareSplitter(rows_per_chunk=2).get_nodes_from_documents([doc])
+    tables = [n for n in nodes if n.metadata.get("chunk_type") == "table"]
+    assert len(tables) == 3
+    for node in tables:
+        lines = node.get_content().splitlines()
+        assert lines[:3] == ["# Income Statement", "| Metric | 2023 | 2024 |", "| :--- | :---: | :---: |"]
+    assert "Outlook text." in nodes[-1].get_content()
+
+    corpus = [TextNode(text=t, id_=str(i)) for i, t in enumerate(["R&D expenses rose to 8.68B", "revenue grew", "gross margin 72.7%"])]
+    bm25 = BM25Retriever(corpus, similarity_top_k=2)
+    assert bm25.retrieve(QueryBundle("R&D expenses 2024"))[0].node.node_id == "0"
+
+    class Fixed(BaseRetriever):
+        def _retrieve(self, query_bundle):
+            return [NodeWithScore(node=corpus[2], score=0.9), NodeWithScore(node=corpus[0], score=0.8)]
+
+    fused = HybridRetriever(Fixed(), bm25, similarity_top_k=2).retrieve(QueryBundle("R&D expenses"))
+    assert [hit.node.node_id for hit in fused] == ["0", "2"]  # ranked by both beats ranked first by one
+
+
+def test_sharded_retrievers_share_one_executor():
+    """Rebuilt sharded retrievers reuse the module's shard pool instead of each starting threads."""
+    import asyncio
+    from unittest.mock import MagicMock
+    from llama_index.core.retrievers import BaseRetriever
+    from llama_index.core.schema import NodeWithScore, QueryBundle, TextNode
+    from src.retrieval import retrievers
+
+    class Shard(BaseRetriever):
+        def __init__(self, score):
+            super().__init__()
+            self._score = score
+
+        def _retrieve(self, query_bundle):
+            return [NodeWithScore(node=TextNode(text=f"hit {self._score}"), score=self._score)]
+
+    embed = MagicMock()
+    embed.get_query_embedding.return_value = [0.0]
+    shards = {("AAPL", "2023"): Shard(0.4), ("MSFT", "2023"): Shard(0.9)}
+    first = retrievers.ShardedRetriever(shards, embed, similarity_top_k=1)
+    second = retrievers.ShardedRetriever(shards, embed, similarity_top_k=1)
+    assert not hasattr(first, "_pool") and not hasattr(second, "_pool")
+    assert [n.score for n in first.retrieve(QueryBundle("revenue", embedding=[0.0]))] == [0.9]
+    assert [n.score for n in asyncio.run(second.aretrieve(QueryBundle("revenue", embedding=[0.0])))] == [0.9]
@@ -28,3 +28,309 @@ def test_config_load():
     """Verify Settings load correctly."""
     assert settings.LLM_MODEL is not None
     assert settings.LLM_TIMEOUT > 0
+
+@pytest.mark.asyncio
+async def test_prefetch_reused_for_similar_question():
+    """A speculative retrieval is reused when the tool question is close to the user question."""
+    from unittest.mock import AsyncMock
+
+    adapter = RAGAdapter()
+    adapter.cache = MagicMock()
+    adapter.cache.get.return_value = None
+    adapter.cache.__contains__.return_value = False
+    adapter.query_engine = MagicMock()
+    adapter.query_engine.aretrieve = AsyncMock(return_value=["prefetched-node"])
+    adapter.query_engine.asynthesize = AsyncMock(return_value=MagicMock(source_nodes=[]))
+    adapter.query_engine.aquery = AsyncMock()
+
+    adapter.prefetch("What was NVIDIA's revenue in 2023?")
+    await adapter.aquery("NVIDIA revenue 2023")
+
+    adapter.query_engine.aquery.assert_not_called()
+    assert adapter.query_engine.asynthesize.call_args.args[1] == ["prefetched-node"]
+
+    # Dissimilar questions fall back to a fresh query and leave the prefetch pending
+    adapter.prefetch("What was NVIDIA's revenue in 2023?")
+    await adapter.aquery("AMD gross margin trend")
+    adapter.query_engine.aquery.assert_called_once()
+    adapter.cancel_prefetch("What was NVIDIA's revenue in 2023?")
+
+@pytest.mark.asyncio
+async def test_prefetch_scoped_per_run_and_cancellation():
+    """Concurrent runs never take each other's prefetch; a cancelled prefetch is a miss, the caller's cancel propagates."""
+    import asyncio
+    from unittest.mock import AsyncMock
+    from src.rag_adapter import prefetch_scope
+
+    adapter = RAGAdapter()
+    adapter.cache = MagicMock()
+    adapter.cache.__contains__.return_value = False
+    adapter.query_engine = MagicMock()
+    release = asyncio.Event()
+
+    async def slow_retrieve(bundle):
+        await release.wait()
+        return ["prefetched-node"]
+
+    adapter.query_engine.aretrieve = slow_retrieve
+
+    async def run(prefetch):
+        with prefetch_scope():
+            if prefetch:
+                adapter.prefetch("NVIDIA revenue 2023")
+                await asyncio.sleep(0)
+            return asyncio.create_task(adapter._take_prefetch("NVIDIA revenue 2023"))
+
+    own = await run(prefetch=True)
+    # A concurrent run asking the same question does not see the pending prefetch
+    assert await (await run(prefetch=False)) is None
+    release.set()
+    assert await own == ["prefetched-node"]
+
+    # The prefetch is cancelled (route went elsewhere): a miss, not an error
+    release.clear()
+    with prefetch_scope():
+        adapter.prefetch("NVIDIA revenue 2023")
+        await asyncio.sleep(0)
+        adapter.cancel_prefetch("NVIDIA revenue 2023")
+        assert await adapter._take_prefetch("NVIDIA revenue 2023") is None
+
+        # The caller is cancelled while waiting: CancelledError reaches it
+        adapter.prefetch("NVIDIA revenue 2023")
+        waiter = asyncio.create_task(adapter._take_prefetch("NVIDIA revenue 2023"))
+        await asyncio.sleep(0.01)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+
+def test_rag_cache_key_tracks_corpus_and_retrieval_config(tmp_path, monkeypatch):
+    """A cached RAG result is only reused for the same corpus version and retrieval settings."""
+    corpus = tmp_path / "parsed.md"
+    corpus.write_text("NVIDIA revenue was $60.92B in fiscal 2024.")
+    monkeypatch.setattr(settings, "RAG_DATA_PATH", corpus)
+    adapter = RAGAdapter()
+    key = adapter.cache_key("NVIDIA revenue 2024")
+    assert adapter.cache_key("NVIDIA revenue 2024") == key
+
+    monkeypatch.setattr(settings, "RAG_TOP_K", settings.RAG_TOP_K + 1)
+    assert adapter.cache_key("NVIDIA revenue 2024") != key
+    monkeypatch.undo()
+    monkeypatch.setattr(settings, "RAG_DATA_PATH", corpus)
+    corpus.write_text("NVIDIA revenue was $60.92B in fiscal 2024; Data Center $47.5B.")
+    assert adapter.cache_key("NVIDIA revenue 2024") != key
+
+def test_answer_cache_key_and_provenance(tmp_path):
+    """Normalized repeats hit the whole-run cache; a new index version misses."""
+    from src.utils.answer_cache import AnswerCache
+
+    cache = AnswerCache(tmp_path / "answers")
+    cache.set("What was NVIDIA's revenue in 2023?", "idx-v1", "26.97B", run_id="abc123", steps=4)
+
+    hit = cache.get("  what was nvidia's revenue in 2023 ", "idx-v1")
+    assert hit["answer"] == "26.97B" and hit["run_id"] == "abc123"
+    assert cache.get("What was NVIDIA's revenue in 2023?", "idx-v2") is None
+
+    # Reasoning blocks are not part of the cached answer
+    cache.set("NVIDIA revenue 2024?", "idx-v1", "<think>Check the 10-K.</think>\n60.92B", run_id="def456", steps=4)
+    assert cache.get("NVIDIA revenue 2024", "idx-v1")["answer"] == "60.92B"
+
+def test_tiered_json_parse_records_tier():
+    """Well-formed args take the strict path; LLM malformations are repaired before json5."""
+    from src.utils.parsing import parse_stats, reset_parse_stats, robust_json_parse
+
+    reset_parse_stats()
+    assert robust_json_parse('{"query": "revenue"}') == {"query": "revenue"}
+    assert robust_json_parse("{'flag': True, 'x': None,}") == {"flag": True, "x": None}
+    # Python literals inside string values are left alone
+    assert robust_json_parse('{"note": "True story", "ok": False}') == {"note": "True story", "ok": False}
+    # ...and so are commas before a bracket inside string values
+    assert robust_json_parse('{"labels": ["a, ]", "b,}"], "ok": True,}') == {"labels": ["a, ]", "b,}"], "ok": True}
+    assert robust_json_parse("{query: 'unquoted key'}") == {"query": "unquoted key"}
+    with pytest.raises(ValueError):
+        robust_json_parse('{"query":')
+    assert parse_stats() == {"strict": 1, "repair": 3, "json5": 1, "failed": 1}
+
+def test_audit_queue_drops_instead_of_blocking():
+    """A full audit queue drops (and counts) records rather than stalling the caller."""
+    import json
+    import logging
+    import queue
+    from src.utils import robustness
+
+    handler = robustness._DroppingQueueHandler(queue.Queue(maxsize=1))
+    before = robustness.audit_stats()["dropped"]
+    for i in range(3):
+        record = logging.LogRecord("SwarmTracer", logging.INFO, __file__, 0, "Query", None, None)
+        record.audit = {"run_id": "r1", "node": "Researcher", "action": "Query", "duration_ms": float(i)}
+        handler.handle(record)
+    assert robustness.audit_stats()["dropped"] - before == 2
+
+    line = robustness.JsonlFormatter().format(handler.queue.get_nowait())
+    entry = json.loads(line)
+    assert entry["run_id"] == "r1" and entry["node"] == "Researcher" and entry["level"] == "INFO"
+
+def test_audit_counters_and_run_start_are_concurrency_safe():
+    """Drop counts survive concurrent handlers; each run context keeps its own elapsed-time origin."""
+    import contextvars
+    import logging
+    import queue
+    import threading
+    from src.utils import robustness
+
+    handler = robustness._DroppingQueueHandler(queue.Queue(maxsize=1))
+    handler.queue.put_nowait(None)
+    before = robustness.audit_stats()["dropped"]
+    record = logging.LogRecord("SwarmTracer", logging.INFO, __file__, 0, "Query", None, None)
+    threads = [threading.Thread(target=lambda: [handler.handle(record) for _ in range(500)]) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert robustness.audit_stats()["dropped"] - before == 4000
+
+    def start(run_id):
+        robustness.set_run_context(run_id)
+        return robustness.run_start_var.get()
+    first = contextvars.copy_context().run(start, "r1")
+    second = contextvars.copy_context().run(start, "r2")
+    assert second >= first and robustness.run_start_var.get() <= first
+
+def test_node_accounting_from_ollama_metadata():
+    """Ollama eval counts/durations are read per message and summed per node."""
+    from langchain_core.messages import AIMessage, ToolMessage
+    from src.utils.accounting import merge_metadata, with_node_stats
+
+    msg = AIMessage(content="x", response_metadata={
+        "prompt_eval_count": 120, "eval_count": 30,
+        "prompt_eval_duration": 40_000_000, "eval_duration": 600_000_000, "load_duration": 0,
+    })
+    first = with_node_stats("Researcher", {"messages": [msg]}, {"wall_ms": 700.0, "calls": 1})
+    tools = with_node_stats("tools", {"messages": [ToolMessage(content="ok", tool_call_id="c1")]}, {"wall_ms": 50.0, "calls": 1})
+
+    metadata = merge_metadata(merge_metadata(merge_metadata({}, first["metadata"]), first["metadata"]), tools["metadata"])
+    researcher = metadata["nodes"]["Researcher"]
+    assert researcher["calls"] == 2 and researcher["eval_tokens"] == 60
+    assert researcher["prefill_ms"] == 80.0 and researcher["generation_ms"] == 1200.0
+    assert metadata["token_usage"] == 300 and metadata["tool_calls"] == 1 and metadata["latency_ms"] == 1450.0
+
+def test_prometheus_text_and_otlp_spans(tmp_path):
+    """Registry renders valid exposition text; node spans export as OTLP/JSON."""
+    import json
+    from src.utils.metrics import MetricsRegistry, SpanRecorder
+
+    registry = MetricsRegistry()
+    registry.record_node("Researcher", {"wall_ms": 1500.0, "prompt_tokens": 200, "eval_tokens": 40, "generation_ms": 800.0})
+    registry.routing.inc(role="Quant")
+    registry.rag_cache.inc(result="hit")
+    text = registry.render()
+    assert '# TYPE swarm_node_latency_seconds histogram' in text
+    assert 'swarm_node_latency_seconds_bucket{node="Researcher",le="2.5"} 1' in text
+    assert 'swarm_node_latency_seconds_bucket{node="Researcher",le="1"} 0' in text
+    assert 'swarm_llm_tokens_total{kind="eval",node="Researcher"} 40' in text
+    assert 'swarm_routing_decisions_total{role="Quant"} 1' in text
+
+    recorder = SpanRecorder()
+    recorder.start_trace("run1")
+    recorder.record("Supervisor", 1_000, 2_000, {"swarm.wall_ms": 1.0, "swarm.eval_tokens": 3})
+    assert recorder.export(tmp_path / "spans.jsonl") == 1
+    request = json.loads((tmp_path / "spans.jsonl").read_text())
+    span = request["resourceSpans"][0]["scopeSpans"][0]["spans"][0]
+    assert span["name"] == "Supervisor" and len(span["traceId"]) == 32 and len(span["spanId"]) == 16
+
+@pytest.mark.asyncio
+async def test_retry_with_backoff_awaits_coroutines_and_counts_retries():
+    """Async functions are retried on failure (not returned as an unawaited coroutine) and counted."""
+    from src.utils.metrics import metrics
+    from src.utils.robustness import retry_with_backoff
+
+    calls = []
+
+    @retry_with_backoff(retries=3, backoff_in_seconds=0)
+    async def flaky():
+        calls.append(1)
+        if len(calls) < 3:
+            raise ConnectionError("transient")
+        return "ok"
+
+    before = metrics.retries.value(function="flaky")
+    assert await flaky() == "ok"
+    assert len(calls) == 3
+    assert metrics.retries.value(function="flaky") - before == 2
+
+def test_start_trace_returns_fresh_run_id():
+    """Each run gets its own ID from start_trace(), used by the final report."""
+    from src.utils.observability import Observability
+
+    first, second = Observability.start_trace(), Observability.start_trace()
+    assert first and second and first != second
+
+def test_sampling_profiler_attributes_to_active_node(tmp_path):
+    """Samples taken while a node is active land under that node in the collapsed output."""
+    import time
+    from src.utils.accounting import node_timer
+    from src.utils.profiling import profile_run
+
+    def spin(seconds):
+        end = time.perf_counter() + seconds
+        while time.perf_counter() < end:
+            sum(range(100))
+
+    with profile_run(tmp_path, "run1", interval_s=0.002) as profiler:
+        with node_timer("Quant"):
+            spin(0.2)
+    summary = {node: n for node, n, _, _ in profiler.summary()}
+    assert summary.get("Quant", 0) > 0
+    lines = (tmp_path / "run1.collapsed").read_text().splitlines()
+    assert any(line.startswith("Quant;") and "spin (" in line for line in lines)
+
+def test_active_node_bookkeeping_is_thread_safe(tmp_path):
+    """Concurrent node_timers only remove their own entry, and nothing is tracked without a profiler."""
+    import threading
+    from src.utils import profiling
+    from src.utils.accounting import node_timer
+
+    with node_timer("Researcher"):
+        assert profiling.ACTIVE_NODES == []
+
+    def run(name):
+        for _ in range(2000):
+            with node_timer(name):
+                pass
+
+    with profiling.profile_run(tmp_path, "threads", interval_s=0.05):
+        threads = [threading.Thread(target=run, args=(name,)) for name in ("Supervisor", "Researcher", "Quant") * 3]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert profiling.ACTIVE_NODES == []
+
+def test_streaming_scorer_percentiles_and_regression_diff(tmp_path):
+    """Scores JSONL in one pass with bounded memory and flags latency regressions between runs."""
+    import io
+    import json
+    from src.experiments.evaluate_metrics import diff_runs, iter_results, score_stream
+
+    def write(name, latencies, answer):
+        path = tmp_path / name
+        with open(path, "w", encoding="utf-8") as f:
+            for i, latency in enumerate(latencies):
+                f.write(json.dumps({"id": i, "pipeline": "Swarm", "model_answer": answer, "ground_truth": "26.974", "latency_s": latency}) + "\n")
+            f.write('{"id": 99, "torn')  # interrupted run
+        return str(path)
+
+    base = write("base.jsonl", [i / 100 for i in range(1, 101)], "Revenue was $26,974M... 26.974B")
+    new = write("new.jsonl", [i / 100 * 1.5 for i in range(1, 101)], "no idea")
+
+    out = io.StringIO()
+    stats = score_stream(iter_results(base), out)
+    summary = stats["Swarm"].summary()
+    assert summary["total_samples"] == 100 and summary["accuracy"] == 1.0
+    assert abs(summary["p95_latency"] - 0.95) / 0.95 < 0.01
+    assert len(stats["Swarm"].latency.counts) < 2000  # independent of row count
+    assert out.getvalue().count('"is_correct": true') == 100
+
+    current = {k: v.summary() for k, v in score_stream(iter_results(new)).items()}
+    baseline = {"Swarm": summary}
+    assert [line.split(":")[0] for line in diff_runs(baseline, current, threshold=0.10)] == ["Swarm p50", "Swarm p95", "Swarm p99"]
+    assert diff_runs(baseline, current, threshold=0.60) == []
@@ -0,0 +1,21 @@
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def test_cli_import_stays_lazy():
+    """Importing the CLI must not load the plotting, RAG, or LLM stacks (startup budget guard)."""
+    sys.path.insert(0, str(ROOT / "scripts"))
+    from bench_startup import measure
+
+    _, _, loaded = measure("main")
+    assert loaded == [], f"Heavy modules imported at startup: {loaded}"
+
+
+def test_import_has_no_filesystem_side_effects(tmp_path):
+    """Importing config/robustness must not create directories or open the log file."""
+    probe = "import src.core.config, src.utils.robustness, src.rag_adapter"
+    subprocess.run([sys.executable, "-c", f"import sys; sys.path.insert(0, {str(ROOT)!r}); {probe}"], cwd=tmp_path, check=True)
+    assert list(tmp_path.iterdir()) == []